@@ -1,8 +1,7 @@
 import os
-from celery import Celery, shared_task
+from celery import Celery
 from celery.signals import task_failure
 import logging
-from dubbing.pipeline import dubbing_pipeline
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,10 +29,6 @@ app.conf.update(
     enable_utc=True,
 )
 
-@shared_task
-def process_dubbing_task(video_path, job_id):
-    dubbing_pipeline(video_path, job_id=job_id)
-
 @task_failure.connect
 def handle_task_failure(task_id=None, exception=None, args=None, kwargs=None, **_):
     """Handle task failures and log them"""
@@ -1,6 +1,8 @@
 from pathlib import Path
 import os
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -23,6 +25,10 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:8080", # React Vite frontend URL
 ]
 
+# Pagination and caching headers the frontend may read, and send back on polls
+CORS_EXPOSE_HEADERS = ['ETag', 'Link', 'X-Next-Cursor']
+CORS_ALLOW_HEADERS = (*default_headers, 'if-none-match')
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -87,6 +93,8 @@ WSGI_APPLICATION = 'backend_manager.wsgi.application'
 # }
 
 import os
+
+from corsheaders.defaults import default_headers
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATABASES = {
     'default': {
@@ -143,6 +151,21 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+# One task per pipeline stage, each on a queue whose workers are sized for it
+# (see STAGE_TASK_CONFIG and `manage.py run_stage_worker`)
+CELERY_TASK_DEFAULT_QUEUE = 'io'
+CELERY_TASK_ROUTES = {
+    'dubbing.tasks.extract_audio_task': {'queue': 'io'},
+    'dubbing.tasks.transcribe_task': {'queue': 'asr'},
+    'dubbing.tasks.translate_task': {'queue': 'io'},
+    'dubbing.tasks.synthesize_task': {'queue': 'tts'},
+    'dubbing.tasks.synthesize_segments_task': {'queue': 'tts'},
+    'dubbing.tasks.lipsync_task': {'queue': 'lipsync'},
+    'dubbing.tasks.process_dubbing_task': {'queue': 'io'},
+    'dubbing.tasks.resume_dubbing_task': {'queue': 'io'},
+}
+# Stage tasks run for minutes: don't let one worker hoard a queue's messages
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 
 # Media settings
 MEDIA_URL = '/media/'
@@ -183,6 +206,145 @@ WHISPER_CONFIG = {
     'MODEL_SIZE': 'base',  # Options: tiny, base, small, medium, large
     'DEVICE': 'cuda' if torch.cuda.is_available() else 'cpu',
     'FP16': False,  # Keep False for CPU
+    'PRECISION': None,  # fp32 | fp16 (cuda) | int8 (dynamic quantization, cpu); None = from FP16
+    'BATCH_SIZE': 16,
+    'BEAM_SIZE': 5,  # 1 = greedy decoding; compare with `manage.py benchmark_asr`
+    'WORD_TIMESTAMPS': False,  # Per-word timings in Whisper segments
+    'MEMORY_BUDGET_MB': 2048,  # Resident model budget per worker process (LRU eviction above this)
+    'PRELOAD': True,  # Load the model when a Celery worker process starts
+}
+
+# Voice cloning (XTTS) settings
+TTS_CONFIG = {
+    'MODEL_NAME': 'tts_models/multilingual/multi-dataset/xtts_v2',
+    'LANGUAGE': 'hi',
+    'SPEAKER_CACHE_DIR': os.path.join(MEDIA_ROOT, 'cache', 'speakers'),  # Speaker latents (.npz) by clip hash
+    'SPEAKER_CACHE_SIZE': 64,
+    'PRELOAD': False,  # Load XTTS when a Celery worker process starts
+}
+
+# Chunked Whisper across a process pool for long audio on CPU workers
+PARALLEL_ASR = {
+    'ENABLED': True,
+    'WORKERS': None,  # ASR processes per Celery worker process; None = half the cores
+    'THREADS_PER_WORKER': None,  # torch threads per ASR process; None = cores / workers
+    'MIN_SECONDS': 300,  # Speech shorter than this is transcribed in one call
+    'CHUNK_SECONDS': 120,  # Chunks are cut at the quietest point near this length
+    'OVERLAP_SECONDS': 2.0,
+}
+
+# Voice activity detection: only speech regions go to Whisper, silent videos skip the pipeline
+VAD_CONFIG = {
+    'ENABLED': True,
+    'ENERGY_MARGIN_DB': 10.0,  # Speech must be this far above the estimated noise floor
+    'MIN_SPEECH_SECONDS': 0.25,  # Shorter blips are dropped
+    'MIN_SILENCE_SECONDS': 0.5,  # Shorter pauses stay inside a speech region
+    'PAD_SECONDS': 0.2,
+}
+
+# Shared inference server (manage.py run_inference_server): one copy of Whisper/XTTS, batched across jobs
+INFERENCE_SERVER = {
+    'ENABLED': os.getenv('INFERENCE_SERVER_ENABLED', '') == '1',
+    'URL': os.getenv('INFERENCE_SERVER_URL', 'unix:///tmp/dubbing-inference.sock'),  # or http://127.0.0.1:8765
+    'TIMEOUT': 600,
+    'BATCH_WINDOW_MS': 50,  # How long the server waits to fill a batch
+    'MAX_ASR_BATCH': 8,  # 30 s clips decoded together
+    'MAX_TTS_BATCH': 8,
+}
+
+# Lip sync: resident in-process Wav2Lip, with inference.py as a fallback
+LIPSYNC_CONFIG = {
+    'ENGINE': 'inprocess',  # inprocess | subprocess
+    'SUBPROCESS_FALLBACK': True,
+    'WAV2LIP_PATH': os.getenv('WAV2LIP_PATH'),
+    'CHECKPOINT': os.getenv('WAV2LIP_CHECKPOINT'),  # None = <WAV2LIP_PATH>/checkpoints/wav2lip_gan.pth
     'BATCH_SIZE': 16,
-    'BEAM_SIZE': 5
+    'FACE_DET_BATCH_SIZE': 16,
+    'PRELOAD': False,  # Load Wav2Lip and the face detector when a Celery worker process starts
+    'PARTIAL': True,  # Only re-render spans with dubbed speech and a face; pass the rest through
+    'PARTIAL_MIN_GAP_SECONDS': 1.0,
+    'PARTIAL_MAX_COVERAGE': 0.8,
+    'FACE_SAMPLE_SECONDS': 0.5,
+    'PARALLEL_WORKERS': None,  # None = one process per GPU, or half the cores on CPU
+    'PARALLEL_THREADS': None,
+    'CHUNK_SECONDS': 30,
+}
+
+# Per-stage Celery workers: `manage.py run_stage_worker <queue>` starts one sized from QUEUES
+STAGE_TASK_CONFIG = {
+    'QUEUES': {
+        'io': {'concurrency': 8, 'prefetch': 4, 'pool': 'prefork'},
+        'asr': {'concurrency': 1, 'prefetch': 1, 'pool': 'threads'},
+        'tts': {'concurrency': 1, 'prefetch': 1, 'pool': 'prefork'},
+        'lipsync': {'concurrency': 1, 'prefetch': 1, 'pool': 'threads'},
+    },
+    'TTS_BATCH_SEGMENTS': 16,
+}
+
+# Job progress: step updates are coalesced to one write per job per interval
+PROGRESS_CONFIG = {
+    'MIN_INTERVAL_MS': 1000,
+    'REDIS_URL': None,  # Pub/sub behind the job event streams; None = CELERY_BROKER_URL
+    'KEEPALIVE_SECONDS': 15,
+    'POLL_SECONDS': 2.0,  # Used by event streams while Redis is unreachable
+    'MAX_STREAM_JOBS': 100,
+}
+
+# Job media delivery (dubbing/job/<id>/media/<kind>/): ranges and revalidation.
+# In production set OFFLOAD to 'nginx' with an internal location, e.g.
+#   location /protected-media/ { internal; alias /path/to/media/; }
+# or to 'sendfile' for Apache mod_xsendfile, so the proxy sends the bytes.
+# Media is only served to the job's owner: by token, or through the signed
+# URLs the status views hand out, which expire after one to two URL_LIFETIMEs.
+MEDIA_DELIVERY = {
+    'OFFLOAD': None,
+    'INTERNAL_PREFIX': '/protected-media/',
+    'MAX_AGE': 3600,
+    'URL_LIFETIME': 3600,
+}
+
+# Resumable chunked uploads (upload/sessions/)
+UPLOAD_CONFIG = {
+    'CHUNK_SIZE': 8 * 1024 * 1024,
+    'MAX_CHUNK_SIZE': 64 * 1024 * 1024,
+    'PROBE_BYTES': 4 * 1024 * 1024,  # Header probed once this much has arrived
+    'SESSION_TTL_HOURS': 24,
+}
+
+# Streaming mode: ASR -> translation -> TTS overlapped through bounded queues
+STREAMING_CONFIG = {
+    'ENABLED': False,
+    'ASR_WINDOW_SECONDS': 30,  # Audio handed to Whisper per producer step
+    'QUEUE_SIZE': 8,  # Segments buffered between stages before the producer blocks
+    'TRANSLATE_WORKERS': 2,
+    'TTS_WORKERS': 1,  # Workers share one resident XTTS model
+    'MAX_RETRIES': 2,
+}
+
+# Persistent translation memory (TranslationMemory table); only misses go to the network
+TRANSLATION_CACHE = {
+    'ENABLED': True,
+    'MAX_ENTRIES': 100000,  # LRU eviction (by last use) above this many rows
+    'MAX_AGE_DAYS': 180,
+    'EVICT_EVERY': 500,  # Inserts between eviction passes
+}
+
+# Translation client: batching, concurrency and a token-bucket rate limit shared through Redis
+TRANSLATION_CLIENT = {
+    'RATE_PER_SECOND': 2.0,  # Backend requests per second across all worker processes
+    'BURST': 4,
+    'CONCURRENCY': 4,  # Batches in flight per job
+    'PRIMARY_MAX_CHARS': 4500,  # googletrans request size limit
+    'BACKUP_MAX_CHARS': 500,  # MyMemory ("translate" package) request size limit
+    'MAX_RETRIES': 3,
+    'RETRY_BACKOFF_SECONDS': 1.0,  # Pause before retrying texts every backend failed, doubled each time
+    'REDIS_URL': CELERY_BROKER_URL,
+    'HTTP_URL': os.getenv('TRANSLATION_HTTP_URL'),  # Optional LibreTranslate-compatible endpoint
+}
+
+# Content-addressed stage outputs (keyed by input hash + stage parameters)
+ARTIFACT_STORE = {
+    'ROOT': os.path.join(MEDIA_ROOT, 'artifacts'),
+    'MAX_AGE_DAYS': 30,  # Prune artifacts unused for this long
+    'PRUNE_INTERVAL_SECONDS': 3600,
 }
@@ -9,7 +9,6 @@ urlpatterns = [
     path('dubbing/', include('dubbing.urls')),
     path('api/login/', views.login_view, name='api-login'),
     path('api/signup/', views.signup_view, name='api-signup'),
-    path('dubbing/jobs/<int:job_id>/dubbed-audio/', views.serve_dubbed_audio, name='serve_dubbed_audio'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARTIFACT_STORE_CONFIG = {
+    'ROOT': os.path.join(settings.MEDIA_ROOT, 'artifacts'),
+    'MAX_AGE_DAYS': 30,  # Artifacts not used for this long are pruned
+    'PRUNE_INTERVAL_SECONDS': 3600,
+}
+
+# DubbingJob fields whose files may live in the store (a job's outputs are served from there)
+JOB_ARTIFACT_FIELDS = ('result_file', 'extracted_audio', 'dubbed_audio_file')
+
+
+def get_artifact_store_config():
+    """Return ARTIFACT_STORE from settings merged over the defaults"""
+    config = dict(DEFAULT_ARTIFACT_STORE_CONFIG)
+    config.update(getattr(settings, 'ARTIFACT_STORE', {}) or {})
+    return config
+
+
+class ArtifactStore:
+    """
+    Content-addressed store for pipeline stage outputs.
+
+    An artifact key is a hash of the input content hash, the stage name and
+    the stage parameters, so the same video processed with the same settings
+    always maps to the same files and different uploads never collide.
+    Files are written to a temporary name and renamed into place, so a path
+    that exists is always complete.
+    """
+
+    def __init__(self, root, max_age_days=None):
+        self.root = Path(root)
+        self.max_age_days = max_age_days
+        self._last_prune = 0
+
+    def key(self, stage, input_hash, params):
+        payload = json.dumps({"stage": stage, "input": input_hash, "params": params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, key, filename):
+        return self.root / key[:2] / key / filename
+
+    def relative(self, path):
+        """Path relative to MEDIA_ROOT, for FileField names"""
+        return os.path.relpath(str(path), settings.MEDIA_ROOT)
+
+    def exists(self, path):
+        path = Path(path)
+        if not path.exists():
+            return False
+        # Touch on hit so pruning keeps artifacts that are still in use
+        os.utime(path.parent)
+        return True
+
+    @contextmanager
+    def writing(self, path):
+        """
+        Yield a temporary path next to ``path`` and move it into place on success.
+
+        The temporary name keeps the extension so tools like ffmpeg pick the
+        right container, and is unique to each call, so threads of one
+        worker writing the same artifact don't share it.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"tmp-{uuid.uuid4().hex}-{path.name}")
+        try:
+            yield tmp_path
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def get_json(self, key, filename):
+        path = self.path(key, filename)
+        if not self.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable artifact {path}: {str(e)}")
+            return None
+
+    def put_json(self, key, filename, data):
+        path = self.path(key, filename)
+        with self.writing(path) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+        return path
+
+    def referenced_keys(self):
+        """Keys of the artifacts that DubbingJob rows point to, which must outlive pruning"""
+        DubbingJob = apps.get_model('dubbing', 'DubbingJob')
+        prefix = self.relative(self.root).replace(os.sep, '/') + '/'
+        keys = set()
+        for names in DubbingJob.objects.values_list(*JOB_ARTIFACT_FIELDS).iterator():
+            for name in names:
+                if name and name.replace(os.sep, '/').startswith(prefix):
+                    keys.add(Path(name).parent.name)
+        return keys
+
+    def prune(self, force=False):
+        """
+        Remove artifact directories unused for longer than ``max_age_days``,
+        except those holding a job's result files.
+        """
+        if not self.max_age_days or not self.root.exists():
+            return 0
+        now = time.time()
+        interval = get_artifact_store_config()['PRUNE_INTERVAL_SECONDS']
+        if not force and now - self._last_prune < interval:
+            return 0
+        self._last_prune = now
+
+        cutoff = now - self.max_age_days * 86400
+        expired = []
+        for shard in self.root.iterdir():
+            if not shard.is_dir():
+                continue
+            for artifact_dir in shard.iterdir():
+                try:
+                    if artifact_dir.stat().st_mtime < cutoff:
+                        expired.append(artifact_dir)
+                except OSError:
+                    continue
+
+        removed = 0
+        if expired:
+            keep = self.referenced_keys()
+            for artifact_dir in expired:
+                if artifact_dir.name not in keep:
+                    shutil.rmtree(artifact_dir, ignore_errors=True)
+                    removed += 1
+        if removed:
+            logger.info(f"Pruned {removed} unused artifacts")
+        return removed
+
+
+_store = None
+
+
+def get_artifact_store():
+    """Return the process-wide artifact store"""
+    global _store
+    if _store is None:
+        config = get_artifact_store_config()
+        _store = ArtifactStore(config['ROOT'], config['MAX_AGE_DAYS'])
+    return _store
@@ -0,0 +1,135 @@
+import functools
+import logging
+import math
+import shutil
+import subprocess
+import tempfile
+import wave
+
+import numpy as np
+from scipy.signal import resample_poly
+
+logger = logging.getLogger(__name__)
+
+DECODE_SAMPLE_RATE = 48000
+ASR_SAMPLE_RATE = 16000
+REFERENCE_SAMPLE_RATE = 22050  # XTTS conditioning rate
+REFERENCE_MAX_SECONDS = 30
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+@functools.lru_cache(maxsize=None)
+def find_tool(name):
+    """Locate an external tool once per process"""
+    path = shutil.which(name)
+    if not path:
+        raise RuntimeError(f"{name} is not installed or not in PATH")
+    logger.info(f"Using {name} at {path}")
+    return path
+
+
+def resample(samples, orig_rate, target_rate):
+    """Polyphase resampling of a float32 signal in one vectorized pass"""
+    if orig_rate == target_rate:
+        return samples
+    divisor = math.gcd(int(orig_rate), int(target_rate))
+    out = resample_poly(samples, int(target_rate) // divisor, int(orig_rate) // divisor)
+    return out.astype(np.float32, copy=False)
+
+
+class AudioBuffer:
+    """
+    Mono float32 audio decoded once, with cached views for each consumer.
+
+    ``asr_view()`` is what Whisper expects (16 kHz float32), ``reference_clip()``
+    is a short high-energy excerpt for voice cloning.
+    """
+
+    def __init__(self, samples, sample_rate):
+        self.samples = np.ascontiguousarray(samples, dtype=np.float32)
+        self.sample_rate = int(sample_rate)
+        self._views = {}
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.sample_rate
+
+    def resampled(self, sample_rate):
+        if sample_rate not in self._views:
+            self._views[sample_rate] = resample(self.samples, self.sample_rate, sample_rate)
+        return self._views[sample_rate]
+
+    def asr_view(self):
+        return self.resampled(ASR_SAMPLE_RATE)
+
+    def reference_clip(self, max_seconds=REFERENCE_MAX_SECONDS, sample_rate=REFERENCE_SAMPLE_RATE):
+        """The ``max_seconds`` window with the most energy, resampled for TTS conditioning"""
+        window = int(max_seconds * self.sample_rate)
+        if len(self.samples) <= window:
+            clip = self.samples
+        else:
+            energy = np.concatenate(([0.0], np.cumsum(np.square(self.samples, dtype=np.float64))))
+            totals = energy[window:] - energy[:-window]
+            # Step through candidate starts a second at a time
+            starts = np.arange(0, len(totals), self.sample_rate)
+            start = int(starts[np.argmax(totals[starts])])
+            clip = self.samples[start:start + window]
+        return AudioBuffer(resample(clip, self.sample_rate, sample_rate), sample_rate)
+
+    def write_wav(self, path):
+        """Write as 16-bit mono PCM"""
+        pcm = (np.clip(self.samples, -1.0, 1.0) * 32767).astype('<i2')
+        with wave.open(str(path), 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(self.sample_rate)
+            wf.writeframes(pcm.tobytes())
+        return path
+
+
+def decode_audio(media_path, sample_rate=DECODE_SAMPLE_RATE):
+    """Decode the audio track of any container to mono float32 by streaming ffmpeg stdout"""
+    command = [
+        find_tool('ffmpeg'),
+        '-nostdin',
+        '-i', str(media_path),
+        '-vn',
+        '-ac', '1',
+        '-ar', str(sample_rate),
+        '-f', 'f32le',
+        '-loglevel', 'error',
+        '-',
+    ]
+    logger.info(f"Decoding audio: {' '.join(command)}")
+    # stderr goes to a file so a chatty ffmpeg can't block on a full pipe
+    with tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file)
+        buffer = bytearray()
+        try:
+            for chunk in iter(lambda: process.stdout.read(READ_CHUNK_SIZE), b''):
+                buffer.extend(chunk)
+        finally:
+            process.stdout.close()
+        if process.wait() != 0:
+            stderr_file.seek(0)
+            raise RuntimeError(f"FFmpeg failed: {stderr_file.read().decode(errors='replace')}")
+    samples = np.frombuffer(buffer, dtype='<f4', count=len(buffer) // 4)
+    if not len(samples):
+        raise ValueError(f"No audio stream found in {media_path}")
+    logger.info(f"Decoded {len(samples) / sample_rate:.1f}s of audio from {media_path}")
+    return AudioBuffer(samples, sample_rate)
+
+
+def load_wav(path):
+    """Read a PCM WAV (as written by ``AudioBuffer.write_wav``) without spawning ffmpeg"""
+    with wave.open(str(path), 'rb') as wf:
+        channels = wf.getnchannels()
+        sample_width = wf.getsampwidth()
+        sample_rate = wf.getframerate()
+        frames = wf.readframes(wf.getnframes())
+    if sample_width != 2:
+        raise ValueError(f"Expected 16-bit PCM WAV: {path}")
+    samples = np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768.0
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return AudioBuffer(samples, sample_rate)
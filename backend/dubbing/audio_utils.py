@@ -1,11 +1,14 @@
 import subprocess
 import os
 import logging
-import torch
 import whisper
 import numpy as np
 import wave
 from pathlib import Path
+from .audio_ingest import ASR_SAMPLE_RATE, find_tool
+from .inference_client import get_inference_client, use_inference_server
+from .parallel_asr import transcribe_parallel, use_parallel_asr
+from .model_registry import decoding_options, get_registry, get_whisper_config, get_whisper_model, whisper_model_key
 
 logger = logging.getLogger(__name__)
 
@@ -19,15 +22,9 @@ def extract_audio_ffmpeg(video_path, audio_path):
         # Create output directory if it doesn't exist
         os.makedirs(os.path.dirname(audio_path), exist_ok=True)
 
-        # Check if FFmpeg is available
-        try:
-            subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True)
-        except subprocess.CalledProcessError:
-            raise RuntimeError("FFmpeg is not installed or not in PATH")
-
-        # Construct FFmpeg command
+        # Construct FFmpeg command (tool lookup is cached per process)
         command = [
-            'ffmpeg',
+            find_tool('ffmpeg'),
             '-i', video_path,
             '-vn',
             '-acodec', 'pcm_s16le',
@@ -60,42 +57,130 @@ def extract_audio_ffmpeg(video_path, audio_path):
         logger.error(f"Error extracting audio: {str(e)}")
         raise
 
-def transcribe_audio_with_whisper(audio_path):
+def run_whisper(audio):
+    """Run Whisper on a path or 16 kHz float32 array and return the full result dict"""
+    # If audio is a Path, convert to str
+    if isinstance(audio, Path):
+        audio = str(audio)
+
+    if not np.__version__:
+        raise ImportError("NumPy is not properly installed")
+
+    if use_inference_server():
+        # The shared server owns the model and batches requests across jobs
+        if isinstance(audio, str):
+            audio = whisper.load_audio(audio)
+        return get_inference_client().transcribe(audio)
+
+    config = get_whisper_config()
+    model_size, device, precision = whisper_model_key()
+    logger.info(f"Using Whisper model {model_size} on {device} ({precision})")
+
+    model = get_whisper_model(model_size, device, precision)
+    logger.info(f"Model registry stats: {get_registry().stats()}")
+
+    # Transcribe with optimized settings
+    return model.transcribe(
+        audio,
+        **decoding_options(precision),
+        language='en',
+        task='transcribe',
+        word_timestamps=config['WORD_TIMESTAMPS'],
+        verbose=True
+    )
+
+def run_asr(audio):
+    """Run Whisper on a path or array; long arrays on CPU are chunked across the ASR process pool"""
+    if not isinstance(audio, (str, Path)) and use_parallel_asr(len(audio) / ASR_SAMPLE_RATE):
+        return transcribe_parallel(audio)
+    return run_whisper(audio)
+
+def run_whisper_on_speech(audio, speech):
+    """Run Whisper on the speech regions of a 16 kHz array only; timestamps come back on the original timeline"""
+    packed = speech.pack(audio, ASR_SAMPLE_RATE)
+    logger.info(f"Sending {len(packed) / ASR_SAMPLE_RATE:.1f}s of speech of {len(audio) / ASR_SAMPLE_RATE:.1f}s to Whisper")
+    result = run_asr(packed)
+    result["segments"] = speech.remap(result.get("segments", []))
+    return result
+
+def transcribe_audio_with_whisper(audio_path, speech=None):
     """Transcribe audio using Whisper with optimized settings"""
     try:
-        # If audio_path is a Path, convert to str
-        if isinstance(audio_path, Path):
-            audio_path = str(audio_path)
         logger.info(f"Transcribing audio ({type(audio_path)}): {audio_path}")
+        result = run_whisper_on_speech(audio_path, speech) if speech is not None else run_asr(audio_path)
+        logger.info("Transcription completed successfully")
+        return result["text"]
 
-        if not np.__version__:
-            raise ImportError("NumPy is not properly installed")
-
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        logger.info(f"Using device: {device}")
-
-        model = whisper.load_model(
-            "tiny.en",
-            device=device,
-            download_root=os.path.join(os.path.dirname(__file__), "models")
-        )
+    except Exception as e:
+        logger.error(f"Transcription error: {str(e)}")
+        raise
 
-        # Transcribe with optimized settings
-        result = model.transcribe(
-            audio_path,
-            fp16=False,
-            language='en',
-            task='transcribe',
-            verbose=True
-        )
+def transcribe_audio_segments(audio_path, speech=None):
+    """
+    Transcribe audio and return Whisper's timed segments as start/end/text dicts.
 
-        logger.info("Transcription completed successfully")
-        return result["text"]
+    With ``speech`` (see ``vad.detect_speech``) only the speech regions of
+    the 16 kHz array are transcribed.
+    """
+    try:
+        logger.info(f"Transcribing audio into segments: {type(audio_path).__name__}")
+        result = run_whisper_on_speech(audio_path, speech) if speech is not None else run_asr(audio_path)
+        segments = [
+            {"start": float(seg["start"]), "end": float(seg["end"]), "text": seg["text"].strip()}
+            for seg in result.get("segments", [])
+            if seg["text"].strip()
+        ]
+        logger.info(f"Transcription produced {len(segments)} segments")
+        return segments
 
     except Exception as e:
         logger.error(f"Transcription error: {str(e)}")
         raise
 
+def assemble_segment_audio(clips, output_path, total_duration=None):
+    """
+    Lay out per-segment WAV clips on one timeline and write a single mono WAV.
+
+    ``clips`` is an iterable of (start_seconds, wav_path). Each clip starts at
+    its segment start, or right after the previous clip if that one overruns.
+    """
+    sample_rate = None
+    placed = []
+    cursor = 0
+    for start, clip_path in sorted(clips, key=lambda c: c[0]):
+        with wave.open(str(clip_path), 'rb') as wf:
+            if sample_rate is None:
+                sample_rate = wf.getframerate()
+            elif wf.getframerate() != sample_rate:
+                raise ValueError(f"Sample rate mismatch in {clip_path}: {wf.getframerate()} != {sample_rate}")
+            if wf.getsampwidth() != 2:
+                raise ValueError(f"Expected 16-bit PCM clip: {clip_path}")
+            samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+            if wf.getnchannels() > 1:
+                samples = samples.reshape(-1, wf.getnchannels()).mean(axis=1).astype(np.int16)
+        offset = max(int(round(start * sample_rate)), cursor)
+        placed.append((offset, samples))
+        cursor = offset + len(samples)
+
+    if sample_rate is None:
+        raise ValueError("No audio clips to assemble")
+
+    length = cursor
+    if total_duration:
+        length = max(length, int(round(total_duration * sample_rate)))
+    timeline = np.zeros(length, dtype=np.int16)
+    for offset, samples in placed:
+        timeline[offset:offset + len(samples)] = samples
+
+    os.makedirs(os.path.dirname(str(output_path)), exist_ok=True)
+    with wave.open(str(output_path), 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(timeline.tobytes())
+    logger.info(f"Assembled {len(placed)} clips into {output_path} ({length / sample_rate:.1f}s)")
+    return output_path
+
 def replace_audio_in_video(video_path, audio_path, output_path):
     """Replace audio in video using FFmpeg"""
     try:
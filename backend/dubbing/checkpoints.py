@@ -0,0 +1,53 @@
+import logging
+import os
+
+from django.apps import apps
+
+logger = logging.getLogger(__name__)
+
+STAGES = ["extract", "transcript", "translation", "tts", "lipsync"]
+
+
+class CheckpointTracker:
+    """
+    Reads and writes a job's StageCheckpoint rows.
+
+    A stage counts as complete only if its checkpoint was recorded with the
+    same parameters hash and its artifact is still on disk.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        StageCheckpoint = apps.get_model('dubbing', 'StageCheckpoint')
+        self.checkpoints = {cp.stage: cp for cp in StageCheckpoint.objects.filter(job=job)}
+
+    def is_complete(self, stage, params_hash):
+        checkpoint = self.checkpoints.get(stage)
+        if not checkpoint or not checkpoint.completed or checkpoint.params_hash != params_hash:
+            return False
+        if checkpoint.artifact_path and not os.path.exists(checkpoint.artifact_path):
+            logger.info(f"Checkpoint {stage} for job {self.job.id} lost its artifact, rerunning")
+            return False
+        return True
+
+    def record(self, stage, params_hash, artifact_path=None):
+        StageCheckpoint = apps.get_model('dubbing', 'StageCheckpoint')
+        checkpoint, _ = StageCheckpoint.objects.update_or_create(
+            job=self.job,
+            stage=stage,
+            defaults={
+                "params_hash": params_hash,
+                "artifact_path": str(artifact_path) if artifact_path else None,
+                "completed": True,
+            },
+        )
+        self.checkpoints[stage] = checkpoint
+        logger.info(f"Checkpoint recorded: job {self.job.id} stage {stage}")
+        return checkpoint
+
+    def first_incomplete(self, keys):
+        """Name of the first stage that still has to run, or None if all are done"""
+        for stage in STAGES:
+            if not self.is_complete(stage, keys[stage]):
+                return stage
+        return None
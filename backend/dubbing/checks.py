@@ -1,9 +1,7 @@
-import subprocess
-import json
 import logging
 import os
-import torch
 from pathlib import Path
+from .media_probe import probe_media
 
 logger = logging.getLogger(__name__)
 
@@ -15,37 +13,39 @@ MIN_AUDIO_BITRATE = 64000
 MIN_MEMORY_REQUIRED = 4 * 1024 * 1024 * 1024  # 4GB
 MIN_DISK_SPACE = 10 * 1024 * 1024 * 1024  # 10GB
 
-def validate_video_format(video_path: str) -> bool:
-    """Validate video format and size"""
+def check_video_size(video_path: str) -> int:
+    """Reject a file over MAX_VIDEO_SIZE from its stat, before anything reads (hashes or probes) it"""
+    size = os.stat(video_path).st_size
+    if size > MAX_VIDEO_SIZE:
+        raise ValueError(f"Video file too large. Maximum size: {MAX_VIDEO_SIZE/1024/1024}MB")
+    return size
+
+def validate_video_format(video_path: str, probe: dict = None) -> bool:
+    """Validate video format, size and streams (a video without audio is valid: it has no speech to dub)"""
     try:
         if not any(video_path.lower().endswith(fmt) for fmt in ALLOWED_VIDEO_FORMATS):
             raise ValueError(f"Unsupported video format. Allowed formats: {', '.join(ALLOWED_VIDEO_FORMATS)}")
         
-        if os.path.getsize(video_path) > MAX_VIDEO_SIZE:
-            raise ValueError(f"Video file too large. Maximum size: {MAX_VIDEO_SIZE/1024/1024}MB")
+        check_video_size(video_path)
+
+        probe = probe or probe_media(video_path)
+        if not probe.get('video'):
+            raise ValueError("No video stream found in file")
+        if not probe.get('duration'):
+            raise ValueError("Could not determine video duration")
             
         return True
     except Exception as e:
         logger.error(f"Video validation failed: {str(e)}")
         raise
 
-def validate_audio_quality(audio_path: str) -> bool:
+def validate_audio_quality(audio_path: str, probe: dict = None) -> bool:
     """Validate audio quality meets minimum requirements"""
     try:
-        cmd = [
-            'ffprobe',
-            '-v', 'error',
-            '-select_streams', 'a:0',
-            '-show_entries', 'stream=bit_rate,sample_rate',
-            '-of', 'json',
-            audio_path
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        audio_info = json.loads(result.stdout)
-        
-        stream_info = audio_info.get('streams', [{}])[0]
-        sample_rate = int(stream_info.get('sample_rate', 0))
-        bit_rate = int(stream_info.get('bit_rate', 0))
+        probe = probe or probe_media(audio_path)
+        audio_info = probe.get('audio') or {}
+        sample_rate = audio_info.get('sample_rate') or 0
+        bit_rate = audio_info.get('bitrate') or 0
         
         if sample_rate < MIN_AUDIO_SAMPLE_RATE:
             raise ValueError(f"Audio sample rate too low: {sample_rate}Hz (minimum: {MIN_AUDIO_SAMPLE_RATE}Hz)")
@@ -78,7 +78,11 @@ def validate_audio_quality(audio_path: str) -> bool:
 #         raise
 
 def check_system_resources():
-    """Check if system has sufficient resources for transcription"""
+    """
+    Check if system has sufficient resources for transcription. Torch thread
+    counts are left to the worker pools (PARALLEL_ASR, LIPSYNC_CONFIG), which
+    split the cores between their processes.
+    """
     try:
         import psutil
         
@@ -88,25 +92,20 @@ def check_system_resources():
         
         if available_memory < min_required:
             logger.warning(f"Low memory available: {available_memory/1024/1024/1024:.1f}GB")
-            
-        # Set torch to optimize for CPU if CUDA not available
-        if not torch.cuda.is_available():
-            torch.set_num_threads(psutil.cpu_count())
-            logger.info(f"Using {psutil.cpu_count()} CPU threads")
-            
+
         return True
     except Exception as e:
         logger.error(f"Resource check failed: {str(e)}")
         raise
 
-def run_all_checks(video_path: str, audio_path: str = None) -> bool:
+def run_all_checks(video_path: str, audio_path: str = None, probe: dict = None) -> bool:
     """Run all critical checks before processing"""
     try:
         # Check system resources
         check_system_resources()
         
         # Validate video
-        validate_video_format(video_path)
+        validate_video_format(video_path, probe)
         
         # Validate audio if provided
         if audio_path and os.path.exists(audio_path):
@@ -115,4 +114,4 @@ def run_all_checks(video_path: str, audio_path: str = None) -> bool:
         return True
     except Exception as e:
         logger.error(f"Critical checks failed: {str(e)}")
-        raise
\ No newline at end of file
+        raise
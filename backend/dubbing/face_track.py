@@ -0,0 +1,222 @@
+import logging
+import uuid
+
+import numpy as np
+
+from .artifact_store import get_artifact_store
+
+logger = logging.getLogger(__name__)
+
+FACE_TRACK_FILENAME = "faces.npz"
+FACE_TRACK_PART_PATTERN = "faces-*.npz"  # Detections saved since the track was last compacted
+DETECTOR_NAME = "wav2lip-s3fd"
+SMOOTHING_WINDOW = 5
+
+
+class FaceTrack:
+    """
+    Raw face detections for the frames of a video.
+
+    ``rects`` is an (N, 4) int32 array of x1, y1, x2, y2 as returned by the
+    detector, unpadded and unsmoothed, so one track serves every quality
+    preset. ``has_face`` marks the frames where a face was found; the other
+    rows of ``rects`` are -1 and those frames are left untouched by lip sync.
+    ``detected`` marks the frames the detector has seen: a video's track is
+    filled in by sampling and by lip-sync chunks, so it can have gaps.
+    """
+
+    def __init__(self, rects, has_face, detected=None):
+        self.rects = np.asarray(rects, dtype=np.int32).reshape(-1, 4)
+        self.has_face = np.asarray(has_face, dtype=bool)
+        self.detected = np.ones(len(self.rects), dtype=bool) if detected is None else np.asarray(detected, dtype=bool)
+
+    def __len__(self):
+        return len(self.rects)
+
+    @classmethod
+    def empty(cls, length):
+        """A track of ``length`` frames the detector hasn't seen"""
+        return cls(np.full((length, 4), -1), np.zeros(length, dtype=bool), np.zeros(length, dtype=bool))
+
+    @classmethod
+    def from_detections(cls, detections):
+        """Build a track from per-frame detector output (a rect or None per frame)"""
+        has_face = np.array([rect is not None for rect in detections], dtype=bool)
+        rects = np.full((len(detections), 4), -1, dtype=np.int32)
+        if has_face.any():
+            rects[has_face] = np.array([rect[:4] for rect in detections if rect is not None], dtype=np.int32)
+        return cls(rects, has_face)
+
+    @property
+    def face_ratio(self):
+        return float(self.has_face[self.detected].mean()) if self.detected.any() else 0.0
+
+    def scaled(self, factor):
+        """The track for frames resized by ``1 / factor``"""
+        if factor == 1:
+            return self
+        rects = np.where(self.has_face[:, None], self.rects // factor, -1)
+        return FaceTrack(rects, self.has_face, self.detected)
+
+    def placed(self, frames, length):
+        """A ``length``-frame track with this track's rows at frame indexes ``frames``"""
+        track = FaceTrack.empty(length)
+        track.rects[frames], track.has_face[frames], track.detected[frames] = self.rects, self.has_face, True
+        return track
+
+    def slice(self, start, stop):
+        """Frames ``start`` to ``stop``, padded with undetected frames past the end"""
+        track = FaceTrack.empty(stop - start)
+        available = max(0, min(stop, len(self)) - start)
+        track.rects[:available] = self.rects[start:start + available]
+        track.has_face[:available] = self.has_face[start:start + available]
+        track.detected[:available] = self.detected[start:start + available]
+        return track
+
+    def merge(self, other):
+        """This track with ``other``'s detected frames laid over it"""
+        track = self.slice(0, max(len(self), len(other)))
+        rows = np.flatnonzero(other.detected)
+        track.rects[rows], track.has_face[rows], track.detected[rows] = other.rects[rows], other.has_face[rows], True
+        return track
+
+    def covers(self, start, stop):
+        """True when every frame from ``start`` to ``stop`` has been through the detector"""
+        return stop <= len(self) and bool(self.detected[start:stop].all())
+
+    def sampled_every(self, step):
+        """True when no ``step`` consecutive frames are missing a detection"""
+        rows = np.flatnonzero(self.detected)
+        if not len(rows):
+            return False
+        return int(np.diff(np.concatenate(([-1], rows, [len(self)]))).max()) <= step
+
+    def boxes(self, frame_size, pads=(0, 10, 0, 0), nosmooth=False):
+        """
+        Padded (and optionally smoothed) crop boxes, one per frame.
+
+        ``frame_size`` is (height, width); ``pads`` is (top, bottom, left,
+        right). Frames without a face get a -1 row.
+        """
+        height, width = frame_size
+        pad_top, pad_bottom, pad_left, pad_right = pads
+        boxes = np.stack([
+            np.maximum(0, self.rects[:, 0] - pad_left),
+            np.maximum(0, self.rects[:, 1] - pad_top),
+            np.minimum(width, self.rects[:, 2] + pad_right),
+            np.minimum(height, self.rects[:, 3] + pad_bottom),
+        ], axis=1).astype(np.float64)
+        if not nosmooth:
+            boxes = smooth_boxes(boxes, self.has_face)
+        boxes = boxes.astype(np.int32)
+        boxes[~self.has_face] = -1
+        return boxes
+
+    def save(self, path):
+        np.savez_compressed(path, rects=self.rects, has_face=self.has_face, detected=self.detected)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["rects"], data["has_face"], data["detected"] if "detected" in data.files else None)
+
+
+def smooth_boxes(boxes, valid=None, window=SMOOTHING_WINDOW):
+    """
+    Average each box with the next ``window - 1`` boxes (as inference.py
+    does) to reduce jitter, using only frames where a face was found.
+    """
+    valid = np.ones(len(boxes), dtype=bool) if valid is None else valid
+    weights = valid.astype(np.float64)
+    sums = np.concatenate((np.zeros((1, 4)), np.cumsum(boxes * weights[:, None], axis=0)))
+    counts = np.concatenate(([0.0], np.cumsum(weights)))
+    lo = np.minimum(np.arange(len(boxes)), max(len(boxes) - window, 0))
+    hi = np.minimum(lo + window, len(boxes))
+    count = counts[hi] - counts[lo]
+    smoothed = (sums[hi] - sums[lo]) / np.maximum(count, 1)[:, None]
+    return np.where((count > 0)[:, None], smoothed, boxes)
+
+
+def face_track_key(video_hash, resize_factor):
+    store = get_artifact_store()
+    return store.key("faces", video_hash, {"detector": DETECTOR_NAME, "resize_factor": resize_factor})
+
+
+def read_face_track(video_hash, resize_factor):
+    """
+    The stored track at one resize factor, merged from the compacted track
+    and the parts saved since, and the files it was read from.
+    """
+    store = get_artifact_store()
+    path = store.path(face_track_key(video_hash, resize_factor), FACE_TRACK_FILENAME)
+    if not path.parent.exists():
+        return None, []
+    track, paths = None, []
+    for file in [path, *sorted(path.parent.glob(FACE_TRACK_PART_PATTERN))]:
+        if not store.exists(file):
+            continue
+        try:
+            part = FaceTrack.load(file)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable face track {file}: {str(e)}")
+            continue
+        track = part if track is None else track.merge(part)
+        paths.append(file)
+    return track, paths
+
+
+def load_face_track(video_hash, resize_factor=1):
+    """
+    Cached track for a video at a resize factor, or None.
+
+    A full-resolution track is scaled down for a smaller resize factor,
+    so detecting once at full size serves the fast preset too.
+    """
+    if not video_hash:
+        return None
+    track = None
+    candidates = [1, resize_factor] if resize_factor != 1 else [1]
+    for factor in candidates:
+        found, _ = read_face_track(video_hash, factor)
+        if found is not None:
+            found = found.scaled(resize_factor) if factor != resize_factor else found
+            track = found if track is None else track.merge(found)
+    if track is not None:
+        logger.info(
+            f"Using cached face track ({int(track.detected.sum())} of {len(track)} frames detected, "
+            f"{track.face_ratio:.0%} with a face)"
+        )
+    return track
+
+
+def save_face_track(video_hash, resize_factor, track):
+    """
+    Add ``track``'s detected frames to the video's track. Each save is a
+    part file of its own, so concurrent lip-sync chunks don't overwrite each
+    other; ``compact_face_track`` folds the parts into one file.
+    """
+    if not video_hash:
+        return None
+    store = get_artifact_store()
+    path = store.path(face_track_key(video_hash, resize_factor), f"faces-{uuid.uuid4().hex}.npz")
+    with store.writing(path) as tmp_path:
+        track.save(tmp_path)
+    return path
+
+
+def compact_face_track(video_hash, resize_factor):
+    """Merge the video's saved parts into its track file"""
+    if not video_hash:
+        return None
+    track, paths = read_face_track(video_hash, resize_factor)
+    store = get_artifact_store()
+    path = store.path(face_track_key(video_hash, resize_factor), FACE_TRACK_FILENAME)
+    if track is None or paths == [path]:
+        return track
+    with store.writing(path) as tmp_path:
+        track.save(tmp_path)
+    for part in paths:
+        if part != path:
+            part.unlink(missing_ok=True)
+    return track
@@ -0,0 +1,12 @@
+import hashlib
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path, algorithm='sha256'):
+    """Hash file contents in fixed-size chunks"""
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
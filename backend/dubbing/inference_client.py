@@ -0,0 +1,119 @@
+import http.client
+import json
+import logging
+import socket
+import threading
+from urllib.parse import urlparse
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INFERENCE_SERVER_CONFIG = {
+    'ENABLED': False,
+    'URL': 'unix:///tmp/dubbing-inference.sock',  # or http://127.0.0.1:8765
+    'TIMEOUT': 600,
+    'BATCH_WINDOW_MS': 50,  # How long the server waits to fill a batch
+    'MAX_ASR_BATCH': 8,
+    'MAX_TTS_BATCH': 8,  # TTS requests taken per round; XTTS still decodes them one at a time
+}
+
+# Set inside the inference server process so its own calls run locally
+_serving = False
+
+
+def get_inference_server_config():
+    """Return INFERENCE_SERVER from settings merged over the defaults"""
+    config = dict(DEFAULT_INFERENCE_SERVER_CONFIG)
+    config.update(getattr(settings, 'INFERENCE_SERVER', {}) or {})
+    return config
+
+
+def use_inference_server():
+    """Whether ASR and TTS calls in this process go to the shared inference server"""
+    return not _serving and get_inference_server_config()['ENABLED']
+
+
+def mark_serving():
+    global _serving
+    _serving = True
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix domain socket"""
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class InferenceClient:
+    """
+    Thin client for the shared inference server (``manage.py run_inference_server``).
+
+    Requests from concurrent callers are batched by the server, so callers
+    should simply issue them in parallel.
+    """
+
+    def __init__(self, url=None, timeout=None):
+        config = get_inference_server_config()
+        self.url = urlparse(url or config['URL'])
+        self.timeout = timeout or config['TIMEOUT']
+
+    def _connection(self):
+        if self.url.scheme == 'unix':
+            return UnixHTTPConnection(self.url.path, timeout=self.timeout)
+        return http.client.HTTPConnection(self.url.hostname, self.url.port or 80, timeout=self.timeout)
+
+    def _request(self, method, path, body=None, content_type='application/json'):
+        connection = self._connection()
+        try:
+            connection.request(method, path, body=body, headers={'Content-Type': content_type} if body is not None else {})
+            response = connection.getresponse()
+            payload = json.loads(response.read() or b'{}')
+        except (OSError, http.client.HTTPException) as e:
+            raise ConnectionError(f"Inference server unreachable at {self.url.geturl()}: {str(e)}")
+        finally:
+            connection.close()
+        if response.status == 400:
+            raise ValueError(payload.get('error', 'Bad request'))
+        if response.status != 200:
+            raise RuntimeError(f"Inference server error: {payload.get('error', response.status)}")
+        return payload
+
+    def transcribe(self, audio):
+        """Whisper-style result dict for a 16 kHz mono float32 array"""
+        body = np.ascontiguousarray(audio, dtype='<f4').tobytes()
+        return self._request('POST', '/asr', body, content_type='application/octet-stream')
+
+    def synthesize(self, text, output_path, reference_audio, language=None):
+        """Synthesize ``text`` in the reference voice; the server writes ``output_path``"""
+        body = json.dumps({
+            "text": text,
+            "output_path": str(output_path),
+            "reference_audio": str(reference_audio),
+            "language": language,
+        }).encode('utf-8')
+        return self._request('POST', '/tts', body)['output_path']
+
+    def health(self):
+        return self._request('GET', '/health')
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_inference_client():
+    """Return the process-wide inference server client"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = InferenceClient()
+    return _client
@@ -0,0 +1,306 @@
+import json
+import logging
+import os
+import queue
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import numpy as np
+import torch
+
+from .inference_client import get_inference_server_config, mark_serving
+
+logger = logging.getLogger(__name__)
+
+TIME_PRECISION = 0.02  # Seconds per Whisper timestamp token
+# Batched results that look like this are redone with the full transcribe loop
+MAX_COMPRESSION_RATIO = 2.4
+MIN_AVG_LOGPROB = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+
+class Batcher:
+    """
+    Collects requests into batches for one model.
+
+    A single thread owns the model: it takes the first waiting request, keeps
+    collecting for up to ``window`` seconds or ``max_size`` requests, then
+    calls ``handler`` with the whole batch. ``handler`` returns one result
+    (or exception) per item.
+    """
+
+    def __init__(self, name, handler, window, max_size):
+        self.name = name
+        self.handler = handler
+        self.window = window
+        self.max_size = max_size
+        self.queue = queue.Queue()
+        self.stats = {"requests": 0, "batches": 0, "max_batch": 0}
+        self.thread = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self.thread.start()
+
+    def submit(self, item):
+        future = Future()
+        self.queue.put((item, future))
+        return future.result()
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            try:
+                results = self.handler([item for item, _ in batch])
+            except Exception as e:
+                logger.error(f"{self.name} batch of {len(batch)} failed: {str(e)}")
+                results = [e] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+def segments_from_tokens(tokens, tokenizer, duration):
+    """Turn a decoded token sequence with timestamp tokens into start/end/text segments"""
+    segments = []
+    start = None
+    text_tokens = []
+    for token in tokens:
+        if token >= tokenizer.timestamp_begin:
+            time_ = (token - tokenizer.timestamp_begin) * TIME_PRECISION
+            if start is not None and text_tokens:
+                segments.append({"start": start, "end": min(time_, duration), "text": tokenizer.decode(text_tokens)})
+                text_tokens = []
+                start = None
+            else:
+                start = time_
+        elif token < tokenizer.eot:
+            text_tokens.append(token)
+    if text_tokens:
+        segments.append({"start": start or 0.0, "end": duration, "text": tokenizer.decode(text_tokens)})
+    return [seg for seg in segments if seg["text"].strip()]
+
+
+def transcribe_batch(audios):
+    """
+    Encode every clip of up to 30 s in one batched Whisper pass and decode
+    them (batched when greedy); longer clips, word-timestamp requests and
+    low-confidence results use the full ``transcribe`` loop.
+    """
+    import whisper
+    from whisper.tokenizer import get_tokenizer
+    from .audio_utils import run_whisper
+    from .model_registry import decoding_options, get_whisper_config, get_whisper_model, whisper_model_key
+
+    _, _, precision = whisper_model_key()
+    model = get_whisper_model()
+    results = [None] * len(audios)
+    short = []
+    if not get_whisper_config()['WORD_TIMESTAMPS']:
+        short = [i for i, audio in enumerate(audios) if 0 < len(audio) <= whisper.audio.N_SAMPLES]
+
+    if short:
+        mel = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(audios[i])), model.dims.n_mels)
+            for i in short
+        ]).to(model.device)
+        options = whisper.DecodingOptions(
+            language='en', task='transcribe', without_timestamps=False, **decoding_options(precision)
+        )
+        tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages, language='en', task='transcribe')
+        with torch.inference_mode():
+            # One encoder pass for the whole batch; Whisper's beam search only
+            # supports a batch of one, so beam decoding then runs per clip
+            features = model.encoder(mel.half() if options.fp16 else mel)
+            if options.beam_size:
+                decoded = [whisper.decode(model, feature, options) for feature in features]
+            else:
+                decoded = whisper.decode(model, features, options)
+        for i, result in zip(short, decoded):
+            if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < MIN_AVG_LOGPROB:
+                results[i] = {"text": "", "segments": []}
+            elif result.compression_ratio <= MAX_COMPRESSION_RATIO and result.avg_logprob >= MIN_AVG_LOGPROB:
+                segments = segments_from_tokens(result.tokens, tokenizer, len(audios[i]) / whisper.audio.SAMPLE_RATE)
+                results[i] = {"text": result.text, "segments": segments}
+
+    for i, audio in enumerate(audios):
+        if results[i] is None:
+            try:
+                result = run_whisper(audio)
+                results[i] = {
+                    "text": result["text"],
+                    "segments": [
+                        {key: seg[key] for key in ("start", "end", "text", "words") if key in seg}
+                        for seg in result.get("segments", [])
+                    ],
+                }
+            except Exception as e:
+                results[i] = e
+    return results
+
+
+def synthesize_grouped(requests):
+    """
+    Synthesize a round of TTS requests one at a time. XTTS decodes a single
+    text per call, so nothing is batched on the GPU: requests are grouped by
+    speaker so each voice's conditioning is looked up (and hashed) once per
+    round, and the batcher keeps every call on the thread that owns the model.
+    """
+    from .tts_engine import get_tts_engine
+
+    engine = get_tts_engine()
+    groups = OrderedDict()
+    for i, request in enumerate(requests):
+        groups.setdefault(request["reference_audio"], []).append(i)
+
+    results = [None] * len(requests)
+    for reference_audio, indexes in groups.items():
+        try:
+            if not os.path.exists(reference_audio):
+                raise ValueError(f"Reference audio not found: {reference_audio}")
+            conditioning = engine.get_conditioning(reference_audio)
+        except Exception as e:
+            for i in indexes:
+                results[i] = e
+            continue
+        for i in indexes:
+            request = requests[i]
+            try:
+                engine.synthesize_to_file(
+                    text=request["text"],
+                    output_path=request["output_path"],
+                    reference_audio=reference_audio,
+                    language=request.get("language"),
+                    conditioning=conditioning,
+                )
+                results[i] = {"output_path": request["output_path"]}
+            except Exception as e:
+                results[i] = e
+    return results
+
+
+def media_path(path):
+    """
+    Resolve a client-supplied path, which must be inside MEDIA_ROOT or the
+    artifact store; ValueError otherwise, so clients can't read or write
+    arbitrary files through the server.
+    """
+    from django.conf import settings
+    from .artifact_store import get_artifact_store_config
+
+    resolved = os.path.realpath(str(path))
+    for root in (settings.MEDIA_ROOT, get_artifact_store_config()['ROOT']):
+        root = os.path.realpath(str(root))
+        if resolved.startswith(root + os.sep):
+            return resolved
+    raise ValueError(f"Path is outside the media root: {path}")
+
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def do_GET(self):
+        if self.path != '/health':
+            return self._send(404, {"error": "Not found"})
+        from .model_registry import get_registry
+        self._send(200, {
+            "asr": self.server.asr.stats,
+            "tts": self.server.tts.stats,
+            "models": get_registry().stats(),
+        })
+
+    def do_POST(self):
+        try:
+            if self.path == '/asr':
+                audio = np.frombuffer(self._body(), dtype='<f4').copy()
+                return self._send(200, self.server.asr.submit(audio))
+            if self.path == '/tts':
+                request = json.loads(self._body())
+                if not request.get("text") or not request.get("output_path") or not request.get("reference_audio"):
+                    raise ValueError("text, output_path and reference_audio are required")
+                request["output_path"] = media_path(request["output_path"])
+                request["reference_audio"] = media_path(request["reference_audio"])
+                return self._send(200, self.server.tts.submit(request))
+            self._send(404, {"error": "Not found"})
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+        except Exception as e:
+            logger.exception(f"Inference request {self.path} failed")
+            self._send(500, {"error": str(e)})
+
+
+class UnixInferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(url=None, config=None):
+    """Build the HTTP server for ``url`` (unix:///path or http://host:port) with its batchers"""
+    config = config or get_inference_server_config()
+    parsed = urlparse(url or config['URL'])
+    if parsed.scheme == 'unix':
+        if os.path.exists(parsed.path):
+            os.remove(parsed.path)
+        server = UnixInferenceServer(parsed.path, InferenceHandler)
+    else:
+        server = ThreadingHTTPServer((parsed.hostname, parsed.port or 80), InferenceHandler)
+        server.daemon_threads = True
+    window = config['BATCH_WINDOW_MS'] / 1000
+    server.asr = Batcher("asr", transcribe_batch, window, config['MAX_ASR_BATCH'])
+    server.tts = Batcher("tts", synthesize_grouped, window, config['MAX_TTS_BATCH'])
+    return server
+
+
+def serve(url=None, preload=True):
+    """Run the inference server until interrupted; owns the only copy of the models"""
+    mark_serving()
+    config = get_inference_server_config()
+    url = url or config['URL']
+    if preload:
+        from .model_registry import get_whisper_model
+        from .tts_engine import get_tts_engine
+        get_whisper_model()
+        get_tts_engine().model
+    server = make_server(url, config)
+    logger.info(f"Inference server listening on {url}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        parsed = urlparse(url)
+        if parsed.scheme == 'unix' and os.path.exists(parsed.path):
+            os.remove(parsed.path)
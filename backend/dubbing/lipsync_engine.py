@@ -0,0 +1,349 @@
+import importlib
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+
+import numpy as np
+import torch
+from django.conf import settings
+
+from .audio_ingest import find_tool
+from .face_track import FaceTrack, load_face_track, save_face_track
+from .video_utils import CLIP_AUDIO_CODEC, CLIP_TIMESCALE, CLIP_VIDEO_CODEC
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIPSYNC_CONFIG = {
+    'ENGINE': 'inprocess',  # inprocess | subprocess
+    'SUBPROCESS_FALLBACK': True,  # Use inference.py when the in-process engine can't be set up
+    'WAV2LIP_PATH': os.getenv('WAV2LIP_PATH'),
+    'CHECKPOINT': None,  # None = <WAV2LIP_PATH>/checkpoints/wav2lip_gan.pth
+    'BATCH_SIZE': 16,
+    'FACE_DET_BATCH_SIZE': 16,
+    'PRELOAD': False,
+    'PARTIAL': True,  # Only lip-sync spans that have both dubbed speech and a visible face
+    'PARTIAL_MIN_GAP_SECONDS': 1.0,  # Shorter gaps between lip-sync spans are lip-synced too
+    'PARTIAL_MAX_COVERAGE': 0.8,  # Lip-sync the whole video when spans cover more than this share
+    'FACE_SAMPLE_SECONDS': 0.5,  # Face timeline resolution when no face track is cached
+    'PARALLEL_WORKERS': None,  # Lip-sync processes per job; None = one per GPU, or half the cores on CPU
+    'PARALLEL_THREADS': None,  # torch threads in each lip-sync process; None = cores / workers
+    'CHUNK_SECONDS': 30,  # Lip-sync spans are split into chunks of about this length
+}
+
+IMG_SIZE = 96
+MEL_STEP_SIZE = 16
+MEL_FRAMES_PER_SECOND = 80.0
+
+# Same knobs inference.py gets on the command line for each quality level
+QUALITY_PRESETS = {
+    "fast": {"resize_factor": 2, "pads": (0, 10, 0, 0), "nosmooth": False},
+    "medium": {"resize_factor": 1, "pads": (0, 10, 0, 0), "nosmooth": True},
+    "high": {"resize_factor": 1, "pads": (0, 20, 0, 0), "nosmooth": False},
+}
+
+
+def get_lipsync_config():
+    """Return LIPSYNC_CONFIG from settings merged over the defaults"""
+    config = dict(DEFAULT_LIPSYNC_CONFIG)
+    config.update(getattr(settings, 'LIPSYNC_CONFIG', {}) or {})
+    if not config['CHECKPOINT'] and config['WAV2LIP_PATH']:
+        config['CHECKPOINT'] = os.path.join(config['WAV2LIP_PATH'], 'checkpoints', 'wav2lip_gan.pth')
+    return config
+
+
+def import_wav2lip(name, wav2lip_path=None):
+    """Import a module from the Wav2Lip checkout (its modules use top-level imports)"""
+    wav2lip_path = wav2lip_path or get_lipsync_config()['WAV2LIP_PATH']
+    if not wav2lip_path or not os.path.isdir(wav2lip_path):
+        raise ImportError(f"Wav2Lip checkout not found (WAV2LIP_PATH={wav2lip_path})")
+    if wav2lip_path not in sys.path:
+        sys.path.insert(0, wav2lip_path)
+    return importlib.import_module(name)
+
+
+def load_wav2lip_model(checkpoint_path, device):
+    """Load the Wav2Lip generator from a training checkpoint"""
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        raise FileNotFoundError(f"Wav2Lip checkpoint not found at: {checkpoint_path}")
+    Wav2Lip = import_wav2lip('models').Wav2Lip
+    checkpoint = torch.load(checkpoint_path, map_location=device)
+    state_dict = {k.replace('module.', ''): v for k, v in checkpoint["state_dict"].items()}
+    model = Wav2Lip()
+    model.load_state_dict(state_dict)
+    return model.to(device).eval()
+
+
+def mel_chunks(mel, fps):
+    """Cut a mel spectrogram into one MEL_STEP_SIZE window per video frame (as inference.py does)"""
+    multiplier = MEL_FRAMES_PER_SECOND / fps
+    if not mel.shape[1]:
+        raise ValueError("No audio to lip-sync")
+    if mel.shape[1] < MEL_STEP_SIZE:
+        # Audio shorter than one window: hold its last column so there is a whole window
+        mel = np.pad(mel, ((0, 0), (0, MEL_STEP_SIZE - mel.shape[1])), mode='edge')
+    chunks = []
+    i = 0
+    while True:
+        start = int(i * multiplier)
+        if start + MEL_STEP_SIZE > mel.shape[1]:
+            chunks.append(mel[:, mel.shape[1] - MEL_STEP_SIZE:])
+            return chunks
+        chunks.append(mel[:, start:start + MEL_STEP_SIZE])
+        i += 1
+
+
+class Wav2LipEngine:
+    """
+    Wav2Lip kept resident in a worker process.
+
+    ``model`` and ``face_detector`` are loaded from the Wav2Lip checkout on
+    first use, or can be passed in (any callable ``model(mel_batch,
+    img_batch)`` and any object with ``get_detections_for_batch(images)``),
+    which is how the engine runs with stubs on CPU.
+    """
+
+    def __init__(self, model=None, face_detector=None, device=None, config=None):
+        self.config = config or get_lipsync_config()
+        self.device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
+        self._model = model
+        self._face_detector = face_detector
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                logger.info(f"Loading Wav2Lip checkpoint {self.config['CHECKPOINT']} on {self.device}")
+                self._model = load_wav2lip_model(self.config['CHECKPOINT'], self.device)
+        return self._model
+
+    @property
+    def face_detector(self):
+        with self._lock:
+            if self._face_detector is None:
+                face_detection = import_wav2lip('face_detection')
+                self._face_detector = face_detection.FaceAlignment(
+                    face_detection.LandmarksType._2D, flip_input=False, device=self.device
+                )
+        return self._face_detector
+
+    def melspectrogram(self, audio_path):
+        """Mel spectrogram of an audio file, computed with Wav2Lip's own audio parameters"""
+        audio = import_wav2lip('audio')
+        mel = audio.melspectrogram(audio.load_wav(str(audio_path), 16000))
+        if np.isnan(mel.reshape(-1)).sum() > 0:
+            raise ValueError("Mel spectrogram contains NaN; try adding a small amount of noise to the audio")
+        return mel
+
+    def detect_faces(self, frames):
+        """Run the face detector over every frame; returns a FaceTrack"""
+        batch_size = self.config['FACE_DET_BATCH_SIZE']
+        while True:
+            try:
+                rects = []
+                for i in range(0, len(frames), batch_size):
+                    rects.extend(self.face_detector.get_detections_for_batch(np.array(frames[i:i + batch_size])))
+                break
+            except RuntimeError:
+                if batch_size == 1:
+                    raise RuntimeError("Image too big to run face detection on GPU")
+                batch_size //= 2
+                logger.warning(f"Face detection ran out of memory, retrying with batch size {batch_size}")
+
+        track = FaceTrack.from_detections(rects)
+        logger.info(f"Detected faces in {track.face_ratio:.0%} of {len(track)} frames")
+        return track
+
+    def sample_faces(self, video_path, every_seconds=0.5, resize_factor=1, video_hash=None):
+        """
+        Detect faces on one frame every ``every_seconds``, a cheap face
+        timeline for planning. Returns a track of every frame of the video
+        with the sampled ones detected, and adds them to the video's cached
+        track when ``video_hash`` is given.
+        """
+        import cv2
+
+        capture = cv2.VideoCapture(str(video_path))
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        step = max(1, int(round(every_seconds * fps)))
+        frames, indexes = [], []
+        index = 0
+        while capture.grab():
+            if index % step == 0:
+                ok, frame = capture.retrieve()
+                if ok:
+                    if resize_factor > 1:
+                        height, width = frame.shape[:2]
+                        frame = cv2.resize(frame, (width // resize_factor, height // resize_factor))
+                    frames.append(frame)
+                    indexes.append(index)
+            index += 1
+        capture.release()
+        if not frames:
+            return FaceTrack.empty(index)
+        track = self.detect_faces(frames).placed(np.asarray(indexes), index)
+        save_face_track(video_hash, resize_factor, track)
+        return track
+
+    def face_track(self, frames, video_hash=None, resize_factor=1, frame_offset=0):
+        """
+        Track of ``frames``, which start at ``frame_offset`` in the video: sliced
+        from the video's cached track, detecting (and caching) only the frames
+        it hasn't seen yet.
+        """
+        stop = frame_offset + len(frames)
+        cached = load_face_track(video_hash, resize_factor)
+        track = cached.slice(frame_offset, stop) if cached is not None else FaceTrack.empty(len(frames))
+        missing = np.flatnonzero(~track.detected)
+        if len(missing):
+            detected = self.detect_faces([frames[i] for i in missing])
+            save_face_track(video_hash, resize_factor, detected.placed(missing + frame_offset, stop))
+            track = track.merge(detected.placed(missing, len(frames)))
+        return track
+
+    def _predict(self, mels, faces):
+        faces = np.asarray(faces)
+        masked = faces.copy()
+        masked[:, IMG_SIZE // 2:] = 0
+        img_batch = np.concatenate((masked, faces), axis=3) / 255.
+        mel_batch = np.reshape(mels, [len(mels), mels[0].shape[0], mels[0].shape[1], 1])
+        img_batch = torch.FloatTensor(np.transpose(img_batch, (0, 3, 1, 2))).to(self.device)
+        mel_batch = torch.FloatTensor(np.transpose(mel_batch, (0, 3, 1, 2))).to(self.device)
+        with torch.inference_mode():
+            pred = self.model(mel_batch, img_batch)
+        return pred.cpu().numpy().transpose(0, 2, 3, 1) * 255.
+
+    def generate(self, frames, mels, pads=(0, 10, 0, 0), nosmooth=False, track=None, progress_callback=None):
+        """
+        Yield one lip-synced BGR frame per mel chunk.
+
+        ``frames`` are BGR uint8 arrays and are reused in order (looping if
+        the audio is longer); ``mels`` are (80, MEL_STEP_SIZE) windows from
+        ``mel_chunks``. Frames the face ``track`` marks as faceless are
+        yielded unchanged. ``progress_callback(percent)`` is called after
+        each batch.
+        """
+        import cv2
+
+        if track is None:
+            track = self.detect_faces(frames[:len(mels)])
+        boxes = track.boxes(frames[0].shape[:2], pads, nosmooth)
+        total = len(mels)
+        batch_size = self.config['BATCH_SIZE']
+        for lo in range(0, total, batch_size):
+            batch = []
+            for i in range(lo, min(lo + batch_size, total)):
+                index = i % min(len(frames), len(boxes))
+                batch.append((i, frames[index], boxes[index], track.has_face[index]))
+
+            faces = [
+                cv2.resize(frame[y1:y2, x1:x2], (IMG_SIZE, IMG_SIZE))
+                for _, frame, (x1, y1, x2, y2), has_face in batch if has_face
+            ]
+            preds = iter(self._predict(
+                [mels[i] for i, _, _, has_face in batch if has_face], faces
+            ) if faces else [])
+            for _, frame, (x1, y1, x2, y2), has_face in batch:
+                if not has_face:
+                    yield frame
+                    continue
+                out = frame.copy()
+                out[y1:y2, x1:x2] = cv2.resize(next(preds).astype(np.uint8), (x2 - x1, y2 - y1))
+                yield out
+
+            if progress_callback:
+                progress_callback(int(min(lo + batch_size, total) / total * 100))
+
+    def run(self, video_path, audio_path, output_path, quality="medium", progress_callback=None, video_hash=None,
+            frame_offset=0):
+        """
+        Lip-sync ``video_path`` to ``audio_path`` and write an mp4 with that audio to ``output_path``.
+
+        With ``video_hash`` the face track is cached in the artifact store
+        and reused by later runs on the same video at any quality. A chunk
+        cut from that video passes its first frame's index as ``frame_offset``.
+        """
+        import cv2
+
+        preset = QUALITY_PRESETS.get(quality, QUALITY_PRESETS["medium"])
+        capture = cv2.VideoCapture(str(video_path))
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        frames = []
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if preset["resize_factor"] > 1:
+                height, width = frame.shape[:2]
+                frame = cv2.resize(frame, (width // preset["resize_factor"], height // preset["resize_factor"]))
+            frames.append(frame)
+        capture.release()
+        if not frames:
+            raise ValueError(f"No video frames could be read from {video_path}")
+
+        mel = self.melspectrogram(audio_path)
+        mels = mel_chunks(mel, fps)
+        # inference.py stops a mel window short of the end; repeat the last
+        # window so the video is as long as its audio (clips must line up)
+        needed = int(round(mel.shape[1] / MEL_FRAMES_PER_SECOND * fps))
+        mels += mels[-1:] * (needed - len(mels))
+        track = self.face_track(frames, video_hash, preset["resize_factor"], frame_offset)
+        logger.info(f"Wav2Lip: {len(frames)} frames at {fps:.2f} fps, {len(mels)} mel chunks")
+        height, width = frames[0].shape[:2]
+        command = [
+            find_tool('ffmpeg'), '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+            '-i', str(audio_path),
+            '-map', '0:v', '-map', '1:a', *CLIP_VIDEO_CODEC, *CLIP_AUDIO_CODEC, *CLIP_TIMESCALE, '-shortest',
+            str(output_path),
+        ]
+        os.makedirs(os.path.dirname(str(output_path)) or '.', exist_ok=True)
+        # Frames are piped straight into the encoder, no intermediate .avi
+        with tempfile.TemporaryFile() as stderr_file:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=stderr_file)
+            try:
+                for frame in self.generate(
+                    frames[:len(mels)], mels, preset["pads"], preset["nosmooth"], track, progress_callback
+                ):
+                    process.stdin.write(frame.tobytes())
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            except BaseException:
+                process.kill()
+                process.wait()
+                raise
+            if process.wait() != 0:
+                stderr_file.seek(0)
+                raise RuntimeError(f"FFmpeg failed: {stderr_file.read().decode(errors='replace')}")
+        return output_path
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_lipsync_engine():
+    """Return the process-wide Wav2Lip engine"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = Wav2LipEngine()
+    return _engine
+
+
+def warm_up_lipsync():
+    """Load Wav2Lip and the face detector on worker start when LIPSYNC_CONFIG['PRELOAD'] is set"""
+    config = get_lipsync_config()
+    if not config['PRELOAD'] or config['ENGINE'] != 'inprocess':
+        return
+    try:
+        engine = get_lipsync_engine()
+        engine.model
+        engine.face_detector
+        logger.info("Wav2Lip warm-up complete")
+    except Exception as e:
+        logger.error(f"Wav2Lip warm-up failed: {str(e)}")
@@ -4,6 +4,7 @@ from pathlib import Path
 import logging
 import sys
 import torch
+from .lipsync_engine import get_lipsync_config, get_lipsync_engine
 
 logger = logging.getLogger(__name__)
 
@@ -15,12 +16,12 @@ def check_wav2lip_dependencies():
         logger.info(f"CUDA available: {cuda_available}")
 
         # Check Wav2Lip installation
-        wav2lip_path = os.getenv('WAV2LIP_PATH')
-        if not wav2lip_path:
+        config = get_lipsync_config()
+        if not config['WAV2LIP_PATH']:
             raise EnvironmentError("WAV2LIP_PATH environment variable is not set")
 
         # Check model checkpoint
-        checkpoint_path = os.path.join(wav2lip_path, r"C:\Users\NISHAKART\Documents\GitHub\VoiceFusionAi-ML\backend\Wav2Lip\checkpoints\wav2lip_gan.pth")
+        checkpoint_path = config['CHECKPOINT']
         if not os.path.exists(checkpoint_path):
             raise FileNotFoundError(f"Wav2Lip model checkpoint not found at: {checkpoint_path}")
 
@@ -29,8 +30,34 @@ def check_wav2lip_dependencies():
         logger.error(f"Wav2Lip dependency check failed: {str(e)}")
         raise
 
-def run_wav2lip(video_path, audio_path, output_path, quality="medium", progress_callback=None):
-    """Run Wav2Lip to synchronize lip movements with audio"""
+def run_wav2lip(video_path, audio_path, output_path, quality="medium", progress_callback=None, video_hash=None,
+                frame_offset=0):
+    """
+    Run Wav2Lip to synchronize lip movements with audio.
+
+    Uses the resident in-process engine unless LIPSYNC_CONFIG['ENGINE'] is
+    ``subprocess``; if the engine can't be set up (no checkout, checkpoint
+    or face detector) it falls back to running ``inference.py``. Passing
+    ``video_hash`` lets the engine reuse the video's cached face track, from
+    ``frame_offset`` on for a chunk of that video.
+    """
+    config = get_lipsync_config()
+    if config['ENGINE'] == 'inprocess':
+        try:
+            get_lipsync_engine().run(
+                video_path, audio_path, output_path, quality, progress_callback, video_hash, frame_offset
+            )
+            logger.info("Wav2Lip processing completed successfully")
+            return True
+        except (ImportError, FileNotFoundError) as e:
+            if not config['SUBPROCESS_FALLBACK']:
+                logger.error(f"In-process Wav2Lip unavailable: {str(e)}")
+                raise
+            logger.warning(f"In-process Wav2Lip unavailable ({str(e)}), falling back to inference.py")
+    return run_wav2lip_subprocess(video_path, audio_path, output_path, quality, progress_callback)
+
+def run_wav2lip_subprocess(video_path, audio_path, output_path, quality="medium", progress_callback=None):
+    """Run Wav2Lip's inference.py in a child process and scrape progress from its output"""
     try:
         # Check dependencies first
         check_wav2lip_dependencies()
@@ -45,11 +72,12 @@ def run_wav2lip(video_path, audio_path, output_path, quality="medium", progress_
         os.makedirs(output_dir, exist_ok=True)
         
         # Get Wav2Lip path from environment variable or use default
-        wav2lip_path = os.getenv('WAV2LIP_PATH')
+        config = get_lipsync_config()
+        wav2lip_path = config['WAV2LIP_PATH']
         if not wav2lip_path:
             raise EnvironmentError("WAV2LIP_PATH environment variable is not set")
         
-        checkpoint_path = os.path.join(wav2lip_path, r"C:\Users\NISHAKART\Documents\GitHub\VoiceFusionAi-ML\backend\Wav2Lip\checkpoints\wav2lip_gan.pth")
+        checkpoint_path = config['CHECKPOINT']
         if not os.path.exists(checkpoint_path):
             raise FileNotFoundError(f"Wav2Lip checkpoint not found at: {checkpoint_path}")
         
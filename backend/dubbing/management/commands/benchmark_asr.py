@@ -0,0 +1,68 @@
+import difflib
+import gc
+import time
+
+import torch
+from django.core.management.base import BaseCommand, CommandError
+
+from dubbing.audio_ingest import ASR_SAMPLE_RATE, decode_audio
+from dubbing.model_registry import PRECISIONS, decoding_options, load_whisper_model
+
+
+class Command(BaseCommand):
+    help = "Benchmark Whisper model sizes, precisions and beam sizes on CPU against a sample file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('media', help="Audio or video file to transcribe")
+        parser.add_argument('--models', nargs='+', default=['tiny.en', 'base'])
+        parser.add_argument('--precisions', nargs='+', default=['fp32', 'int8'], choices=PRECISIONS)
+        parser.add_argument('--beams', nargs='+', type=int, default=[5, 1], help="1 = greedy")
+        parser.add_argument('--seconds', type=float, default=120, help="Benchmark on the first N seconds")
+        parser.add_argument('--threads', type=int, default=None, help="torch threads (default: torch's choice)")
+        parser.add_argument('--device', default='cpu')
+
+    def handle(self, *args, **options):
+        if options['threads']:
+            torch.set_num_threads(options['threads'])
+        try:
+            audio = decode_audio(options['media']).asr_view()
+        except (RuntimeError, ValueError) as e:
+            raise CommandError(str(e))
+        audio = audio[:int(options['seconds'] * ASR_SAMPLE_RATE)]
+        duration = len(audio) / ASR_SAMPLE_RATE
+        self.stdout.write(f"Benchmarking on {duration:.1f}s of audio, {torch.get_num_threads()} torch threads")
+
+        rows = []
+        for model_size in options['models']:
+            baseline = None
+            for precision in options['precisions']:
+                started = time.monotonic()
+                model = load_whisper_model(model_size, options['device'], precision)
+                load_seconds = time.monotonic() - started
+
+                for beam_size in options['beams']:
+                    started = time.monotonic()
+                    result = model.transcribe(
+                        audio, **decoding_options(precision, beam_size), language='en', task='transcribe',
+                    )
+                    elapsed = time.monotonic() - started
+                    words = result["text"].split()
+                    # The first variant of each model (fp32 + widest beam by default) is the reference
+                    if baseline is None:
+                        baseline = words
+                    agreement = difflib.SequenceMatcher(None, baseline, words).ratio()
+                    rows.append((model_size, precision, beam_size, load_seconds, elapsed, elapsed / duration, agreement))
+                    self.stdout.write(
+                        f"{model_size} {precision} beam={beam_size}: {elapsed:.1f}s "
+                        f"(RTF {elapsed / duration:.3f}, agreement {agreement:.1%})"
+                    )
+                del model
+                gc.collect()
+
+        self.stdout.write("")
+        self.stdout.write(f"{'model':<10}{'precision':<11}{'beam':>5}{'load s':>9}{'asr s':>9}{'RTF':>8}{'agree':>8}")
+        for model_size, precision, beam_size, load_seconds, elapsed, rtf, agreement in rows:
+            self.stdout.write(
+                f"{model_size:<10}{precision:<11}{beam_size:>5}{load_seconds:>9.1f}{elapsed:>9.1f}"
+                f"{rtf:>8.3f}{agreement:>8.1%}"
+            )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from dubbing.inference_server import serve
+
+
+class Command(BaseCommand):
+    help = "Run the shared Whisper/XTTS inference server that batches requests from all workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=None, help="unix:///path/to.sock or http://host:port (default: INFERENCE_SERVER['URL'])")
+        parser.add_argument('--no-preload', action='store_true', help="Load models on first request instead of at start")
+
+    def handle(self, *args, **options):
+        try:
+            serve(options['url'], preload=not options['no_preload'])
+        except KeyboardInterrupt:
+            self.stdout.write("Inference server stopped")
@@ -0,0 +1,42 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dubbing.tasks import get_stage_task_config
+
+
+class Command(BaseCommand):
+    help = "Run a Celery worker for pipeline queues (io, asr, tts, lipsync), sized from STAGE_TASK_CONFIG"
+
+    def add_arguments(self, parser):
+        parser.add_argument('queues', nargs='+', help="Queues to consume, e.g. `tts` or `io asr`")
+        parser.add_argument('--concurrency', type=int, default=None, help="Override the queues' concurrency")
+        parser.add_argument('--pool', default=None, help="Override the queues' pool (prefork, threads, solo)")
+        parser.add_argument('--loglevel', default='info')
+
+    def handle(self, *args, **options):
+        sizes = get_stage_task_config()['QUEUES']
+        unknown = [queue for queue in options['queues'] if queue not in sizes]
+        if unknown:
+            raise CommandError(f"Unknown queues: {', '.join(unknown)} (configured: {', '.join(sizes)})")
+
+        queues = options['queues']
+        concurrency = options['concurrency'] or max(sizes[queue]['concurrency'] for queue in queues)
+        prefetch = min(sizes[queue]['prefetch'] for queue in queues)
+        # Threads as soon as one queue needs them: its tasks start process pools of their own
+        pools = {sizes[queue].get('pool', 'prefork') for queue in queues}
+        pool = options['pool'] or next((pool for pool in ('threads', 'solo') if pool in pools), 'prefork')
+        # Read by warm_up_worker_models so each worker only loads the models its queues use
+        os.environ['DUBBING_WORKER_QUEUES'] = ','.join(queues)
+        os.environ['DUBBING_WORKER_POOL'] = pool
+
+        from backend_manager.celery import app
+        app.worker_main([
+            'worker',
+            '--queues', ','.join(queues),
+            '--concurrency', str(concurrency),
+            '--pool', pool,
+            '--prefetch-multiplier', str(prefetch),
+            '--hostname', f"{'+'.join(queues)}@%h",
+            '--loglevel', options['loglevel'],
+        ])
@@ -0,0 +1,184 @@
+import logging
+import mimetypes
+import os
+import re
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core import signing
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from django.utils.http import content_disposition_header, http_date, parse_etags, parse_http_date_safe
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DELIVERY_CONFIG = {
+    'OFFLOAD': None,  # 'nginx' (X-Accel-Redirect), 'sendfile' (X-Sendfile) or None to stream from Django
+    'INTERNAL_PREFIX': '/protected-media/',  # nginx `internal` location aliased to MEDIA_ROOT
+    'MAX_AGE': 3600,
+    'READ_SIZE': 256 * 1024,
+    'URL_LIFETIME': 3600,  # Signed media URLs stay valid for one to two lifetimes (seconds)
+}
+
+MEDIA_SIGNING_SALT = 'dubbing.job-media'
+
+# URL name of each deliverable job file -> DubbingJob field
+JOB_MEDIA = {
+    'video': 'video_file',
+    'result': 'result_file',
+    'extracted-audio': 'extracted_audio',
+    'dubbed-audio': 'dubbed_audio_file',
+}
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def get_delivery_config():
+    """Return MEDIA_DELIVERY from settings merged over the defaults"""
+    config = dict(DEFAULT_DELIVERY_CONFIG)
+    config.update(getattr(settings, 'MEDIA_DELIVERY', {}) or {})
+    return config
+
+
+def media_signature(job_id, kind, expires):
+    return signing.Signer(salt=MEDIA_SIGNING_SALT).signature(f"{job_id}:{kind}:{expires}")
+
+
+def job_media_url(job, kind, config=None):
+    """
+    Signed delivery URL of one of a job's files, or None if the job doesn't
+    have it. ``<video>`` and ``<audio>`` can't send the auth token, so the
+    URL carries a signature instead. Expiry is rounded up to URL_LIFETIME,
+    keeping the URL (and the browser's cached copy) stable between polls.
+    """
+    if not getattr(job, JOB_MEDIA[kind]):
+        return None
+    lifetime = (config or get_delivery_config())['URL_LIFETIME']
+    expires = (int(time.time()) // lifetime + 2) * lifetime
+    query = urlencode({'expires': expires, 'sig': media_signature(job.id, kind, expires)})
+    return f"{reverse('job-media', args=[job.id, kind])}?{query}"
+
+
+def has_media_signature(request, job_id, kind):
+    """True when the request carries an unexpired signature for this job's ``kind`` file"""
+    try:
+        expires = int(request.GET.get('expires', ''))
+    except ValueError:
+        return False
+    return expires > time.time() and constant_time_compare(
+        request.GET.get('sig', ''), media_signature(job_id, kind, expires)
+    )
+
+
+def file_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def not_modified(request, etag, last_modified):
+    """True when the client's cached copy (If-None-Match / If-Modified-Since) is current"""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        return '*' in etags or etag in etags or f'W/{etag}' in etags
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and int(last_modified) <= since
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single ``bytes=`` range, None to send the
+    whole file (no header, or several ranges), or False if unsatisfiable.
+    """
+    match = RANGE.match(header.strip()) if header else None
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        return (max(0, size - length), size - 1) if length and size else False
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def read_range(path, start, length, read_size):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            data = f.read(min(read_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def serve_media(request, name, as_attachment=False, config=None):
+    """
+    Serve ``name`` (relative to MEDIA_ROOT) with ETag/Last-Modified
+    revalidation and single byte-range requests (206), so players can seek.
+
+    With OFFLOAD set, only headers are produced and the front proxy sends
+    the bytes (and handles Range itself), keeping Django workers free.
+    """
+    config = config or get_delivery_config()
+    root = os.path.realpath(settings.MEDIA_ROOT)
+    path = os.path.realpath(os.path.join(root, str(name)))
+    if not path.startswith(root + os.sep) or not os.path.isfile(path):
+        return None
+
+    stat = os.stat(path)
+    etag = file_etag(stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': f"private, max-age={config['MAX_AGE']}",
+        'Accept-Ranges': 'bytes',
+    }
+    if not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    disposition = content_disposition_header(as_attachment, os.path.basename(path))
+
+    if config['OFFLOAD'] in ('nginx', 'sendfile'):
+        response = HttpResponse(content_type=content_type)
+        if config['OFFLOAD'] == 'nginx':
+            relative = os.path.relpath(path, root).replace(os.sep, '/')
+            response['X-Accel-Redirect'] = f"{config['INTERNAL_PREFIX'].rstrip('/')}/{relative}"
+        else:
+            response['X-Sendfile'] = path
+    else:
+        size = stat.st_size
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if byte_range is not None and if_range and if_range.strip() != etag and \
+                parse_http_date_safe(if_range) != int(stat.st_mtime):
+            # The client's partial copy is stale: send the whole file
+            byte_range = None
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{size}"
+            return response
+        start, end = byte_range or (0, size - 1)
+        response = StreamingHttpResponse(
+            read_range(path, start, end - start + 1, config['READ_SIZE']),
+            status=206 if byte_range else 200,
+            content_type=content_type,
+        )
+        response['Content-Length'] = str(max(0, end - start + 1))
+        if byte_range:
+            response['Content-Range'] = f"bytes {start}-{end}/{size}"
+
+    for header, value in headers.items():
+        response[header] = value
+    if disposition:
+        response['Content-Disposition'] = disposition
+    return response
@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from fractions import Fraction
+
+from .audio_ingest import find_tool
+
+logger = logging.getLogger(__name__)
+
+PROBE_CACHE_SIZE = 256
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_content_cache = {}
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _frame_rate(value):
+    try:
+        rate = Fraction(value)
+        return float(rate) if rate else None
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+
+
+def _summarize(info):
+    """Flatten ffprobe's format/streams JSON into the fields the pipeline uses"""
+    fmt = info.get("format", {})
+    streams = info.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    return {
+        "format_name": fmt.get("format_name"),
+        "duration": _to_float(fmt.get("duration")),
+        "size": _to_int(fmt.get("size")),
+        "bitrate": _to_int(fmt.get("bit_rate")),
+        "streams": [
+            {"index": s.get("index"), "codec_type": s.get("codec_type"), "codec_name": s.get("codec_name")}
+            for s in streams
+        ],
+        "video": {
+            "codec": video.get("codec_name"),
+            "width": _to_int(video.get("width")),
+            "height": _to_int(video.get("height")),
+            "fps": _frame_rate(video.get("avg_frame_rate")) or _frame_rate(video.get("r_frame_rate")),
+            "frames": _to_int(video.get("nb_frames")),
+        } if video else None,
+        "audio": {
+            "codec": audio.get("codec_name"),
+            "sample_rate": _to_int(audio.get("sample_rate")),
+            "channels": _to_int(audio.get("channels")),
+            "bitrate": _to_int(audio.get("bit_rate")),
+        } if audio else None,
+    }
+
+
+def run_ffprobe(path):
+    command = [
+        find_tool('ffprobe'),
+        '-v', 'error',
+        '-show_format',
+        '-show_streams',
+        '-of', 'json',
+        str(path),
+    ]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise ValueError(f"Unreadable media file {path}: {result.stderr.strip()}")
+    return json.loads(result.stdout or "{}")
+
+
+def probe_media(path, content_hash=None):
+    """
+    Probe a media file once and return duration, streams, fps, resolution, sample rate and bitrate.
+
+    Results are memoized per process by (path, size, mtime) and, when the
+    caller already knows it, by content hash, so the same upload is never
+    probed twice.
+    """
+    path = os.path.realpath(str(path))
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+        if content_hash and content_hash in _content_cache:
+            probe = _content_cache[content_hash]
+            _cache[key] = probe
+            return probe
+
+    probe = _summarize(run_ffprobe(path))
+    logger.info(f"Probed {path}: {probe}")
+
+    with _cache_lock:
+        _cache[key] = probe
+        while len(_cache) > PROBE_CACHE_SIZE:
+            _cache.popitem(last=False)
+        if content_hash:
+            _content_cache[content_hash] = probe
+            while len(_content_cache) > PROBE_CACHE_SIZE:
+                _content_cache.pop(next(iter(_content_cache)))
+    return probe
+
+
+def save_probe_to_job(job, probe):
+    """Store the probe's key fields on the job so later consumers need no subprocess"""
+    video = probe.get("video") or {}
+    audio = probe.get("audio") or {}
+    job.duration = probe.get("duration")
+    job.width = video.get("width")
+    job.height = video.get("height")
+    job.fps = video.get("fps")
+    job.audio_sample_rate = audio.get("sample_rate")
+    job.bitrate = probe.get("bitrate")
+    job.save(update_fields=["duration", "width", "height", "fps", "audio_sample_rate", "bitrate"])
+    return job
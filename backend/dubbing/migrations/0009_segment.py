@@ -0,0 +1,65 @@
+# Generated by Django 4.2.23 on 2026-10-18 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dubbing", "0008_dubbingjob_quality"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Segment",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("index", models.PositiveIntegerField()),
+                ("start", models.FloatField()),
+                ("end", models.FloatField()),
+                ("source_text", models.TextField()),
+                ("translated_text", models.TextField(blank=True, null=True)),
+                ("audio_file", models.CharField(blank=True, max_length=500, null=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("transcribed", "Transcribed"),
+                            ("translated", "Translated"),
+                            ("synthesized", "Synthesized"),
+                            ("failed", "Failed"),
+                        ],
+                        default="transcribed",
+                        max_length=20,
+                    ),
+                ),
+                ("error_message", models.TextField(blank=True, null=True)),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="segments",
+                        to="dubbing.dubbingjob",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["job", "index"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="segment",
+            constraint=models.UniqueConstraint(
+                fields=("job", "index"), name="unique_segment_index_per_job"
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.23 on 2026-10-18 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dubbing", "0009_segment"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TranslationMemory",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key_hash", models.CharField(max_length=64, unique=True)),
+                ("source_lang", models.CharField(max_length=10)),
+                ("target_lang", models.CharField(max_length=10)),
+                ("backend", models.CharField(max_length=50)),
+                ("source_text", models.TextField()),
+                ("translated_text", models.TextField()),
+                ("hit_count", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("last_used_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
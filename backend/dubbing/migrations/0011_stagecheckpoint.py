@@ -0,0 +1,47 @@
+# Generated by Django 4.2.23 on 2026-10-18 11:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dubbing", "0010_translationmemory"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StageCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("stage", models.CharField(max_length=20)),
+                ("params_hash", models.CharField(max_length=64)),
+                ("artifact_path", models.CharField(blank=True, max_length=500, null=True)),
+                ("completed", models.BooleanField(default=False)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="checkpoints",
+                        to="dubbing.dubbingjob",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="stagecheckpoint",
+            constraint=models.UniqueConstraint(
+                fields=("job", "stage"), name="unique_checkpoint_stage_per_job"
+            ),
+        ),
+    ]
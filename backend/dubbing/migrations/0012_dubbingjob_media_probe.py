@@ -0,0 +1,43 @@
+# Generated by Django 4.2.23 on 2026-10-18 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dubbing", "0011_stagecheckpoint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dubbingjob",
+            name="audio_sample_rate",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="dubbingjob",
+            name="bitrate",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="dubbingjob",
+            name="duration",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="dubbingjob",
+            name="fps",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="dubbingjob",
+            name="height",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="dubbingjob",
+            name="width",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dubbing", "0012_dubbingjob_media_probe"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dubbingjob",
+            name="has_speech",
+            field=models.BooleanField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.23 on 2026-10-18 17:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def number_jobs(apps, schema_editor):
+    """Give existing jobs the display_id the project list used to compute (per user, oldest first)"""
+    DubbingJob = apps.get_model("dubbing", "DubbingJob")
+    counters = {}
+    jobs = DubbingJob.objects.filter(user__isnull=False).order_by("user_id", "created_at", "id")
+    for job in jobs.only("id", "user_id").iterator():
+        counters[job.user_id] = counters.get(job.user_id, 0) + 1
+        DubbingJob.objects.filter(id=job.id).update(sequence=counters[job.user_id])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("dubbing", "0014_uploadsession"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dubbingjob",
+            name="sequence",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(number_jobs, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="dubbingjob",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"], name="dubbing_job_user_created_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dubbingjob",
+            constraint=models.UniqueConstraint(
+                fields=("user", "sequence"), name="dubbing_job_user_sequence_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dubbing", "0015_dubbingjob_sequence"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dubbingjob",
+            name="version",
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.23 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dubbing", "0016_dubbingjob_version"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="uploadsession",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("uploading", "Uploading"),
+                    ("finalizing", "Finalizing"),
+                    ("complete", "Complete"),
+                    ("rejected", "Rejected"),
+                ],
+                default="uploading",
+                max_length=20,
+            ),
+        ),
+    ]
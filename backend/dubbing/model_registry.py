@@ -0,0 +1,188 @@
+import gc
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import torch
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), "models")
+
+PRECISIONS = ('fp32', 'fp16', 'int8')
+
+DEFAULT_WHISPER_CONFIG = {
+    'MODEL_SIZE': 'tiny.en',
+    'DEVICE': None,  # None = pick cuda when available
+    'FP16': False,
+    'PRECISION': None,  # fp32, fp16 (cuda) or int8 (cpu); None = derive from FP16
+    'BATCH_SIZE': 16,
+    'BEAM_SIZE': 5,  # 1 or None = greedy decoding
+    'WORD_TIMESTAMPS': False,
+    'MEMORY_BUDGET_MB': 2048,
+    'PRELOAD': True,
+}
+
+
+def get_whisper_config():
+    """Return WHISPER_CONFIG from settings merged over the defaults"""
+    config = dict(DEFAULT_WHISPER_CONFIG)
+    config.update(getattr(settings, 'WHISPER_CONFIG', {}) or {})
+    if not config['DEVICE']:
+        config['DEVICE'] = 'cuda' if torch.cuda.is_available() else 'cpu'
+    return config
+
+
+def estimate_model_bytes(model):
+    """Approximate resident size of a torch module (parameters + buffers)"""
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except Exception:
+        return 0
+
+
+class ModelRegistry:
+    """
+    Keeps loaded models resident in the current worker process.
+
+    Models are keyed by an arbitrary hashable key and evicted least recently
+    used first once the estimated total size exceeds ``memory_budget_bytes``.
+    The most recently requested model is never evicted.
+    """
+
+    def __init__(self, memory_budget_bytes=None):
+        self.memory_budget_bytes = memory_budget_bytes
+        self._models = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.RLock()
+        self._stats = {"loads": 0, "hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key, loader):
+        """Return the model for ``key``, calling ``loader()`` on a miss"""
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._models[key]
+
+            self._stats["misses"] += 1
+            logger.info(f"Model registry miss for {key}, loading...")
+            model = loader()
+            self._stats["loads"] += 1
+            self._models[key] = model
+            self._sizes[key] = estimate_model_bytes(model)
+            logger.info(f"Loaded model {key} (~{self._sizes[key] / 1024 / 1024:.0f}MB)")
+            self._evict()
+            return model
+
+    def _evict(self):
+        if not self.memory_budget_bytes:
+            return
+        evicted = False
+        while len(self._models) > 1 and self.total_bytes() > self.memory_budget_bytes:
+            key, _ = self._models.popitem(last=False)
+            self._sizes.pop(key, None)
+            self._stats["evictions"] += 1
+            evicted = True
+            logger.info(f"Evicted model {key} to stay under memory budget")
+        if evicted:
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    def total_bytes(self):
+        return sum(self._sizes.values())
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._sizes.clear()
+        gc.collect()
+
+    def stats(self):
+        """Snapshot of load/hit/miss/eviction counters and resident models"""
+        with self._lock:
+            return {
+                **self._stats,
+                "resident": [list(key) for key in self._models],
+                "resident_bytes": self.total_bytes(),
+            }
+
+
+_registry = None
+
+
+def get_registry():
+    """Return the process-wide model registry"""
+    global _registry
+    if _registry is None:
+        budget_mb = get_whisper_config()['MEMORY_BUDGET_MB']
+        _registry = ModelRegistry(budget_mb * 1024 * 1024 if budget_mb else None)
+    return _registry
+
+
+def whisper_model_key(model_size=None, device=None, precision=None):
+    config = get_whisper_config()
+    model_size = model_size or config['MODEL_SIZE']
+    device = device or config['DEVICE']
+    precision = precision or config['PRECISION']
+    if precision is None:
+        precision = 'fp16' if config['FP16'] and device == 'cuda' else 'fp32'
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown Whisper precision {precision!r}, expected one of {', '.join(PRECISIONS)}")
+    if (precision == 'int8' and device != 'cpu') or (precision == 'fp16' and device == 'cpu'):
+        logger.warning(f"Whisper precision {precision} is not supported on {device}, using fp32")
+        precision = 'fp32'
+    return (model_size, device, precision)
+
+
+def quantize_whisper_model(model):
+    """Dynamically quantize the Linear layers (attention and MLP) of a Whisper model to int8"""
+    import whisper.model
+    for module in model.modules():
+        # Whisper's Linear only adds a dtype cast; quantize_dynamic matches exact nn.Linear
+        if isinstance(module, whisper.model.Linear):
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_whisper_model(model_size, device, precision):
+    """Load a Whisper checkpoint from MODELS_DIR and prepare it for ``precision``"""
+    import whisper
+    model = whisper.load_model(model_size, device=device, download_root=MODELS_DIR)
+    if precision == 'int8':
+        model = quantize_whisper_model(model)
+    return model
+
+
+def decoding_options(precision, beam_size=None):
+    """``model.transcribe`` keyword arguments for a precision and beam size"""
+    if beam_size is None:
+        beam_size = get_whisper_config()['BEAM_SIZE']
+    return {
+        "fp16": precision == 'fp16',
+        # Whisper decodes greedily when beam_size is None
+        "beam_size": beam_size if beam_size and beam_size > 1 else None,
+    }
+
+
+def get_whisper_model(model_size=None, device=None, precision=None):
+    """Return a resident Whisper model keyed by (model size, device, precision)"""
+    key = whisper_model_key(model_size, device, precision)
+    return get_registry().get(key, lambda: load_whisper_model(*key))
+
+
+def warm_up_models():
+    """Eagerly load the configured models; called on worker process start"""
+    from .inference_client import use_inference_server
+    config = get_whisper_config()
+    if not config['PRELOAD'] or use_inference_server():
+        return
+    try:
+        get_whisper_model()
+        logger.info(f"Model warm-up complete: {get_registry().stats()}")
+    except Exception as e:
+        logger.error(f"Model warm-up failed: {str(e)}")
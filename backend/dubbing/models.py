@@ -1,4 +1,7 @@
-from django.db import models
+import uuid
+
+from django.db import connections, models, transaction
+from django.db.models.sql import UpdateQuery
 from django.contrib.auth.models import User
 
 class DubbingJob(models.Model):
@@ -22,6 +25,159 @@ class DubbingJob(models.Model):
     dubbed_audio_file = models.FileField(upload_to='dubbed_audio/', blank=True, null=True)
     translated_subtitles = models.TextField(blank=True, null=True)
     quality = models.CharField(max_length=20, default='medium')
+    # Filled from one ffprobe run (see media_probe.probe_media)
+    duration = models.FloatField(blank=True, null=True)
+    width = models.IntegerField(blank=True, null=True)
+    height = models.IntegerField(blank=True, null=True)
+    fps = models.FloatField(blank=True, null=True)
+    audio_sample_rate = models.IntegerField(blank=True, null=True)
+    bitrate = models.BigIntegerField(blank=True, null=True)
+    # False when voice activity detection found no speech and the job was short-circuited
+    has_speech = models.BooleanField(blank=True, null=True)
+    # SHA-256 of the upload when it is known up front (chunked uploads hash as they arrive)
+    content_hash = models.CharField(max_length=64, blank=True, null=True)
+    # Per-user job number shown as display_id, assigned on creation
+    sequence = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    # Per-job counter bumped in the database on every write; clients poll with the versions they have
+    version = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Newest-first project listing (keyset pagination on created_at, id)
+            models.Index(fields=['user', '-created_at', '-id'], name='dubbing_job_user_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'sequence'], name='dubbing_job_user_sequence_uniq'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Incremented by the UPDATE itself: the row lock orders concurrent writers, so a
+        # later commit always carries a higher version than anything a client has read
+        adding = self._state.adding
+        self.version = 1 if adding else models.F('version') + 1
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        if adding and self.user_id and self.sequence is None:
+            with transaction.atomic():
+                # Lock the user row so concurrent uploads don't take the same number
+                User.objects.select_for_update().filter(id=self.user_id).exists()
+                last = DubbingJob.objects.filter(user_id=self.user_id).aggregate(last=models.Max('sequence'))['last']
+                self.sequence = (last or 0) + 1
+                super().save(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
+        if hasattr(self.version, 'resolve_expression'):
+            # No RETURNING on this backend: leave the new value to be read back on access
+            del self.__dict__['version']
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # Read the incremented version back from the UPDATE itself (RETURNING), so the
+        # instance holds the committed value without another query
+        connection = connections[using]
+        if not values or not connection.features.can_return_columns_from_insert:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        query = base_qs.filter(pk=pk_val).query.chain(UpdateQuery)
+        query.add_update_fields(values)
+        sql, params = query.get_compiler(using).as_sql()
+        column = connection.ops.quote_name(self._meta.get_field('version').column)
+        with connection.cursor() as cursor:
+            cursor.execute(f"{sql} RETURNING {column}", params)
+            row = cursor.fetchone()
+        if row is None:
+            return False
+        self.version = row[0]
+        return True
 
     def __str__(self):
         return f"DubbingJob {self.id} - {self.status}"
+
+
+class Segment(models.Model):
+    """One timed span of speech, processed independently through translation and TTS."""
+    STATUS_CHOICES = [
+        ('transcribed', 'Transcribed'),
+        ('translated', 'Translated'),
+        ('synthesized', 'Synthesized'),
+        ('failed', 'Failed'),
+    ]
+
+    job = models.ForeignKey(DubbingJob, on_delete=models.CASCADE, related_name='segments')
+    index = models.PositiveIntegerField()
+    start = models.FloatField()
+    end = models.FloatField()
+    source_text = models.TextField()
+    translated_text = models.TextField(blank=True, null=True)
+    audio_file = models.CharField(max_length=500, blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='transcribed')
+    error_message = models.TextField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['job', 'index']
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'index'], name='unique_segment_index_per_job'),
+        ]
+
+    def __str__(self):
+        return f"Segment {self.index} of job {self.job_id} ({self.start:.2f}-{self.end:.2f}s)"
+
+
+class TranslationMemory(models.Model):
+    """Cached translation of one normalized source sentence for a language pair and backend."""
+    key_hash = models.CharField(max_length=64, unique=True)
+    source_lang = models.CharField(max_length=10)
+    target_lang = models.CharField(max_length=10)
+    backend = models.CharField(max_length=50)
+    source_text = models.TextField()
+    translated_text = models.TextField()
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.source_lang}->{self.target_lang} [{self.backend}] {self.source_text[:40]}"
+
+
+class StageCheckpoint(models.Model):
+    """Durable record that a pipeline stage finished for a job, and where its output lives."""
+    job = models.ForeignKey(DubbingJob, on_delete=models.CASCADE, related_name='checkpoints')
+    stage = models.CharField(max_length=20)
+    params_hash = models.CharField(max_length=64)
+    artifact_path = models.CharField(max_length=500, blank=True, null=True)
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'stage'], name='unique_checkpoint_stage_per_job'),
+        ]
+
+    def __str__(self):
+        return f"Checkpoint {self.stage} of job {self.job_id} ({'done' if self.completed else 'pending'})"
+
+
+class UploadSession(models.Model):
+    """A resumable chunked upload, assembled on disk and turned into a job when finalized."""
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('finalizing', 'Finalizing'),
+        ('complete', 'Complete'),
+        ('rejected', 'Rejected'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    quality = models.CharField(max_length=20, default='medium')
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    content_hash = models.CharField(max_length=64, blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    error_message = models.TextField(blank=True, null=True)
+    job = models.OneToOneField(
+        DubbingJob, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_session'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.received}/{self.size} bytes, {self.status})"
@@ -0,0 +1,198 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .audio_ingest import ASR_SAMPLE_RATE
+from .inference_client import use_inference_server
+from .vad import window_bounds
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARALLEL_ASR_CONFIG = {
+    'ENABLED': True,
+    'WORKERS': None,  # ASR processes per worker process; None = half the cores
+    'THREADS_PER_WORKER': None,  # torch threads in each ASR process; None = cores / workers
+    'MIN_SECONDS': 300,  # Shorter audio is transcribed in a single call
+    'CHUNK_SECONDS': 120,
+    'OVERLAP_SECONDS': 2.0,  # Audio shared by neighbouring chunks on each side of a cut
+}
+
+# Chunks sent to the inference server must fit one 30 s Whisper window (with overlap) to be batched
+SERVER_CHUNK_SECONDS = 25
+
+
+def get_parallel_asr_config():
+    """Return PARALLEL_ASR from settings merged over the defaults"""
+    config = dict(DEFAULT_PARALLEL_ASR_CONFIG)
+    config.update(getattr(settings, 'PARALLEL_ASR', {}) or {})
+    cores = os.cpu_count() or 1
+    if not config['WORKERS']:
+        config['WORKERS'] = max(1, cores // 2)
+    if not config['THREADS_PER_WORKER']:
+        config['THREADS_PER_WORKER'] = max(1, cores // config['WORKERS'])
+    return config
+
+
+def can_start_process_pool():
+    """
+    False inside a daemonic process, such as a Celery prefork pool child,
+    which may not have children of its own. Workers that need process pools
+    (the asr and lipsync queues) run with ``--pool threads``; see
+    run_stage_worker.
+    """
+    return not multiprocessing.current_process().daemon
+
+
+def use_parallel_asr(duration, config=None):
+    """
+    Whether audio of ``duration`` seconds should be split into chunks: across
+    the ASR process pool on CPU, or sent concurrently to the inference server
+    so it can batch them. A daemonic worker can't start the pool, so it
+    transcribes in a single call instead.
+    """
+    from .model_registry import get_whisper_config
+    config = config or get_parallel_asr_config()
+    if not (
+        config['ENABLED']
+        and config['WORKERS'] > 1
+        and (use_inference_server() or get_whisper_config()['DEVICE'] == 'cpu')
+        and duration >= config['MIN_SECONDS']
+    ):
+        return False
+    if not use_inference_server() and not can_start_process_pool():
+        logger.warning("Daemonic worker process, transcribing without the ASR pool (run asr workers with --pool threads)")
+        return False
+    return True
+
+
+def plan_chunks(audio, config=None, sample_rate=ASR_SAMPLE_RATE):
+    """
+    Split ``audio`` at quiet frames into chunks of about CHUNK_SECONDS.
+
+    Returns (lo, hi, core_lo, core_hi) sample indices: the chunk sent to
+    Whisper is ``audio[lo:hi]``, which extends OVERLAP_SECONDS past the cut
+    on each side, and the chunk owns the segments whose midpoint falls in
+    ``[core_lo, core_hi)``.
+    """
+    config = config or get_parallel_asr_config()
+    overlap = int(config['OVERLAP_SECONDS'] * sample_rate)
+    return [
+        (max(0, start - overlap), min(len(audio), end + overlap), start, end)
+        for start, end in window_bounds(audio, config['CHUNK_SECONDS'], sample_rate=sample_rate)
+    ]
+
+
+def merge_chunk_segments(chunks, results, sample_rate=ASR_SAMPLE_RATE):
+    """
+    Shift each chunk's segments (and words) onto the full timeline and keep
+    one copy of every segment from the overlaps.
+    """
+    merged = []
+    last = len(chunks) - 1
+    for i, ((lo, _, core_lo, core_hi), segments) in enumerate(zip(chunks, results)):
+        offset = lo / sample_rate
+        for seg in segments:
+            start, end = seg["start"] + offset, seg["end"] + offset
+            middle = (start + end) / 2 * sample_rate
+            if middle < core_lo or (middle >= core_hi and i != last):
+                continue
+            if merged and merged[-1]["text"].strip() == seg["text"].strip() and start < merged[-1]["end"]:
+                continue
+            seg = {**seg, "start": start, "end": end}
+            if seg.get("words"):
+                seg["words"] = [
+                    {**word, "start": word["start"] + offset, "end": word["end"] + offset}
+                    for word in seg["words"]
+                ]
+            merged.append(seg)
+    merged.sort(key=lambda seg: seg["start"])
+    return merged
+
+
+def _init_worker(threads):
+    # Spawned interpreter: set up Django and load the model once per process
+    import django
+    django.setup()
+    import torch
+    torch.set_num_threads(threads)
+    from .model_registry import get_whisper_model
+    get_whisper_model()
+
+
+def _transcribe_chunk(samples):
+    from .audio_utils import run_whisper
+    result = run_whisper(samples)
+    return [
+        {key: seg[key] for key in ("start", "end", "text", "words") if key in seg}
+        for seg in result.get("segments", [])
+    ]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_asr_pool(config=None):
+    """Return the ASR process pool of this worker process, starting it on first use"""
+    global _pool
+    config = config or get_parallel_asr_config()
+    with _pool_lock:
+        if _pool is None:
+            logger.info(
+                f"Starting ASR pool: {config['WORKERS']} processes x {config['THREADS_PER_WORKER']} threads"
+            )
+            _pool = ProcessPoolExecutor(
+                max_workers=config['WORKERS'],
+                # spawn, not fork: forking a process that already runs torch threads can deadlock
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(config['THREADS_PER_WORKER'],),
+            )
+    return _pool
+
+
+def shutdown_asr_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def transcribe_parallel(audio, config=None):
+    """
+    Transcribe a long 16 kHz array as overlapping chunks across the ASR pool.
+
+    Returns a Whisper-style result dict whose segments are on the timeline of
+    ``audio``.
+    """
+    config = config or get_parallel_asr_config()
+    if use_inference_server():
+        config = {**config, 'CHUNK_SECONDS': min(config['CHUNK_SECONDS'], SERVER_CHUNK_SECONDS)}
+    chunks = plan_chunks(audio, config)
+    duration = len(audio) / ASR_SAMPLE_RATE
+    pieces = [audio[lo:hi] for lo, hi, _, _ in chunks]
+    started = time.monotonic()
+    try:
+        if use_inference_server():
+            with ThreadPoolExecutor(max_workers=config['WORKERS']) as pool:
+                results = list(pool.map(_transcribe_chunk, pieces))
+        else:
+            results = list(get_asr_pool(config).map(_transcribe_chunk, pieces))
+    except BrokenProcessPool:
+        # A dead ASR process poisons the pool; start a fresh one for the next job
+        shutdown_asr_pool()
+        raise
+    segments = merge_chunk_segments(chunks, results)
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"Parallel ASR: {len(chunks)} chunks of {duration:.0f}s audio on {config['WORKERS']} processes "
+        f"in {elapsed:.1f}s (real-time factor {elapsed / max(duration, 1e-6):.3f})"
+    )
+    return {"text": " ".join(seg["text"].strip() for seg in segments), "segments": segments}
@@ -0,0 +1,142 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import torch
+
+from .lipsync_engine import get_lipsync_config
+
+logger = logging.getLogger(__name__)
+
+
+def lipsync_workers(config=None):
+    """
+    (processes, torch threads per process) for chunked lip sync: one process
+    per GPU, or half the cores on CPU, unless PARALLEL_WORKERS is set. A
+    daemonic worker (Celery prefork child) can't start the pool, so it lip
+    syncs serially; run the lipsync queue with ``--pool threads``.
+    """
+    from .parallel_asr import can_start_process_pool
+    config = config or get_lipsync_config()
+    cores = os.cpu_count() or 1
+    if not can_start_process_pool():
+        return 1, config['PARALLEL_THREADS'] or cores
+    workers = config['PARALLEL_WORKERS']
+    if not workers:
+        workers = torch.cuda.device_count() if torch.cuda.is_available() else max(1, cores // 2)
+    threads = config['PARALLEL_THREADS'] or max(1, cores // workers)
+    return workers, threads
+
+
+def _init_worker(threads, devices):
+    # Spawned interpreter: set up Django and take the next GPU index handed out by the pool
+    import django
+    django.setup()
+    torch.set_num_threads(threads)
+    if devices is not None:
+        torch.cuda.set_device(devices.get())
+
+
+def lipsync_chunk(chunk):
+    """
+    Cut one chunk out of the source video and lip-sync it to its audio slice.
+
+    ``chunk`` is a dict with video_path, start, end, audio_path, output_path,
+    quality, video_hash (the source video's, or None) and frame_offset (the
+    chunk's first frame in the source video).
+    """
+    from .lipsync_utils import run_wav2lip
+    from .video_utils import cut_clip
+
+    source = cut_clip(chunk["video_path"], chunk["start"], chunk["end"], chunk["output_path"][:-4] + "-source.mp4")
+    try:
+        run_wav2lip(
+            source, chunk["audio_path"], chunk["output_path"], chunk["quality"],
+            chunk.get("progress_callback"), chunk["video_hash"], chunk.get("frame_offset", 0)
+        )
+    finally:
+        os.remove(source)
+    return chunk["output_path"]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_lipsync_pool(config=None):
+    """Return the lip-sync process pool of this worker process, starting it on first use"""
+    global _pool
+    workers, threads = lipsync_workers(config)
+    with _pool_lock:
+        if _pool is None:
+            logger.info(f"Starting lip-sync pool: {workers} processes x {threads} threads")
+            # spawn, not fork: forking a process that already runs torch threads can deadlock
+            context = multiprocessing.get_context('spawn')
+            gpus = torch.cuda.device_count() if torch.cuda.is_available() else 0
+            devices = None
+            if gpus > 1:
+                # One device index per process, spread evenly; each process takes one as it starts
+                devices = context.Queue()
+                for index in range(workers):
+                    devices.put(index % gpus)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(threads, devices),
+            )
+    return _pool
+
+
+def shutdown_lipsync_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def lipsync_chunks(chunks, progress_callback=None, config=None):
+    """
+    Lip-sync ``chunks`` (see ``lipsync_chunk``), concurrently when there is
+    more than one worker. Progress is reported as the share of chunk seconds
+    done: within each chunk when running serially, per finished chunk from
+    the pool.
+    """
+    workers, _ = lipsync_workers(config)
+    total = sum(chunk["end"] - chunk["start"] for chunk in chunks) or 1.0
+    done = 0.0
+    started = time.monotonic()
+
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            length = chunk["end"] - chunk["start"]
+
+            def chunk_progress(progress, done=done, length=length):
+                if progress_callback:
+                    progress_callback(int((done + length * progress / 100) / total * 100))
+            lipsync_chunk({**chunk, "progress_callback": chunk_progress})
+            done += length
+    else:
+        try:
+            pool = get_lipsync_pool(config)
+            futures = {pool.submit(lipsync_chunk, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                future.result()
+                chunk = futures[future]
+                done += chunk["end"] - chunk["start"]
+                if progress_callback:
+                    progress_callback(int(done / total * 100))
+        except BrokenProcessPool:
+            # A dead lip-sync process poisons the pool; start a fresh one for the next job
+            shutdown_lipsync_pool()
+            raise
+
+    logger.info(
+        f"Lip-synced {len(chunks)} chunks ({total:.0f}s) on {min(workers, len(chunks))} processes "
+        f"in {time.monotonic() - started:.1f}s"
+    )
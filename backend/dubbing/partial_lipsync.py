@@ -0,0 +1,224 @@
+import logging
+import math
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .audio_ingest import ASR_SAMPLE_RATE, AudioBuffer, load_wav
+from .audio_utils import replace_audio_in_video
+from .face_track import compact_face_track, load_face_track
+from .lipsync_engine import QUALITY_PRESETS, get_lipsync_config, get_lipsync_engine
+from .lipsync_utils import run_wav2lip
+from .parallel_lipsync import lipsync_chunks, lipsync_workers
+from .vad import detect_speech, window_bounds
+from .video_utils import concat_clips, cut_clip
+
+logger = logging.getLogger(__name__)
+
+MIN_SPAN_SECONDS = 0.3  # Wav2Lip needs a few mel windows to work with
+
+
+def track_intervals(track, fps, duration):
+    """
+    (start, end) intervals where a face track has a face. Each detected
+    frame stands for the frames up to the next detected one, so a sampled
+    track gives a timeline at its sampling resolution.
+    """
+    rows = np.flatnonzero(track.detected)
+    ends = np.append(rows[1:], len(track))
+    intervals = []
+    for row, end_row in zip(rows, ends):
+        if not track.has_face[row]:
+            continue
+        start, end = row / fps, min(duration, end_row / fps)
+        if intervals and start <= intervals[-1][1] + 1e-6:
+            intervals[-1] = (intervals[-1][0], end)
+        elif end > start:
+            intervals.append((start, end))
+    return intervals
+
+
+def intersect_intervals(a, b):
+    """Intersection of two sorted lists of (start, end) intervals"""
+    result = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        start, end = max(a[i][0], b[j][0]), min(a[i][1], b[j][1])
+        if end > start:
+            result.append((start, end))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def plan_lipsync_spans(speech, faces, duration, fps, config=None):
+    """
+    Split ``[0, duration]`` into (start, end, lipsync) spans.
+
+    Lip-sync spans are where dubbed ``speech`` and ``faces`` overlap, joined
+    across gaps shorter than PARTIAL_MIN_GAP_SECONDS and snapped to frame
+    boundaries; everything between them is passed through. If lip sync would
+    cover more than PARTIAL_MAX_COVERAGE of the video, one full span is
+    returned since cutting would cost more than it saves.
+    """
+    config = config or get_lipsync_config()
+    spans = []
+    for start, end in intersect_intervals(list(speech), list(faces)):
+        start = math.floor(start * fps) / fps
+        end = min(duration, math.ceil(end * fps) / fps)
+        if spans and start - spans[-1][1] < config['PARTIAL_MIN_GAP_SECONDS']:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+    spans = [(start, end) for start, end in spans if end - start >= MIN_SPAN_SECONDS]
+
+    covered = sum(end - start for start, end in spans)
+    if covered > config['PARTIAL_MAX_COVERAGE'] * duration:
+        return [(0.0, duration, True)]
+
+    plan = []
+    cursor = 0.0
+    for start, end in spans:
+        if start - cursor > 1e-6:
+            plan.append((cursor, start, False))
+        plan.append((start, end, True))
+        cursor = end
+    if duration - cursor > 1e-6:
+        plan.append((cursor, duration, False))
+    return plan
+
+
+def face_intervals(video_path, video_hash, duration, fps, resize_factor=1, config=None):
+    """
+    Where a face is on screen, from the video's cached face track when it
+    is dense enough, otherwise from detections on sampled frames (which are
+    added to the cached track). Without an in-process engine the whole
+    video is assumed to show a face.
+    """
+    config = config or get_lipsync_config()
+    step = config['FACE_SAMPLE_SECONDS']
+    step_frames = max(1, int(round(step * fps)))
+    track = load_face_track(video_hash, resize_factor)
+    if track is not None and len(track) >= duration * fps - step_frames and track.sampled_every(step_frames):
+        return track_intervals(track, fps, duration)
+    if config['ENGINE'] == 'inprocess':
+        try:
+            track = get_lipsync_engine().sample_faces(video_path, step, resize_factor, video_hash)
+            return track_intervals(track, fps, duration)
+        except (ImportError, FileNotFoundError) as e:
+            logger.warning(f"Face sampling unavailable ({str(e)}), assuming a face throughout")
+    return [(0.0, duration)]
+
+
+def split_span(start, end, audio, fps, chunk_seconds, sample_rate=ASR_SAMPLE_RATE):
+    """
+    Cut a lip-sync span into chunks of about ``chunk_seconds`` at quiet
+    points of the dubbed ``audio``, on frame boundaries.
+    """
+    if end - start < chunk_seconds * 1.5:
+        return [(start, end)]
+    lo = int(round(start * sample_rate))
+    bounds = window_bounds(audio[lo:int(round(end * sample_rate))], chunk_seconds, sample_rate=sample_rate)
+    cuts = [start] + [round((start + cut / sample_rate) * fps) / fps for _, cut in bounds[:-1]] + [end]
+    if len(cuts) > 2 and cuts[-1] - cuts[-2] < chunk_seconds / 2:
+        # Fold a short tail into the chunk before it
+        del cuts[-2]
+    return [(a, b) for a, b in zip(cuts, cuts[1:]) if b > a]
+
+
+def run_partial_wav2lip(video_path, audio_path, output_path, quality="medium", progress_callback=None,
+                        video_hash=None, probe=None):
+    """
+    Lip-sync the video in chunks, skipping spans that don't need it.
+
+    With LIPSYNC_CONFIG['PARTIAL'] only spans that carry dubbed speech and a
+    face go through Wav2Lip; the rest are re-encoded with the dubbed audio.
+    Lip-sync spans longer than CHUNK_SECONDS are split so the chunks can run
+    across the lip-sync process pool. All clips are joined with the concat
+    demuxer. A plan of one whole-video chunk is a single ``run_wav2lip``.
+
+    Face detections from sampling and from every chunk go into the video's
+    one cached track, so later runs (re-dubs, other quality levels) reuse them.
+    """
+    config = get_lipsync_config()
+    resize_factor = QUALITY_PRESETS.get(quality, QUALITY_PRESETS["medium"])["resize_factor"]
+    try:
+        return _run_partial_wav2lip(
+            video_path, audio_path, output_path, quality, progress_callback, video_hash, probe, resize_factor, config
+        )
+    finally:
+        try:
+            compact_face_track(video_hash, resize_factor)
+        except OSError as e:
+            logger.warning(f"Could not compact the face track: {str(e)}")
+
+
+def _run_partial_wav2lip(video_path, audio_path, output_path, quality, progress_callback, video_hash, probe,
+                         resize_factor, config):
+    duration = probe["duration"]
+    fps = (probe.get("video") or {}).get("fps") or 25.0
+    workers, _ = lipsync_workers(config)
+
+    dubbed = load_wav(audio_path)
+    if config['PARTIAL']:
+        speech = detect_speech(dubbed.asr_view(), ASR_SAMPLE_RATE).regions
+        faces = face_intervals(video_path, video_hash, duration, fps, resize_factor, config)
+        plan = plan_lipsync_spans(speech, faces, duration, fps, config)
+    else:
+        plan = [(0.0, duration, True)]
+    if workers > 1:
+        plan = [
+            (lo, hi, lipsync)
+            for start, end, lipsync in plan
+            for lo, hi in (split_span(start, end, dubbed.asr_view(), fps, config['CHUNK_SECONDS']) if lipsync else [(start, end)])
+        ]
+    lipsync_seconds = sum(end - start for start, end, lipsync in plan if lipsync)
+    logger.info(
+        f"Lip sync plan: {lipsync_seconds:.1f}s of {duration:.1f}s in "
+        f"{sum(1 for *_, lipsync in plan if lipsync)} chunks"
+    )
+
+    if plan == [(0.0, duration, True)]:
+        return run_wav2lip(video_path, audio_path, output_path, quality, progress_callback, video_hash)
+    if not lipsync_seconds:
+        return replace_audio_in_video(str(video_path), str(audio_path), str(output_path))
+
+    output_dir = os.path.dirname(str(output_path)) or '.'
+    os.makedirs(output_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="lipsync-", dir=output_dir) as work_dir, \
+            ThreadPoolExecutor(max_workers=1) as encoder:
+        clips, chunks, passthrough = [], [], []
+        for i, (start, end, lipsync) in enumerate(plan):
+            clip_audio = os.path.join(work_dir, f"{i:04d}.wav")
+            lo, hi = int(round(start * dubbed.sample_rate)), int(round(end * dubbed.sample_rate))
+            samples = dubbed.samples[lo:hi]
+            if len(samples) < hi - lo:
+                samples = np.pad(samples, (0, hi - lo - len(samples)))
+            AudioBuffer(samples, dubbed.sample_rate).write_wav(clip_audio)
+            clip_path = os.path.join(work_dir, f"{i:04d}.mp4")
+            clips.append(clip_path)
+
+            if lipsync:
+                chunks.append({
+                    "video_path": str(video_path), "start": start, "end": end, "audio_path": clip_audio,
+                    "output_path": clip_path, "quality": quality,
+                    # The chunk reads and adds to the source video's face track from its first frame on
+                    "video_hash": video_hash, "frame_offset": int(round(start * fps)),
+                })
+            else:
+                # Pass-through clips are encoded while the lip-sync chunks run
+                passthrough.append(encoder.submit(
+                    cut_clip, video_path, start, end, clip_path, audio_path=clip_audio, scale_factor=resize_factor
+                ))
+
+        lipsync_chunks(chunks, progress_callback, config)
+        for future in passthrough:
+            future.result()
+        concat_clips(clips, output_path)
+    if progress_callback:
+        progress_callback(100)
+    return True
@@ -3,11 +3,26 @@ import logging
 import time
 from pathlib import Path
 from django.apps import apps
-from .audio_utils import extract_audio_ffmpeg, transcribe_audio_with_whisper, inspect_audio_properties
-from .translation_utils import translate_text_to_hindi
-from .voice_utils import synthesize_hindi_audio
-from .lipsync_utils import run_wav2lip
-from .checks import run_all_checks
+from .audio_ingest import ASR_SAMPLE_RATE, DECODE_SAMPLE_RATE, REFERENCE_MAX_SECONDS, decode_audio, load_wav
+from .audio_utils import transcribe_audio_segments, assemble_segment_audio
+from .media_probe import probe_media, save_probe_to_job
+from .segments import (
+    load_or_save_segments, run_segment_stage, apply_translations, translate_pending_segments, translate_segment,
+    synthesize_segment, cleanup_segment_audio, is_done,
+)
+from .artifact_store import get_artifact_store
+from .checkpoints import CheckpointTracker
+from .hashing import hash_file
+from .model_registry import decoding_options, whisper_model_key
+from .parallel_asr import get_parallel_asr_config
+from .translation_utils import SOURCE_LANG, TARGET_LANG
+from .tts_engine import get_tts_config
+from .streaming import StreamingPipeline, get_streaming_config
+from .vad import detect_speech, get_vad_config
+from .lipsync_engine import get_lipsync_config
+from .partial_lipsync import run_partial_wav2lip
+from .checks import check_video_size, run_all_checks
+from .progress import ProgressPublisher
 import traceback
 
 logger = logging.getLogger(__name__)
@@ -28,140 +43,382 @@ def ensure_dir(path):
     Path(path).parent.mkdir(parents=True, exist_ok=True)
 
 def update_step(job, step_id, status, progress_percent, callback=None):
-    if job.step_status is None:
-        job.step_status = {}
-    job.step_status[step_id] = {"status": status, "progress": progress_percent}
-    
-    # Update overall progress
-    total_progress = sum(step.get('progress', 0) for step in job.step_status.values())
-    job.progress = total_progress / len(job.step_status)
-    
-    job.save(update_fields=["step_status", "progress"])
+    """Report a step to the job's ProgressPublisher, which coalesces the writes"""
     if callback:
         callback(step_id, status, progress_percent)
 
-def dubbing_pipeline(video_path, job_id, progress_callback=None):
+def stage_params(job):
+    """Parameters that determine each stage's output; each stage includes its upstream stages' params"""
+    model_size, _, precision = whisper_model_key()
+    asr = get_parallel_asr_config()
+    extract = {"rate": DECODE_SAMPLE_RATE, "channels": 1, "reference_seconds": REFERENCE_MAX_SECONDS}
+    transcript = {**extract, "asr_model": model_size, "asr_precision": precision,
+                  "beam_size": decoding_options(precision)["beam_size"], "vad": get_vad_config(),
+                  "chunking": {k: asr[k] for k in ("ENABLED", "MIN_SECONDS", "CHUNK_SECONDS", "OVERLAP_SECONDS")}}
+    translation = {**transcript, "source_lang": SOURCE_LANG, "target_lang": TARGET_LANG}
+    tts = {**translation, "tts_model": get_tts_config()['MODEL_NAME']}
+    lipsync_config = get_lipsync_config()
+    lipsync = {**tts, "quality": job.quality,
+               "partial": {k: lipsync_config[k] for k in ("PARTIAL", "PARTIAL_MIN_GAP_SECONDS", "PARTIAL_MAX_COVERAGE")}}
+    return {
+        "extract": extract,
+        "transcript": transcript,
+        "translation": translation,
+        "tts": tts,
+        "lipsync": lipsync,
+    }
+
+def segments_to_json(segments):
+    return [{"start": seg.start, "end": seg.end, "text": seg.source_text} for seg in segments]
+
+def run_streaming_stages(job, asr_audio, reference_audio, progress_callback=None, speech=None):
+    """Run ASR, translation and TTS overlapped through bounded queues; returns the job's segments"""
+    logger.info("Running ASR -> translation -> TTS in streaming mode...")
+    update_step(job, "voice-synthesis", "in-progress", 50, progress_callback)
+    update_step(job, "lip-sync", "in-progress", 70, progress_callback)
+    update_step(job, "processing", "in-progress", 90, progress_callback)
+
+    def on_segment(stage, counts):
+        logger.info(f"Streaming progress: {counts}")
+
+    segments = StreamingPipeline(
+        job, asr_audio, reference_audio=reference_audio, progress_callback=on_segment, speech=speech
+    ).run()
+    if not segments:
+        raise ValueError("No speech was transcribed from the video")
+    update_step(job, "voice-synthesis", "completed", 60, progress_callback)
+    update_step(job, "lip-sync", "completed", 80, progress_callback)
+    return segments
+
+def finish_without_speech(job, video_path, progress_callback=None):
+    """Complete a job whose audio has no speech: nothing to dub, so the original video is the result"""
+    logger.info(f"No speech detected in job {job.id}, skipping ASR, translation, TTS and lip sync")
+    for step_id in ("voice-synthesis", "lip-sync", "processing"):
+        update_step(job, step_id, "skipped", 100, progress_callback)
+    job.has_speech = False
+    job.translated_subtitles = ""
+    job.result_file.name = job.video_file.name
+    job.status = 'completed'
+    job.save(update_fields=['has_speech', 'translated_subtitles', 'result_file', 'status'])
+    return {
+        "status": "no_speech",
+        "result_file": str(video_path),
+        "message": "No speech detected; the original video was kept."
+    }
+
+class JobContext:
+    """
+    What the stages need to know about a job: its video hash, the artifact
+    keys and paths of every stage, and its checkpoints. Everything is rebuilt
+    from the job row, so each stage can run in a different worker.
+    """
+
+    def __init__(self, job, video_path=None):
+        self.job = job
+        self.video_path = str(video_path or job.video_file.path)
+        if not job.content_hash:
+            # Hash once; later stages (and resumes) reuse the stored hash. The size
+            # limit comes first so an oversized file isn't read end to end.
+            check_video_size(self.video_path)
+            job.content_hash = hash_file(self.video_path)
+            job.save(update_fields=['content_hash'])
+        self.video_hash = job.content_hash
+
+        # Key every stage output by the video content and the stage parameters
+        self.store = get_artifact_store()
+        self.keys = {stage: self.store.key(stage, self.video_hash, params) for stage, params in stage_params(job).items()}
+        self.extracted_audio_path = self.store.path(self.keys["extract"], "extracted.wav")
+        self.reference_audio_path = self.store.path(self.keys["extract"], "reference.wav")
+        self.transcript_path = self.store.path(self.keys["transcript"], "segments.json")
+        self.translation_path = self.store.path(self.keys["translation"], "translations.json")
+        self.hindi_audio_path = self.store.path(self.keys["tts"], "hindi.wav")
+        self.final_output_path = self.store.path(self.keys["lipsync"], "dubbed.mp4")
+        self.tracker = CheckpointTracker(job)
+        self.audio = None
+        self._probe = None
+
+    @classmethod
+    def load(cls, job_id):
+        DubbingJob = apps.get_model('dubbing', 'DubbingJob')
+        return cls(DubbingJob.objects.get(id=job_id))
+
+    def stage_done(self, stage, path):
+        return self.tracker.is_complete(stage, self.keys[stage]) or self.store.exists(path)
+
+    @property
+    def probe(self):
+        """The upload's probe, saved with the extract artifacts so later stages don't rerun ffprobe"""
+        if self._probe is None:
+            self._probe = self.store.get_json(self.keys["extract"], "probe.json") or \
+                probe_media(self.video_path, content_hash=self.video_hash)
+        return self._probe
+
+    def load_audio(self):
+        if self.audio is None:
+            self.audio = load_wav(self.extracted_audio_path)
+        return self.audio
+
+    def segments(self):
+        Segment = apps.get_model('dubbing', 'Segment')
+        return list(Segment.objects.filter(job=self.job).order_by('index'))
+
+def run_extract_stage(ctx, progress_callback=None):
+    """
+    Probe and check the upload, then decode its audio once for ASR and the
+    TTS reference. A video without an audio track is completed here and the
+    no-speech result returned; otherwise returns None.
+    """
+    job, store = ctx.job, ctx.store
+    logger.info(f"Received video upload: {ctx.video_path}")
+    logger.info(f"Video content hash: {ctx.video_hash}")
+
+    logger.info("=== Starting full folder and resource check ===")
+    # Probe the upload once; checks, duration and the job's media fields all reuse it
+    probe = probe_media(ctx.video_path, content_hash=ctx.video_hash)
+    save_probe_to_job(job, probe)
+    # Run all critical checks (system, video, audio)
+    run_all_checks(ctx.video_path, probe=probe)
+    logger.info("All critical checks passed.")
+    if not probe.get('audio'):
+        logger.info(f"Video {ctx.video_path} has no audio stream")
+        return finish_without_speech(job, ctx.video_path, progress_callback)
+
+    # Step 1: Extract audio
+    logger.info("Extracting audio from video...")
+    update_step(job, "speech-recognition", "in-progress", 10, progress_callback)
+    if ctx.stage_done("extract", ctx.extracted_audio_path) and store.exists(ctx.reference_audio_path):
+        logger.info("Using cached extracted audio")
+    else:
+        # Decode the container once; ASR and the TTS reference clip are views of this buffer
+        ctx.audio = decode_audio(ctx.video_path)
+        with store.writing(ctx.extracted_audio_path) as tmp_path:
+            ctx.audio.write_wav(tmp_path)
+        with store.writing(ctx.reference_audio_path) as tmp_path:
+            ctx.audio.reference_clip().write_wav(tmp_path)
+    store.put_json(ctx.keys["extract"], "probe.json", probe)
+    ctx._probe = probe
+    ctx.tracker.record("extract", ctx.keys["extract"], ctx.extracted_audio_path)
+    job.extracted_audio.name = store.relative(ctx.extracted_audio_path)
+    job.save(update_fields=['extracted_audio'])
+    update_step(job, "speech-recognition", "completed", 20, progress_callback)
+    logger.info(f"Audio extracted and saved to: {ctx.extracted_audio_path}")
+
+    # Step 2: Inspect audio (from the probe, no extra subprocess)
+    logger.info("Inspecting audio properties...")
+    update_step(job, "translation", "in-progress", 30, progress_callback)
+    logger.info(f"Audio properties: {probe['audio']}, duration: {probe['duration']}s")
+    update_step(job, "translation", "completed", 40, progress_callback)
+
+def run_transcript_stage(ctx, progress_callback=None):
+    """
+    Step 3: transcribe into timed segments. A silent video is completed here
+    and the no-speech result returned; otherwise returns None.
+
+    In streaming mode translation and TTS run here as well, overlapped with
+    ASR, and their stages only pick up the results.
+    """
+    job, store = ctx.job, ctx.store
+    transcript = store.get_json(ctx.keys["transcript"], "segments.json") \
+        if ctx.stage_done("transcript", ctx.transcript_path) else None
+    if transcript is None:
+        # Find speech once; ASR only sees these regions and silent videos stop here
+        speech = detect_speech(ctx.load_audio().asr_view(), ASR_SAMPLE_RATE)
+        if not speech:
+            return finish_without_speech(job, ctx.video_path, progress_callback)
+    job.has_speech = True
+    job.save(update_fields=['has_speech'])
+
+    if transcript is None and get_streaming_config()['ENABLED']:
+        segments = run_streaming_stages(
+            job, ctx.load_audio().asr_view(), ctx.reference_audio_path, progress_callback, speech=speech
+        )
+        store.put_json(ctx.keys["translation"], "translations.json", [seg.translated_text for seg in segments])
+        ctx.tracker.record("translation", ctx.keys["translation"], ctx.translation_path)
+    else:
+        logger.info("Transcribing audio...")
+        update_step(job, "voice-synthesis", "in-progress", 50, progress_callback)
+        if transcript is None:
+            transcript = transcribe_audio_segments(ctx.load_audio().asr_view(), speech=speech)
+        else:
+            logger.info("Using cached transcript")
+        segments = load_or_save_segments(job, transcript)
+        if not segments:
+            raise ValueError("No speech was transcribed from the video")
+        update_step(job, "voice-synthesis", "completed", 60, progress_callback)
+    if not store.exists(ctx.transcript_path):
+        store.put_json(ctx.keys["transcript"], "segments.json", segments_to_json(segments))
+    ctx.tracker.record("transcript", ctx.keys["transcript"], ctx.transcript_path)
+    logger.info(f"Transcription completed successfully ({len(segments)} segments)")
+
+def run_translation_stage(ctx, progress_callback=None):
+    """Step 4: translate the job's segments one by one, or reuse the cached translation"""
+    job, store = ctx.job, ctx.store
+    segments = ctx.segments()
+    logger.info("Translating segments to Hindi...")
+    update_step(job, "lip-sync", "in-progress", 70, progress_callback)
+    translations = store.get_json(ctx.keys["translation"], "translations.json") \
+        if ctx.stage_done("translation", ctx.translation_path) else None
+    if translations is not None and len(translations) == len(segments):
+        logger.info("Using cached translation")
+        apply_translations(segments, translations)
+    else:
+        translate_pending_segments(segments)
+        run_segment_stage(segments, "translate", translate_segment)
+        store.put_json(ctx.keys["translation"], "translations.json", [seg.translated_text for seg in segments])
+    ctx.tracker.record("translation", ctx.keys["translation"], ctx.translation_path)
+    update_step(job, "lip-sync", "completed", 80, progress_callback)
+
+    hindi_text = "\n".join(seg.translated_text for seg in segments)
+    job.translated_subtitles = hindi_text
+    job.save(update_fields=['translated_subtitles'])
+    logger.info("="*40)
+    logger.info(f"Translated Hindi text:\n{hindi_text}")
+    logger.info("="*40)
+
+def pending_tts_batches(ctx, batch_size):
+    """Indexes of the segments still to synthesize, in batches of ``batch_size``; empty if TTS is cached"""
+    if ctx.stage_done("tts", ctx.hindi_audio_path):
+        return []
+    pending = [seg.index for seg in ctx.segments() if not is_done(seg, "synthesize")]
+    return [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+def synthesize_segments(ctx, indexes=None):
+    """Synthesize the job's pending segments, or only those in ``indexes``; returns all the segments"""
+    segments = ctx.segments()
+    selected = segments if indexes is None else [seg for seg in segments if seg.index in set(indexes)]
+    run_segment_stage(selected, "synthesize", lambda seg: synthesize_segment(seg, ctx.reference_audio_path))
+    return segments
+
+def run_tts_stage(ctx, progress_callback=None):
+    """Step 5: synthesize Hindi audio (voice cloning) per segment and lay it out on the original timeline"""
+    job, store = ctx.job, ctx.store
+    logger.info("Synthesizing Hindi voice...")
+    update_step(job, "processing", "in-progress", 90, progress_callback)
+    if ctx.stage_done("tts", ctx.hindi_audio_path):
+        logger.info("Using cached Hindi audio")
+    else:
+        segments = synthesize_segments(ctx)
+        with store.writing(ctx.hindi_audio_path) as tmp_path:
+            assemble_segment_audio(
+                [(seg.start, seg.audio_file) for seg in segments],
+                tmp_path,
+                total_duration=ctx.probe["duration"]
+            )
+    ctx.tracker.record("tts", ctx.keys["tts"], ctx.hindi_audio_path)
+    update_step(job, "processing", "completed", 95, progress_callback)
+    logger.info(f"Hindi audio synthesized and saved to {ctx.hindi_audio_path}")
+
+def run_lipsync_stage(ctx, progress_callback=None):
+    """Step 6: lip-sync the video to the Hindi audio, then clean up and attach the results to the job"""
+    job, store = ctx.job, ctx.store
+    logger.info("Running Wav2Lip for lip sync...")
+    update_step(job, "lip-sync", "in-progress", 98, progress_callback)
+    
+    def wav2lip_progress_callback(progress):
+        update_step(job, "lip-sync", "in-progress", 98 + (progress / 50), progress_callback) # 98 to 100
+    try:
+        if ctx.stage_done("lipsync", ctx.final_output_path):
+            logger.info("Using cached lip-synced video")
+        else:
+            with store.writing(ctx.final_output_path) as tmp_path:
+                # Only spans with dubbed speech and a face go through Wav2Lip, in parallel chunks
+                run_partial_wav2lip(
+                    ctx.video_path, ctx.hindi_audio_path, tmp_path, quality=job.quality,
+                    progress_callback=wav2lip_progress_callback, video_hash=ctx.video_hash, probe=ctx.probe
+                )
+        ctx.tracker.record("lipsync", ctx.keys["lipsync"], ctx.final_output_path)
+        update_step(job, "lip-sync", "completed", 100, progress_callback)
+        logger.info(f"Dubbed video created and saved to {ctx.final_output_path}")
+    except Exception as e:
+        logger.error(f"Wav2Lip failed: {e}")
+        job.status = 'failed'
+        job.error_message = f"Wav2Lip failed: {e}"
+        job.save(update_fields=['status', 'error_message'])
+        raise
+
+    # Step 7: Cleanup
+    cleanup_segment_audio(job)
+    store.prune()
+    logger.info("Temporary files cleaned up.")
+
+    # Update job status
+    job.result_file = store.relative(ctx.final_output_path)
+    job.dubbed_audio_file.name = store.relative(ctx.hindi_audio_path)
+    job.status = 'completed'
+    job.save(update_fields=['status', 'result_file', 'dubbed_audio_file'])
+    logger.info("=== Dubbing pipeline completed successfully ===")
+
+    # Return status for frontend
+    return {
+        "status": "success",
+        "result_file": str(ctx.final_output_path),
+        "message": "Dubbing completed successfully."
+    }
+
+STAGE_RUNNERS = {
+    "extract": run_extract_stage,
+    "transcript": run_transcript_stage,
+    "translation": run_translation_stage,
+    "tts": run_tts_stage,
+    "lipsync": run_lipsync_stage,
+}
+
+def run_job_stage(job_id, stage, progress_callback=None):
+    """
+    Run one stage of a job in this process; the per-stage Celery tasks call
+    this. A stage whose checkpoint is current only reloads its outputs.
+    """
+    ctx = JobContext.load(job_id)
+    try:
+        return STAGE_RUNNERS[stage](ctx, progress_callback)
+    except Exception as e:
+        logger.error(f"Error in {stage} stage for job {job_id}: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+def resume_dubbing_pipeline(job_id, progress_callback=None):
+    """Continue a job from its first incomplete stage, reusing checkpointed outputs"""
     DubbingJob = apps.get_model('dubbing', 'DubbingJob')
     job = DubbingJob.objects.get(id=job_id)
-    base_name = Path(video_path).stem
-
-    # Define all output paths in their respective folders
-    extracted_audio_path = MEDIA_ROOT / "audio" / f"{base_name}_extracted.wav"
-    hindi_audio_path = MEDIA_ROOT / "audio" / f"{base_name}_hindi.wav"
-    final_output_path = MEDIA_ROOT / "results" / f"{base_name}_dubbed.mp4"
+    return dubbing_pipeline(job.video_file.path, job_id, progress_callback)
 
-    # Ensure directories exist
-    for p in [extracted_audio_path, hindi_audio_path, final_output_path]:
-        ensure_dir(p)
+def dubbing_pipeline(video_path, job_id, progress_callback=None):
+    """
+    Run the full dubbing pipeline for a job in this process, stage after stage.
 
-    temp_files = [extracted_audio_path, hindi_audio_path]
+    Every stage records a checkpoint when it finishes, so calling this again
+    for the same job (or ``resume_dubbing_pipeline``) skips straight to the
+    first incomplete stage. Workers run the same stages as separate tasks
+    (see ``tasks.dubbing_chain``). Raises on failure after marking the job
+    failed.
+    """
+    DubbingJob = apps.get_model('dubbing', 'DubbingJob')
+    job = DubbingJob.objects.get(id=job_id)
 
     # Set job status to processing at the start
     job.status = 'processing'
     job.progress = 0
     job.save(update_fields=["status", "progress"])
+    if progress_callback is None:
+        progress_callback = ProgressPublisher(job.id, step_status=job.step_status)
 
     try:
-        logger.info("=== Starting full folder and resource check ===")
-        # Run all critical checks (system, video, audio)
-        run_all_checks(video_path)
-        logger.info("All critical checks passed.")
-
-        logger.info(f"Received video upload: {video_path}")
-
-        # Step 1: Extract audio
-        logger.info("Extracting audio from video...")
-        update_step(job, "speech-recognition", "in-progress", 10, progress_callback)
-        extract_audio_ffmpeg(video_path, extracted_audio_path)
-        job.extracted_audio.name = str(Path("audio") / f"{base_name}_extracted.wav")
-        job.save(update_fields=['extracted_audio'])
-        update_step(job, "speech-recognition", "completed", 20, progress_callback)
-        logger.info(f"Audio extracted and saved to: {extracted_audio_path}")
-
-        # Step 2: Inspect audio
-        logger.info("Inspecting audio properties...")
-        update_step(job, "translation", "in-progress", 30, progress_callback)
-        props = inspect_audio_properties(extracted_audio_path)
-        logger.info(f"Audio properties: {props}")
-        update_step(job, "translation", "completed", 40, progress_callback)
-
-        # Step 3: Transcribe
-        logger.info("Transcribing audio...")
-        update_step(job, "voice-synthesis", "in-progress", 50, progress_callback)
-        english_text = transcribe_audio_with_whisper(extracted_audio_path)
-        update_step(job, "voice-synthesis", "completed", 60, progress_callback)
-        logger.info("Transcription completed successfully")
-
-        # Step 4: Translate
-        logger.info("Translating text to Hindi...")
-        update_step(job, "lip-sync", "in-progress", 70, progress_callback)
-        hindi_text = translate_text_to_hindi(english_text)
-        job.translated_subtitles = hindi_text
-        job.save(update_fields=['translated_subtitles'])
-        update_step(job, "lip-sync", "completed", 80, progress_callback)
-        logger.info("="*40)
-        logger.info(f"Translated Hindi text:\n{hindi_text}")
-        logger.info("="*40)
-        print(f"\n=== Translated Hindi text ===\n{hindi_text}\n============================\n")
-
-        # Step 5: Synthesize Hindi audio (voice cloning)
-        logger.info("Synthesizing Hindi voice...")
-        update_step(job, "processing", "in-progress", 90, progress_callback)
-        props = inspect_audio_properties(extracted_audio_path)
-        logger.info(f"Reference audio properties: {props}")
-        synthesize_hindi_audio(
-            text=hindi_text,
-            output_path=hindi_audio_path,
-            reference_audio=extracted_audio_path
-        )
-        update_step(job, "processing", "completed", 95, progress_callback)
-        logger.info(f"Hindi audio synthesized and saved to {hindi_audio_path}")
-
-        # Step 6: Lip sync
-        logger.info("Running Wav2Lip for lip sync...")
-        update_step(job, "lip-sync", "in-progress", 98, progress_callback)
-        
-        def wav2lip_progress_callback(progress):
-            update_step(job, "lip-sync", "in-progress", 98 + (progress / 50), progress_callback) # 98 to 100
-        try:
-            run_wav2lip(video_path, hindi_audio_path, final_output_path, quality=job.quality, progress_callback=wav2lip_progress_callback)
-            update_step(job, "lip-sync", "completed", 100, progress_callback)
-            logger.info(f"Dubbed video created and saved to {final_output_path}")
-        except Exception as e:
-            logger.error(f"Wav2Lip failed: {e}")
-            job.status = 'failed'
-            job.error_message = f"Wav2Lip failed: {e}"
-            job.save(update_fields=['status', 'error_message'])
-            raise
-
-        # Step 7: Cleanup
-        cleanup_temp_files(*temp_files)
-        logger.info("Temporary files cleaned up.")
-
-        # Update job status
-        rel_path = Path("results") / f"{Path(video_path).stem}_dubbed.mp4"
-        job.result_file = str(rel_path)
-        job.dubbed_audio_file.name = str(Path("audio") / f"{base_name}_hindi.wav")
-        job.status = 'completed'
-        job.save(update_fields=['status', 'result_file', 'dubbed_audio_file'])
-        logger.info("=== Dubbing pipeline completed successfully ===")
-
-        # Return status for frontend
-        return {
-            "status": "success",
-            "result_file": str(final_output_path),
-            "message": "Dubbing completed successfully."
-        }
+        ctx = JobContext(job, video_path)
+        resume_from = ctx.tracker.first_incomplete(ctx.keys)
+        if resume_from != "extract":
+            logger.info(f"Resuming job {job_id} from stage: {resume_from or 'finalize'}")
+
+        no_speech = run_extract_stage(ctx, progress_callback) or run_transcript_stage(ctx, progress_callback)
+        if no_speech is not None:
+            return no_speech
+        run_translation_stage(ctx, progress_callback)
+        run_tts_stage(ctx, progress_callback)
+        return run_lipsync_stage(ctx, progress_callback)
 
     except Exception as e:
         logger.error(f"Error in dubbing pipeline for job {job_id}: {str(e)}")
         logger.error(traceback.format_exc())
-        cleanup_temp_files(*temp_files)
         job.status = 'failed'
         job.error_message = str(e)
         job.save(update_fields=['status', 'error_message'])
-        return {
-            "status": "failed",
-            "error": str(e),
-            "message": "Dubbing failed. Check logs for details."
-        }
+        raise
@@ -0,0 +1,156 @@
+import json
+import logging
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROGRESS_CONFIG = {
+    'MIN_INTERVAL_MS': 1000,  # At most one progress write per job in this window
+    'REDIS_URL': None,  # Pub/sub for live progress streams; None = CELERY_BROKER_URL
+    'CHANNEL_PREFIX': 'dubbing:progress:',
+    'KEEPALIVE_SECONDS': 15,  # Comment line sent on idle event streams
+    'POLL_SECONDS': 2.0,  # Database poll interval for event streams when Redis is unavailable
+    'MAX_STREAM_JOBS': 100,  # Jobs one event stream may watch
+}
+
+TERMINAL_STATUSES = ('completed', 'failed')
+
+
+def get_progress_config():
+    """Return PROGRESS_CONFIG from settings merged over the defaults"""
+    config = dict(DEFAULT_PROGRESS_CONFIG)
+    config.update(getattr(settings, 'PROGRESS_CONFIG', {}) or {})
+    if not config['REDIS_URL']:
+        config['REDIS_URL'] = getattr(settings, 'CELERY_BROKER_URL', None)
+    return config
+
+
+def use_redis(config):
+    return bool(config['REDIS_URL']) and config['REDIS_URL'].startswith(('redis://', 'rediss://', 'unix://'))
+
+
+_redis = None
+_redis_lock = threading.Lock()
+_redis_retry_at = 0.0
+REDIS_RETRY_SECONDS = 60  # After a failed publish, skip Redis for this long instead of stalling every flush
+
+
+def get_redis(config=None):
+    """Process-wide Redis client for publishing progress, or None when Redis isn't configured"""
+    global _redis
+    config = config or get_progress_config()
+    if not use_redis(config):
+        return None
+    with _redis_lock:
+        if _redis is None:
+            import redis
+            _redis = redis.Redis.from_url(config['REDIS_URL'], socket_timeout=2)
+    return _redis
+
+
+def overall_progress(step_status):
+    """A job's progress: the mean of its steps' progress"""
+    if not step_status:
+        return 0
+    return sum(step.get('progress', 0) for step in step_status.values()) / len(step_status)
+
+
+class ProgressPublisher:
+    """
+    Holds a job's step progress in memory and coalesces writes.
+
+    Call it as ``publisher(step_id, status, progress_percent)``. The row (and
+    the Celery task state, when there is a task) is written at most once per
+    MIN_INTERVAL_MS; a step changing status is always written straight away,
+    so status reads never miss a transition. ``flush()`` writes whatever is
+    still pending. Only the steps this publisher reported are written, so
+    several workers can publish steps of one job.
+    """
+
+    def __init__(self, job_id, task=None, step_status=None, config=None):
+        config = config or get_progress_config()
+        self.job_id = job_id
+        self.task = task
+        self.interval = config['MIN_INTERVAL_MS'] / 1000
+        self.channel = f"{config['CHANNEL_PREFIX']}{job_id}"
+        self.config = config
+        self.step_status = dict(step_status or {})
+        self.progress = overall_progress(self.step_status)
+        self.stats = {"updates": 0, "writes": 0}
+        self._changed = set()
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, step_id, status, progress_percent):
+        with self._lock:
+            previous = self.step_status.get(step_id, {}).get('status')
+            self.step_status[step_id] = {"status": status, "progress": progress_percent}
+            self.progress = overall_progress(self.step_status)
+            self.stats["updates"] += 1
+            self._changed.add(step_id)
+            due = previous != status or time.monotonic() - self._last_write >= self.interval
+        if due:
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {"progress": self.progress, "step_status": {k: dict(v) for k, v in self.step_status.items()}}
+
+    def flush(self):
+        """Write the steps changed since the last write, if any"""
+        with self._lock:
+            if not self._changed:
+                return False
+            changed = {step_id: dict(self.step_status[step_id]) for step_id in self._changed}
+            self._changed = set()
+            self._last_write = time.monotonic()
+            self.stats["writes"] += 1
+        DubbingJob = apps.get_model('dubbing', 'DubbingJob')
+        # Other workers publish steps of the same job (the TTS batches of a chord), so merge
+        # only this publisher's steps into the row under its lock rather than writing a snapshot
+        with transaction.atomic():
+            current = DubbingJob.objects.select_for_update().filter(id=self.job_id) \
+                .values_list('step_status', flat=True).first()
+            step_status = {**(current or {}), **changed}
+            DubbingJob.objects.filter(id=self.job_id).update(
+                progress=overall_progress(step_status), step_status=step_status,
+                version=F('version') + 1,
+            )
+        with self._lock:
+            # Take the other workers' steps, keeping any of ours updated since
+            for step_id, step in step_status.items():
+                if step_id not in self._changed:
+                    self.step_status[step_id] = step
+            self.progress = overall_progress(self.step_status)
+            state = {"progress": self.progress, "step_status": {k: dict(v) for k, v in self.step_status.items()}}
+        if self.task is not None:
+            self.task.update_state(state='PROGRESS', meta=state)
+        self.publish(state)
+        return True
+
+    def publish(self, event):
+        """Push an event to live progress streams; progress is already saved, so failures only log"""
+        global _redis_retry_at
+        if time.monotonic() < _redis_retry_at:
+            return
+        try:
+            client = get_redis(self.config)
+            if client is not None:
+                client.publish(self.channel, json.dumps({"job_id": self.job_id, **event}))
+        except Exception as e:
+            _redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+            logger.warning(f"Could not publish progress for job {self.job_id}: {str(e)}")
+
+    def finish(self, status, error=None):
+        """Flush pending progress and announce the job's final (or retry) status"""
+        self.flush()
+        event = {**self.snapshot(), "status": status, "error": error}
+        if status == 'completed':
+            event["progress"] = 100
+        self.publish(event)
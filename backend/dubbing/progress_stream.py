@@ -0,0 +1,187 @@
+import asyncio
+import json
+import logging
+import time
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+
+from .progress import REDIS_RETRY_SECONDS, TERMINAL_STATUSES, get_progress_config, use_redis
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 64  # Events buffered per stream; a slow client skips intermediate progress
+STATE_FIELDS = ('id', 'status', 'progress', 'step_status', 'error_message')
+
+
+def _event_from_row(row):
+    return {
+        "job_id": row["id"],
+        "status": row["status"],
+        "progress": row["progress"],
+        "step_status": row["step_status"] or {},
+        "error": row["error_message"],
+    }
+
+
+def _fetch_states(job_ids):
+    DubbingJob = apps.get_model('dubbing', 'DubbingJob')
+    return [_event_from_row(row) for row in DubbingJob.objects.filter(id__in=job_ids).values(*STATE_FIELDS)]
+
+
+fetch_states = sync_to_async(_fetch_states, thread_sensitive=False)
+
+
+class ProgressHub:
+    """
+    Fans progress events out to every event stream of one ASGI process.
+
+    A single Redis pattern subscription serves all open streams, held only
+    while some stream is open. Without Redis (or while it is down) one
+    database query per POLL_SECONDS covers every watched job, so idle
+    streams cost nothing per client.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_progress_config()
+        self.watchers = {}
+        self._task = None
+        self._polled = {}
+
+    def subscribe(self, job_ids):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        for job_id in job_ids:
+            self.watchers.setdefault(job_id, set()).add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue, job_ids):
+        for job_id in job_ids:
+            queues = self.watchers.get(job_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self.watchers[job_id]
+                    self._polled.pop(job_id, None)
+        if not self.watchers and self._task is not None:
+            # Last stream closed: drop the subscription (or polling); the next subscribe starts it again
+            self._task.cancel()
+            self._task = None
+
+    def prime(self, states):
+        """Record states a stream already sent so polling doesn't repeat them"""
+        for state in states:
+            self._polled.setdefault(state["job_id"], state)
+
+    def dispatch(self, event):
+        for queue in list(self.watchers.get(event.get("job_id"), ())):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def _run(self):
+        while self.watchers:
+            if use_redis(self.config):
+                try:
+                    await self._listen()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Progress subscription failed, polling the database: {str(e)}")
+                await self._poll(time.monotonic() + REDIS_RETRY_SECONDS)
+            else:
+                await self._poll()
+
+    async def _listen(self):
+        import redis.asyncio as redis
+
+        client = redis.Redis.from_url(self.config['REDIS_URL'])
+        pubsub = client.pubsub()
+        try:
+            await pubsub.psubscribe(f"{self.config['CHANNEL_PREFIX']}*")
+            logger.info("Progress hub subscribed to Redis")
+            async for message in pubsub.listen():
+                if message["type"] == "pmessage":
+                    self.dispatch(json.loads(message["data"]))
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+    async def _poll(self, until=None):
+        while self.watchers and (until is None or time.monotonic() < until):
+            try:
+                for event in await fetch_states(list(self.watchers)):
+                    if self._polled.get(event["job_id"]) != event:
+                        self._polled[event["job_id"]] = event
+                        self.dispatch(event)
+            except Exception as e:
+                logger.warning(f"Progress poll failed: {str(e)}")
+            await asyncio.sleep(self.config['POLL_SECONDS'])
+
+
+_hubs = weakref.WeakKeyDictionary()
+
+
+def get_progress_hub():
+    """Return the progress hub of the running event loop"""
+    loop = asyncio.get_running_loop()
+    if loop not in _hubs:
+        _hubs[loop] = ProgressHub()
+    return _hubs[loop]
+
+
+def format_event(event, name="progress"):
+    return f"event: {name}\ndata: {json.dumps(event)}\n\n"
+
+
+async def job_event_stream(job_ids, config=None):
+    """
+    Server-sent events for ``job_ids``: the current state of each job, then
+    every change pushed by its ProgressPublisher. Ends once every job has
+    completed or failed.
+    """
+    config = config or get_progress_config()
+    hub = get_progress_hub()
+    queue = hub.subscribe(job_ids)
+    try:
+        pending = set(job_ids)
+        states = await fetch_states(job_ids)
+        hub.prime(states)
+        for missing in pending - {state["job_id"] for state in states}:
+            yield format_event({"job_id": missing, "error": "Job not found"}, name="error")
+        pending = {state["job_id"] for state in states}
+        for state in states:
+            yield format_event(state)
+            if state["status"] in TERMINAL_STATUSES:
+                pending.discard(state["job_id"])
+
+        while pending:
+            try:
+                event = await asyncio.wait_for(queue.get(), config['KEEPALIVE_SECONDS'])
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield format_event(event)
+            if event.get("status") in TERMINAL_STATUSES:
+                pending.discard(event["job_id"])
+        yield format_event({"job_ids": list(job_ids)}, name="end")
+    finally:
+        hub.unsubscribe(queue, job_ids)
+
+
+async def job_event_snapshot(job_ids, config=None):
+    """
+    The current state of ``job_ids`` as one finite block of server-sent
+    events, for servers that can't hold a stream open (WSGI). Its ``retry``
+    of POLL_SECONDS makes the EventSource reconnect, so the client polls;
+    ``end`` is sent once every job has completed or failed.
+    """
+    config = config or get_progress_config()
+    states = await fetch_states(job_ids)
+    events = [f"retry: {int(config['POLL_SECONDS'] * 1000)}\n\n"]
+    events += [format_event(state) for state in states]
+    if all(state["status"] in TERMINAL_STATUSES for state in states):
+        events.append(format_event({"job_ids": list(job_ids)}, name="end"))
+    return "".join(events)
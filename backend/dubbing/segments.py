@@ -0,0 +1,191 @@
+import logging
+import os
+import shutil
+from pathlib import Path
+
+from django.apps import apps
+from django.db import transaction
+
+from .translation_utils import translate_text_to_hindi, translate_texts_to_hindi
+from .voice_utils import synthesize_hindi_audio
+
+logger = logging.getLogger(__name__)
+
+MEDIA_ROOT = Path(__file__).parent.parent / "media"
+SEGMENT_AUDIO_DIR = MEDIA_ROOT / "audio" / "segments"
+BULK_BATCH_SIZE = 500
+
+
+def save_segments(job, segments):
+    """Replace the job's segments with ``segments`` (start/end/text dicts) in bulk"""
+    Segment = apps.get_model('dubbing', 'Segment')
+    rows = [
+        Segment(
+            job=job,
+            index=i,
+            start=seg["start"],
+            end=seg["end"],
+            source_text=seg["text"],
+        )
+        for i, seg in enumerate(segments)
+    ]
+    with transaction.atomic():
+        Segment.objects.filter(job=job).delete()
+        Segment.objects.bulk_create(rows, batch_size=BULK_BATCH_SIZE)
+    logger.info(f"Saved {len(rows)} segments for job {job.id}")
+    return list(Segment.objects.filter(job=job).order_by('index'))
+
+
+def load_or_save_segments(job, segments):
+    """
+    Reuse the job's stored segments when they match ``segments`` (a resumed job),
+    so per-segment translation and TTS progress survives; otherwise replace them.
+    """
+    Segment = apps.get_model('dubbing', 'Segment')
+    existing = list(Segment.objects.filter(job=job).order_by('index'))
+    if len(existing) == len(segments) and all(
+        row.source_text == seg["text"] and abs(row.start - seg["start"]) < 1e-3
+        for row, seg in zip(existing, segments)
+    ):
+        logger.info(f"Resuming with {len(existing)} existing segments for job {job.id}")
+        return existing
+    return save_segments(job, segments)
+
+
+def clear_segments(job):
+    Segment = apps.get_model('dubbing', 'Segment')
+    Segment.objects.filter(job=job).delete()
+
+
+def append_segments(job, segments, first_index):
+    """Bulk insert a batch of newly transcribed segments, numbering from ``first_index``"""
+    Segment = apps.get_model('dubbing', 'Segment')
+    rows = [
+        Segment(
+            job=job,
+            index=first_index + i,
+            start=seg["start"],
+            end=seg["end"],
+            source_text=seg["text"],
+        )
+        for i, seg in enumerate(segments)
+    ]
+    Segment.objects.bulk_create(rows, batch_size=BULK_BATCH_SIZE)
+    return list(
+        Segment.objects.filter(job=job, index__gte=first_index, index__lt=first_index + len(rows))
+        .order_by('index')
+    )
+
+
+def segment_audio_path(segment):
+    return SEGMENT_AUDIO_DIR / str(segment.job_id) / f"{segment.index:05d}.wav"
+
+
+def cleanup_segment_audio(job):
+    """Remove per-segment clips once the assembled track has been used"""
+    shutil.rmtree(SEGMENT_AUDIO_DIR / str(job.id), ignore_errors=True)
+
+
+def apply_translations(segments, translations):
+    """Store already known translations on the segments with one bulk update"""
+    for seg, translated in zip(segments, translations):
+        seg.translated_text = translated
+        seg.status = 'translated'
+    Segment = apps.get_model('dubbing', 'Segment')
+    Segment.objects.bulk_update(segments, ['translated_text', 'status'], batch_size=BULK_BATCH_SIZE)
+    return segments
+
+
+def translate_pending_segments(segments):
+    """
+    Translate every untranslated segment in one batched call and one bulk update.
+
+    Failures are left for the per-segment stage to retry individually.
+    """
+    pending = [seg for seg in segments if not seg.translated_text]
+    if not pending:
+        return 0
+    try:
+        translations = translate_texts_to_hindi([seg.source_text for seg in pending])
+    except Exception as e:
+        logger.warning(f"Batched translation failed, falling back to per-segment: {str(e)}")
+        return 0
+    apply_translations(pending, translations)
+    logger.info(f"Translated {len(pending)} segments in one batch")
+    return len(pending)
+
+
+def translate_segment(segment):
+    """Translate one segment and persist the result"""
+    segment.translated_text = translate_text_to_hindi(segment.source_text)
+    segment.status = 'translated'
+    segment.error_message = None
+    segment.save(update_fields=['translated_text', 'status', 'error_message'])
+    return segment
+
+
+def synthesize_segment(segment, reference_audio):
+    """Synthesize one translated segment to its own WAV file"""
+    output_path = segment_audio_path(segment)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    synthesize_hindi_audio(
+        text=segment.translated_text,
+        output_path=str(output_path),
+        reference_audio=str(reference_audio)
+    )
+    segment.audio_file = str(output_path)
+    segment.status = 'synthesized'
+    segment.error_message = None
+    segment.save(update_fields=['audio_file', 'status', 'error_message'])
+    return segment
+
+
+def is_done(segment, stage):
+    if stage == 'translate':
+        return bool(segment.translated_text)
+    if stage == 'synthesize':
+        return (
+            segment.status == 'synthesized'
+            and bool(segment.audio_file)
+            and os.path.exists(segment.audio_file)
+        )
+    return False
+
+
+def process_segment(segment, stage, handler, max_retries=2):
+    """Run ``handler(segment)`` with retries; marks the segment failed and returns False on give-up"""
+    last_error = None
+    for attempt in range(max_retries + 1):
+        try:
+            handler(segment)
+            return True
+        except Exception as e:
+            last_error = e
+            logger.warning(
+                f"Segment {segment.index} {stage} attempt {attempt + 1}/{max_retries + 1} failed: {str(e)}"
+            )
+    segment.status = 'failed'
+    segment.error_message = f"{stage}: {last_error}"
+    segment.save(update_fields=['status', 'error_message'])
+    return False
+
+
+def run_segment_stage(segments, stage, handler, max_retries=2, progress_callback=None):
+    """
+    Run ``handler(segment)`` for every segment that has not finished ``stage``.
+
+    Each segment is retried on its own; a segment that keeps failing is marked
+    failed and the stage raises after the remaining segments have been tried.
+    """
+    pending = [seg for seg in segments if not is_done(seg, stage)]
+    failed = []
+    for done_count, segment in enumerate(pending, 1):
+        if not process_segment(segment, stage, handler, max_retries):
+            failed.append(segment)
+        if progress_callback:
+            progress_callback(done_count, len(pending))
+
+    if failed:
+        indexes = ', '.join(str(seg.index) for seg in failed)
+        raise RuntimeError(f"{stage} failed for segments: {indexes}")
+    return segments
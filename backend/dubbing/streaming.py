@@ -0,0 +1,191 @@
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .audio_ingest import ASR_SAMPLE_RATE
+from .audio_utils import run_whisper
+from .vad import window_bounds
+from .segments import append_segments, clear_segments, process_segment, translate_segment, synthesize_segment
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = ASR_SAMPLE_RATE
+
+DEFAULT_STREAMING_CONFIG = {
+    'ENABLED': False,
+    'ASR_WINDOW_SECONDS': 30,
+    'QUEUE_SIZE': 8,  # Max segments buffered between two stages (backpressure)
+    'TRANSLATE_WORKERS': 2,
+    'TTS_WORKERS': 1,
+    'MAX_RETRIES': 2,
+}
+
+_DONE = object()
+
+
+def get_streaming_config():
+    """Return STREAMING_CONFIG from settings merged over the defaults"""
+    config = dict(DEFAULT_STREAMING_CONFIG)
+    config.update(getattr(settings, 'STREAMING_CONFIG', {}) or {})
+    return config
+
+
+class _Stage:
+    """A pool of worker threads pulling segments from ``inbox`` and feeding ``outbox``"""
+
+    def __init__(self, name, handler, inbox, outbox, workers, max_retries, pipeline):
+        self.name = name
+        self.handler = handler
+        self.inbox = inbox
+        self.outbox = outbox
+        self.max_retries = max_retries
+        self.pipeline = pipeline
+        self.threads = [
+            threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+        if self.outbox is not None:
+            self.outbox.put(_DONE)
+
+    def _run(self):
+        close_old_connections()
+        try:
+            while True:
+                segment = self.inbox.get()
+                if segment is _DONE:
+                    # Let sibling workers see the sentinel too
+                    self.inbox.put(_DONE)
+                    return
+                if self.pipeline.failed.is_set():
+                    continue
+                if not process_segment(segment, self.name, self.handler, self.max_retries):
+                    self.pipeline.fail(RuntimeError(f"{self.name} failed for segment {segment.index}"))
+                    continue
+                self.pipeline.segment_done(self.name)
+                if self.outbox is not None:
+                    self.pipeline.put(self.outbox, segment)
+        except Exception as e:
+            self.pipeline.fail(e)
+        finally:
+            connection.close()
+
+
+class StreamingPipeline:
+    """
+    ASR -> translate -> TTS as a producer/consumer chain over bounded queues.
+
+    ``audio`` is 16 kHz mono float32. With ``speech`` (see
+    ``vad.detect_speech``) only its speech regions are transcribed. The ASR
+    producer transcribes the audio window by window and hands each segment to the translation workers as soon as it
+    exists; translated segments flow on to the TTS workers. Queue sizes bound
+    how far a fast stage can run ahead of a slow one.
+    """
+
+    def __init__(self, job, audio, reference_audio, config=None, progress_callback=None, speech=None):
+        self.job = job
+        self.audio = audio
+        self.speech = speech
+        self.reference_audio = str(reference_audio)
+        self.config = config or get_streaming_config()
+        self.progress_callback = progress_callback
+        self.failed = threading.Event()
+        self.error = None
+        self.segments = []
+        self.counts = {"transcribed": 0, "translate": 0, "synthesize": 0}
+        self._lock = threading.Lock()
+
+    def fail(self, error):
+        with self._lock:
+            if self.error is None:
+                self.error = error
+        self.failed.set()
+        logger.error(f"Streaming pipeline for job {self.job.id} failed: {error}")
+
+    def put(self, q, item):
+        # Block on a full queue (backpressure) but wake up if the pipeline failed
+        while not self.failed.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def segment_done(self, stage):
+        with self._lock:
+            self.counts[stage] += 1
+            counts = dict(self.counts)
+        if self.progress_callback:
+            self.progress_callback(stage, counts)
+
+    def _produce(self, translate_queue):
+        # Segments left over from an interrupted run would clash with the new numbering
+        clear_segments(self.job)
+        speech = self.speech
+        audio = speech.pack(self.audio, SAMPLE_RATE) if speech is not None else self.audio
+        next_index = 0
+        for start, end in window_bounds(audio, self.config['ASR_WINDOW_SECONDS']):
+            if self.failed.is_set():
+                break
+            offset = start / SAMPLE_RATE
+            result = run_whisper(audio[start:end])
+            batch = [
+                {"start": offset + seg["start"], "end": offset + seg["end"], "text": seg["text"].strip()}
+                for seg in result.get("segments", [])
+                if seg["text"].strip()
+            ]
+            if speech is not None:
+                batch = speech.remap(batch)
+            if not batch:
+                continue
+            rows = append_segments(self.job, batch, next_index)
+            next_index += len(rows)
+            with self._lock:
+                self.segments.extend(rows)
+                self.counts["transcribed"] += len(rows)
+            for segment in rows:
+                self.put(translate_queue, segment)
+            logger.info(f"ASR window {offset:.1f}s produced {len(rows)} segments")
+
+    def run(self):
+        """Run all stages to completion and return the job's segments in order"""
+        translate_queue = queue.Queue(maxsize=self.config['QUEUE_SIZE'])
+        tts_queue = queue.Queue(maxsize=self.config['QUEUE_SIZE'])
+        retries = self.config['MAX_RETRIES']
+
+        translate = _Stage(
+            "translate", translate_segment, translate_queue, tts_queue,
+            self.config['TRANSLATE_WORKERS'], retries, self,
+        )
+        synthesize = _Stage(
+            "synthesize", lambda seg: synthesize_segment(seg, self.reference_audio), tts_queue, None,
+            self.config['TTS_WORKERS'], retries, self,
+        )
+        translate.start()
+        synthesize.start()
+
+        try:
+            self._produce(translate_queue)
+        except Exception as e:
+            self.fail(e)
+        finally:
+            self.put(translate_queue, _DONE)
+            if self.failed.is_set():
+                # Unblock workers waiting on a queue the producer will never fill
+                translate_queue.put(_DONE)
+            translate.join()
+            synthesize.join()
+
+        if self.error is not None:
+            raise self.error
+        return sorted(self.segments, key=lambda seg: seg.index)
@@ -1,38 +1,205 @@
-from celery import shared_task
+import logging
+import os
+
+from celery import chain, chord, shared_task
+from celery.signals import worker_init, worker_process_init
 from django.apps import apps
+from django.conf import settings
+
+from .progress import ProgressPublisher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STAGE_TASK_CONFIG = {
+    # Worker sizing per queue, used by `manage.py run_stage_worker <queue>`. asr and lipsync
+    # start their own process pools, which a (daemonic) prefork child can't, so they use threads.
+    'QUEUES': {
+        'io': {'concurrency': 8, 'prefetch': 4, 'pool': 'prefork'},  # Probing, audio extraction, translation, dispatch
+        'asr': {'concurrency': 1, 'prefetch': 1, 'pool': 'threads'},  # Long files fan out to the ASR process pool
+        'tts': {'concurrency': 1, 'prefetch': 1, 'pool': 'prefork'},
+        'lipsync': {'concurrency': 1, 'prefetch': 1, 'pool': 'threads'},  # Each task fans out to the lip-sync process pool
+    },
+    'TTS_BATCH_SEGMENTS': 16,  # Segments per TTS task when a job's synthesis is spread over the tts workers
+}
+
+# Task options of every pipeline stage: failed stages are retried with backoff
+# and a stage whose worker died is redelivered; both continue from the checkpoints.
+STAGE_TASK_OPTIONS = dict(
+    bind=True,
+    autoretry_for=(Exception,),
+    dont_autoretry_for=(ValueError,),
+    retry_backoff=30,
+    retry_backoff_max=600,
+    retry_jitter=True,
+    max_retries=3,
+    acks_late=True,
+    reject_on_worker_lost=True,
+)
+
 
-@shared_task(bind=True)
-def process_dubbing_task(self, video_path, job_id):
+def get_stage_task_config():
+    """Return STAGE_TASK_CONFIG from settings merged over the defaults"""
+    config = dict(DEFAULT_STAGE_TASK_CONFIG)
+    config.update(getattr(settings, 'STAGE_TASK_CONFIG', {}) or {})
+    return config
+
+
+@worker_process_init.connect
+def warm_up_worker_models(**kwargs):
     """
-    Process a dubbing job asynchronously, with progress updates.
+    Load models once per worker process instead of once per job. Workers
+    started by run_stage_worker only load the models their queues use.
+    """
+    from .model_registry import warm_up_models
+    from .tts_engine import warm_up_tts
+    from .lipsync_engine import warm_up_lipsync
+    warm_ups = {'asr': warm_up_models, 'tts': warm_up_tts, 'lipsync': warm_up_lipsync}
+    queues = os.environ.get('DUBBING_WORKER_QUEUES')
+    for queue in (queues.split(',') if queues else warm_ups):
+        if queue in warm_ups:
+            warm_ups[queue]()
+
+
+@worker_init.connect
+def warm_up_pool_worker_models(**kwargs):
+    """Threads and solo pools have no child processes (no worker_process_init): warm up in the worker itself"""
+    if os.environ.get('DUBBING_WORKER_POOL') in ('threads', 'solo'):
+        warm_up_worker_models()
+
+
+def _run_stage(task, job_id, run, final=False):
+    """
+    Run ``run(progress_callback)`` for one stage of a job with status and
+    progress bookkeeping. ``final`` marks the job completed afterwards.
     """
-    from .pipeline import dubbing_pipeline
     DubbingJob = apps.get_model('dubbing', 'DubbingJob')
     job = DubbingJob.objects.only(
         'id', 'status', 'progress', 'step_status', 'error_message'
     ).get(id=job_id)
+    if job.status == 'completed':
+        # A silent video finishes at ASR; the rest of its chain has nothing to do
+        logger.info(f"Job {job_id} is already completed, skipping {task.name}")
+        return job_id
 
-    def progress_callback(step, status, progress_percent):
-        """Callback to update job progress and step status."""
-        job.progress = progress_percent
-        if job.step_status is None:
-            job.step_status = {}
-        job.step_status[step] = {"status": status, "progress": 100 if status == "completed" else 0}
-        job.save(update_fields=["progress", "step_status"])
-        self.update_state(state='PROGRESS', meta={'progress': progress_percent})
+    # Step progress is held in memory and written at most once per PROGRESS_CONFIG interval
+    publisher = ProgressPublisher(job.id, task=task, step_status=job.step_status)
 
     try:
-        job.status = 'processing'
-        job.save(update_fields=["status"])
-        
-        dubbing_pipeline(video_path, job_id, progress_callback)
+        if job.status != 'processing':
+            job.status = 'processing'
+            job.save(update_fields=["status"])
+            publisher.publish({"status": job.status})
 
-        job.status = 'completed'
-        job.progress = 100
-        job.save(update_fields=["status", "progress"])
+        try:
+            result = run(publisher)
+        finally:
+            publisher.flush()
+
+        if final:
+            job.status = 'completed'
+            job.progress = 100
+            job.save(update_fields=["status", "progress"])
+            publisher.finish(job.status)
+        elif result is not None:
+            # The stage finished the job early (no speech)
+            publisher.finish('completed')
+        return job_id
 
     except Exception as e:
-        job.status = 'failed'
-        job.error_message = str(e)
+        # ValueError means bad input (failed checks, no speech); anything else is retried
+        # and the retry resumes from the stage's checkpoint.
+        will_retry = not isinstance(e, ValueError) and task.request.retries < task.max_retries
+        job.status = 'pending' if will_retry else 'failed'
+        job.error_message = f"Retrying after error: {e}" if will_retry else str(e)
         job.save(update_fields=["status", "error_message"])
+        publisher.finish(job.status, job.error_message)
         raise
+
+
+def _run_job_stage(task, job_id, stage, final=False):
+    from .pipeline import run_job_stage
+    return _run_stage(task, job_id, lambda callback: run_job_stage(job_id, stage, callback), final=final)
+
+
+@shared_task(**STAGE_TASK_OPTIONS)
+def extract_audio_task(self, job_id):
+    """Probe, check and decode the upload (io queue)"""
+    return _run_job_stage(self, job_id, "extract")
+
+
+@shared_task(**STAGE_TASK_OPTIONS)
+def transcribe_task(self, job_id):
+    """Speech detection and ASR (asr queue)"""
+    return _run_job_stage(self, job_id, "transcript")
+
+
+@shared_task(**STAGE_TASK_OPTIONS)
+def translate_task(self, job_id):
+    """Segment translation (io queue)"""
+    return _run_job_stage(self, job_id, "translation")
+
+
+@shared_task(**STAGE_TASK_OPTIONS)
+def synthesize_segments_task(self, job_id, indexes):
+    """Synthesize one batch of a job's segments (tts queue)"""
+    from .pipeline import JobContext, synthesize_segments
+
+    def run(callback):
+        synthesize_segments(JobContext.load(job_id), indexes)
+    return _run_stage(self, job_id, run)
+
+
+@shared_task(**STAGE_TASK_OPTIONS)
+def synthesize_task(self, job_id, fan_out=True):
+    """
+    TTS and assembly of the dubbed track (tts queue). When more segments are
+    pending than one TTS_BATCH_SEGMENTS batch, this task is replaced by a
+    chord of batch tasks, spread over every tts worker, that calls it back
+    to assemble the track.
+    """
+    from .pipeline import JobContext, pending_tts_batches
+    if fan_out:
+        batches = pending_tts_batches(JobContext.load(job_id), get_stage_task_config()['TTS_BATCH_SEGMENTS'])
+        if len(batches) > 1:
+            logger.info(f"Synthesizing job {job_id} in {len(batches)} batches")
+            return self.replace(chord(
+                [synthesize_segments_task.si(job_id, batch) for batch in batches],
+                synthesize_task.si(job_id, fan_out=False),
+            ))
+    return _run_job_stage(self, job_id, "tts")
+
+
+@shared_task(**STAGE_TASK_OPTIONS)
+def lipsync_task(self, job_id):
+    """Lip sync and the job's final results (lipsync queue)"""
+    return _run_job_stage(self, job_id, "lipsync", final=True)
+
+
+def dubbing_chain(job_id):
+    """
+    The job's stages as a chain of tasks, each routed (CELERY_TASK_ROUTES) to
+    the queue whose workers are sized for it. Every stage skips work its
+    checkpoint already covers, so the same chain also resumes a job.
+    """
+    return chain(
+        extract_audio_task.si(job_id),
+        transcribe_task.si(job_id),
+        translate_task.si(job_id),
+        synthesize_task.si(job_id),
+        lipsync_task.si(job_id),
+    )
+
+
+@shared_task
+def process_dubbing_task(video_path, job_id):
+    """
+    Start processing a dubbing job: queues its stage chain and returns.
+    ``video_path`` is kept for callers; stages read the job's video file.
+    """
+    dubbing_chain(job_id).delay()
+
+
+@shared_task
+def resume_dubbing_task(job_id):
+    """Resume a failed or interrupted job from its first incomplete stage."""
+    dubbing_chain(job_id).delay()
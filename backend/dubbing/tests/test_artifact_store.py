@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from dubbing.artifact_store import ArtifactStore
+from dubbing.models import DubbingJob
+
+
+class ArtifactStoreTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.store = ArtifactStore(os.path.join(self.media_root, 'artifacts'), max_age_days=1)
+
+    def test_keys_depend_on_input_stage_and_params(self):
+        key = self.store.key('asr', 'abc', {'model': 'small', 'language': 'en'})
+        self.assertEqual(key, self.store.key('asr', 'abc', {'language': 'en', 'model': 'small'}))
+        self.assertNotEqual(key, self.store.key('asr', 'abd', {'model': 'small', 'language': 'en'}))
+        self.assertNotEqual(key, self.store.key('tts', 'abc', {'model': 'small', 'language': 'en'}))
+        self.assertNotEqual(key, self.store.key('asr', 'abc', {'model': 'base', 'language': 'en'}))
+
+    def test_concurrent_writers_each_publish_a_whole_file(self):
+        path = self.store.path(self.store.key('tts', 'abc', {}), 'audio.wav')
+        start = threading.Barrier(8)
+        errors = []
+
+        def write(value):
+            try:
+                with self.store.writing(path) as tmp_path:
+                    self.assertTrue(tmp_path.name.endswith('-audio.wav'))
+                    start.wait()
+                    with open(tmp_path, 'wb') as f:
+                        for _ in range(64):
+                            f.write(bytes([value]) * 1024)
+                            time.sleep(0)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(value,)) for value in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        data = path.read_bytes()
+        self.assertEqual(len(data), 64 * 1024)
+        self.assertEqual(len(set(data)), 1)
+        self.assertEqual(os.listdir(path.parent), ['audio.wav'])
+
+    def test_failed_write_leaves_nothing(self):
+        path = self.store.path(self.store.key('tts', 'abc', {}), 'audio.wav')
+        with self.assertRaises(RuntimeError):
+            with self.store.writing(path) as tmp_path:
+                tmp_path.write_bytes(b'partial')
+                raise RuntimeError("encoder failed")
+        self.assertFalse(path.exists())
+        self.assertEqual(os.listdir(path.parent), [])
+        # A writer that never produced the file doesn't publish an empty one
+        with self.assertRaises(FileNotFoundError):
+            with self.store.writing(path):
+                pass
+        self.assertFalse(path.exists())
+
+    def test_json_round_trip(self):
+        key = self.store.key('translation', 'abc', {})
+        self.assertIsNone(self.store.get_json(key, 'segments.json'))
+        self.store.put_json(key, 'segments.json', {'text': 'नमस्ते'})
+        self.assertEqual(self.store.get_json(key, 'segments.json'), {'text': 'नमस्ते'})
+
+    def test_prune_keeps_recent_and_referenced_artifacts(self):
+        def artifact(stage):
+            path = self.store.path(self.store.key(stage, 'abc', {}), 'out.mp4')
+            path.parent.mkdir(parents=True)
+            path.write_bytes(b'data')
+            return path
+
+        old, referenced, recent = artifact('old'), artifact('referenced'), artifact('recent')
+        for path in (old, referenced):
+            stale = time.time() - 2 * 86400
+            os.utime(path.parent, (stale, stale))
+        user = User.objects.create_user('owner', 'owner@example.com', 'pw')
+        DubbingJob.objects.create(user=user, video_file='videos/in.mp4', result_file=self.store.relative(referenced))
+
+        self.assertEqual(self.store.prune(force=True), 1)
+        self.assertFalse(old.exists())
+        self.assertTrue(referenced.exists())
+        self.assertTrue(recent.exists())
@@ -0,0 +1,88 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from dubbing.checkpoints import CheckpointTracker
+from dubbing.models import DubbingJob
+
+KEYS = {stage: f'{stage}-key' for stage in ("extract", "transcript", "translation", "tts", "lipsync")}
+
+
+class CheckpointTrackerTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'pw')
+        self.job = DubbingJob.objects.create(user=user, video_file='videos/in.mp4')
+        handle, self.artifact = tempfile.mkstemp()
+        os.close(handle)
+        self.addCleanup(lambda: os.path.exists(self.artifact) and os.remove(self.artifact))
+
+    def test_resumes_from_the_first_incomplete_stage(self):
+        tracker = CheckpointTracker(self.job)
+        self.assertEqual(tracker.first_incomplete(KEYS), 'extract')
+        tracker.record('extract', KEYS['extract'], self.artifact)
+        tracker.record('transcript', KEYS['transcript'])
+        # A fresh tracker (another worker) reads the recorded checkpoints
+        self.assertEqual(CheckpointTracker(self.job).first_incomplete(KEYS), 'translation')
+        for stage in ('translation', 'tts', 'lipsync'):
+            tracker.record(stage, KEYS[stage])
+        self.assertIsNone(CheckpointTracker(self.job).first_incomplete(KEYS))
+
+    def test_changed_params_or_lost_artifact_rerun_the_stage(self):
+        tracker = CheckpointTracker(self.job)
+        tracker.record('extract', KEYS['extract'], self.artifact)
+        self.assertTrue(tracker.is_complete('extract', KEYS['extract']))
+        self.assertFalse(tracker.is_complete('extract', 'other-params'))
+        os.remove(self.artifact)
+        self.assertFalse(tracker.is_complete('extract', KEYS['extract']))
+        # Recording again replaces the checkpoint
+        tracker.record('extract', 'other-params')
+        self.assertEqual(self.job.checkpoints.count(), 1)
+        self.assertTrue(CheckpointTracker(self.job).is_complete('extract', 'other-params'))
+
+
+class JobResumeViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'pw')
+        self.job = DubbingJob.objects.create(
+            user=self.user, video_file='videos/in.mp4', status='failed', error_message='boom'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        patcher = mock.patch('dubbing.views.resume_dubbing_task')
+        self.resume_task = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def resume(self, job_id=None):
+        return self.client.post(f'/dubbing/job/{job_id or self.job.id}/resume/')
+
+    def test_failed_job_is_claimed_once(self):
+        version = DubbingJob.objects.get(id=self.job.id).version
+        response = self.resume()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'job_id': self.job.id, 'status': 'pending'})
+        job = DubbingJob.objects.get(id=self.job.id)
+        self.assertEqual((job.status, job.error_message), ('pending', None))
+        self.assertGreater(job.version, version)
+
+        # A second resume (a double click, or one racing the first) finds it no longer failed
+        response = self.resume()
+        self.assertEqual(response.status_code, 409)
+        self.resume_task.delay.assert_called_once_with(self.job.id)
+
+    def test_only_failed_jobs_resume(self):
+        for job_status in ('pending', 'processing', 'completed'):
+            DubbingJob.objects.filter(id=self.job.id).update(status=job_status)
+            response = self.resume()
+            self.assertEqual(response.status_code, 409)
+            self.assertIn(job_status, response.json()['error'])
+        self.resume_task.delay.assert_not_called()
+
+    def test_other_users_jobs_are_not_found(self):
+        other = User.objects.create_user('other', 'other@example.com', 'pw')
+        job = DubbingJob.objects.create(user=other, video_file='videos/in.mp4', status='failed')
+        self.assertEqual(self.resume(job.id).status_code, 404)
+        self.assertEqual(DubbingJob.objects.get(id=job.id).status, 'failed')
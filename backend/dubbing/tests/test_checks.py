@@ -0,0 +1,37 @@
+import os
+import tempfile
+from unittest import mock
+
+import torch
+from django.test import SimpleTestCase
+
+from dubbing import checks
+
+
+class SystemResourceTests(SimpleTestCase):
+    def test_leaves_torch_threads_to_the_worker_pools(self):
+        with mock.patch.object(torch, 'set_num_threads') as set_num_threads:
+            self.assertTrue(checks.check_system_resources())
+        set_num_threads.assert_not_called()
+
+
+class VideoFormatTests(SimpleTestCase):
+    PROBE = {"duration": 12.0, "video": {"width": 640, "height": 360}, "audio": {"sample_rate": 44100}}
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.mp4')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def test_video_without_audio_is_valid(self):
+        # It goes on to the pipeline, which completes it as a video with no speech
+        self.assertTrue(checks.validate_video_format(self.path, probe={**self.PROBE, "audio": None}))
+
+    def test_rejects_missing_video_stream_and_duration(self):
+        for probe in ({**self.PROBE, "video": None}, {**self.PROBE, "duration": None}):
+            with self.assertRaises(ValueError):
+                checks.validate_video_format(self.path, probe=probe)
+
+    def test_rejects_unsupported_extension(self):
+        with self.assertRaises(ValueError):
+            checks.validate_video_format(self.path[:-4] + '.webm', probe=self.PROBE)
@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from dubbing.models import DubbingJob
+from dubbing.progress import ProgressPublisher
+
+
+class JobVersionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'pw')
+        self.job = DubbingJob.objects.create(user=self.user, video_file='videos/in.mp4')
+
+    def test_save_reads_the_new_version_back_in_the_same_query(self):
+        self.assertEqual(self.job.version, 1)
+        # Another writer bumped the row since this instance was loaded
+        DubbingJob.objects.filter(id=self.job.id).update(progress=5, version=7)
+        self.job.status = 'processing'
+        with self.assertNumQueries(1):
+            self.job.save(update_fields=['status'])
+            self.assertEqual(self.job.version, 8)
+        self.assertEqual(DubbingJob.objects.get(id=self.job.id).version, 8)
+
+        with self.assertNumQueries(1):
+            self.job.save()
+        self.assertEqual(self.job.version, 9)
+        self.assertEqual(DubbingJob.objects.get(id=self.job.id).progress, 0)
+
+    def test_partial_instances_bump_the_version(self):
+        job = DubbingJob.objects.only('id', 'status').get(id=self.job.id)
+        job.status = 'failed'
+        job.save(update_fields=['status'])
+        self.assertEqual(job.version, 2)
+
+
+class JobStatusBulkTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'pw')
+        other = User.objects.create_user('other', 'other@example.com', 'pw')
+        self.jobs = [DubbingJob.objects.create(user=self.user, video_file='videos/in.mp4') for _ in range(3)]
+        self.other_job = DubbingJob.objects.create(user=other, video_file='videos/in.mp4')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def poll(self, known):
+        return self.client.get('/dubbing/jobs/status/', {'ids': ','.join(known)})
+
+    def test_only_changed_jobs_are_returned(self):
+        response = self.poll([str(job.id) for job in self.jobs])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        versions = {item['id']: item['version'] for item in response.json()['jobs']}
+        self.assertEqual(sorted(versions), [job.id for job in self.jobs])
+
+        known = [f'{job_id}:{version}' for job_id, version in versions.items()]
+        self.assertEqual(self.poll(known).status_code, 304)
+
+        # A progress flush and a model save both move their job past the client's version
+        with mock.patch('dubbing.progress.get_redis', return_value=None):
+            publisher = ProgressPublisher(self.jobs[1].id)
+            publisher('lip-sync', 'in-progress', 80)
+            publisher.flush()
+        job = self.jobs[2]
+        job.status = 'failed'
+        job.save(update_fields=['status'])
+        response = self.poll(known)
+        self.assertEqual(response.status_code, 200)
+        items = response.json()['jobs']
+        self.assertEqual([item['id'] for item in items], [self.jobs[1].id, job.id])
+        self.assertEqual(items[0]['progress'], 80)
+        self.assertEqual(items[1]['version'], job.version)
+        self.assertNotIn('translated_subtitles', items[0])
+
+    def test_other_users_jobs_and_bad_ids(self):
+        response = self.poll([f'{self.other_job.id}:0'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['jobs'], [])
+        self.assertEqual(self.poll(['x']).status_code, 400)
+        self.assertEqual(self.poll([]).status_code, 400)
+        self.assertEqual(self.poll([str(i) for i in range(1, 202)]).status_code, 400)
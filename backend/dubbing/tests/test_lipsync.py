@@ -0,0 +1,286 @@
+import os
+import shutil
+import tempfile
+import wave
+from unittest import mock
+
+import numpy as np
+import torch
+from django.test import SimpleTestCase
+
+from dubbing import artifact_store
+from dubbing.face_track import FACE_TRACK_FILENAME, FaceTrack, compact_face_track, face_track_key, load_face_track
+from dubbing.lipsync_engine import (
+    DEFAULT_LIPSYNC_CONFIG, IMG_SIZE, MEL_STEP_SIZE, Wav2LipEngine, mel_chunks,
+)
+from dubbing.partial_lipsync import face_intervals, plan_lipsync_spans, split_span, track_intervals
+
+FACE_RECT = (8, 8, 40, 40)
+FACE_VALUE = 255
+
+
+class StubModel:
+    """Wav2Lip stand-in: records its inputs and paints every predicted face ``FACE_VALUE``"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, mel_batch, img_batch):
+        self.calls.append((tuple(mel_batch.shape), tuple(img_batch.shape)))
+        return torch.full((len(img_batch), 3, IMG_SIZE, IMG_SIZE), FACE_VALUE / 255.)
+
+
+class StubFaceDetector:
+    """Finds a face in frames whose top-left pixel is set, counting the frames it has seen"""
+
+    def __init__(self):
+        self.frames = 0
+
+    def get_detections_for_batch(self, images):
+        self.frames += len(images)
+        return [FACE_RECT if image[0, 0, 0] else None for image in images]
+
+
+def make_frames(has_face, size=64):
+    frames = []
+    for face in has_face:
+        frame = np.full((size, size, 3), 50, dtype=np.uint8)
+        frame[0, 0, 0] = 1 if face else 0
+        frames.append(frame)
+    return frames
+
+
+def make_engine(model=None, batch_size=4):
+    config = {**DEFAULT_LIPSYNC_CONFIG, 'BATCH_SIZE': batch_size, 'FACE_DET_BATCH_SIZE': 2}
+    return Wav2LipEngine(model=model or StubModel(), face_detector=StubFaceDetector(), device='cpu', config=config)
+
+
+class GenerateTests(SimpleTestCase):
+    def test_lip_syncs_faces_and_passes_faceless_frames_through(self):
+        has_face = [True, False, True, True, False, True]
+        frames = make_frames(has_face)
+        mels = [np.zeros((80, MEL_STEP_SIZE), dtype=np.float32)] * len(frames)
+        model = StubModel()
+        out = list(make_engine(model).generate(frames, mels, pads=(0, 0, 0, 0), nosmooth=True))
+
+        self.assertEqual(len(out), len(frames))
+        x1, y1, x2, y2 = FACE_RECT
+        for frame, result, face in zip(frames, out, has_face):
+            if face:
+                self.assertTrue((result[y1:y2, x1:x2] == FACE_VALUE).all())
+                # Only the face box is replaced
+                self.assertTrue((result[y2:, :] == frame[y2:, :]).all())
+            else:
+                self.assertIs(result, frame)
+        # Faceless frames never reach the model: batches of 4 hold 3 and 1 faces
+        self.assertEqual(model.calls, [
+            ((3, 1, 80, MEL_STEP_SIZE), (3, 6, IMG_SIZE, IMG_SIZE)),
+            ((1, 1, 80, MEL_STEP_SIZE), (1, 6, IMG_SIZE, IMG_SIZE)),
+        ])
+
+    def test_faceless_batch_skips_the_model(self):
+        frames = make_frames([False, False])
+        model = StubModel()
+        mels = [np.zeros((80, MEL_STEP_SIZE), dtype=np.float32)] * 2
+        out = list(make_engine(model).generate(frames, mels))
+        self.assertEqual([id(frame) for frame in out], [id(frame) for frame in frames])
+        self.assertEqual(model.calls, [])
+
+    def test_loops_frames_for_longer_audio_and_reports_progress(self):
+        frames = make_frames([True, False])
+        mels = [np.zeros((80, MEL_STEP_SIZE), dtype=np.float32)] * 5
+        progress = []
+        out = list(make_engine(batch_size=2).generate(
+            frames, mels, track=FaceTrack.from_detections([FACE_RECT, None]), progress_callback=progress.append,
+        ))
+        self.assertEqual(len(out), 5)
+        self.assertIs(out[1], frames[1])
+        self.assertIs(out[3], frames[1])
+        self.assertEqual(progress, [40, 80, 100])
+
+    def test_mel_chunks_one_window_per_frame(self):
+        chunks = mel_chunks(np.zeros((80, 80)), 25.0)
+        self.assertTrue(all(chunk.shape == (80, MEL_STEP_SIZE) for chunk in chunks))
+        with self.assertRaises(ValueError):
+            mel_chunks(np.zeros((80, 0)), 25.0)
+        self.assertEqual(mel_chunks(np.ones((80, 3)), 25.0)[0].shape, (80, MEL_STEP_SIZE))
+
+
+class RunTests(SimpleTestCase):
+    def setUp(self):
+        if not shutil.which('ffmpeg'):
+            self.skipTest("ffmpeg is not installed")
+        import cv2
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.video = os.path.join(self.tmp, 'in.avi')
+        writer = cv2.VideoWriter(self.video, cv2.VideoWriter_fourcc(*'MJPG'), 25.0, (64, 64))
+        for frame in make_frames([True, True, False, False, True] * 5):
+            writer.write(frame)
+        writer.release()
+        self.audio = os.path.join(self.tmp, 'dub.wav')
+        with wave.open(self.audio, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(16000)
+            wav.writeframes(np.zeros(16000, dtype=np.int16).tobytes())
+
+    def test_writes_a_clip_as_long_as_the_audio(self):
+        import cv2
+        engine = make_engine()
+        output = os.path.join(self.tmp, 'out', 'synced.mp4')
+        # One second of audio is 80 mel columns, 25 frames at 25 fps
+        with mock.patch.object(engine, 'melspectrogram', return_value=np.zeros((80, 80), dtype=np.float32)):
+            self.assertEqual(engine.run(self.video, self.audio, output, quality="medium"), output)
+
+        capture = cv2.VideoCapture(output)
+        count = 0
+        while capture.grab():
+            count += 1
+        capture.release()
+        self.assertEqual(count, 25)
+
+    def test_unreadable_video(self):
+        missing = os.path.join(self.tmp, 'missing.mp4')
+        with self.assertRaises(ValueError):
+            make_engine().run(missing, self.audio, os.path.join(self.tmp, 'out.mp4'))
+
+
+PLAN_CONFIG = {**DEFAULT_LIPSYNC_CONFIG, 'PARTIAL_MIN_GAP_SECONDS': 1.0, 'PARTIAL_MAX_COVERAGE': 0.8}
+
+
+class PlanLipsyncSpansTests(SimpleTestCase):
+    def test_lip_syncs_speech_with_a_face_and_passes_the_rest(self):
+        plan = plan_lipsync_spans([(1.0, 3.0), (6.0, 7.0)], [(0.0, 2.0), (6.4, 10.0)], 10.0, 25.0, PLAN_CONFIG)
+        self.assertEqual(plan, [
+            (0.0, 1.0, False), (1.0, 2.0, True), (2.0, 6.4, False), (6.4, 7.0, True), (7.0, 10.0, False),
+        ])
+
+    def test_joins_short_gaps_and_snaps_to_frames(self):
+        plan = plan_lipsync_spans([(1.01, 2.03), (2.5, 3.0)], [(0.0, 10.0)], 10.0, 25.0, PLAN_CONFIG)
+        self.assertEqual(plan, [(0.0, 1.0, False), (1.0, 3.0, True), (3.0, 10.0, False)])
+
+    def test_drops_spans_too_short_to_lip_sync(self):
+        plan = plan_lipsync_spans([(2.0, 2.1)], [(0.0, 10.0)], 10.0, 25.0, PLAN_CONFIG)
+        self.assertEqual(plan, [(0.0, 10.0, False)])
+
+    def test_mostly_covered_video_is_one_span(self):
+        plan = plan_lipsync_spans([(0.5, 9.0)], [(0.0, 10.0)], 10.0, 25.0, PLAN_CONFIG)
+        self.assertEqual(plan, [(0.0, 10.0, True)])
+
+    def test_plan_covers_the_video(self):
+        plan = plan_lipsync_spans([(1.0, 2.0), (4.0, 5.0)], [(0.0, 10.0)], 10.0, 30.0, PLAN_CONFIG)
+        self.assertEqual(plan[0][0], 0.0)
+        self.assertEqual(plan[-1][1], 10.0)
+        for (_, end, _), (start, _, _) in zip(plan, plan[1:]):
+            self.assertEqual(end, start)
+
+
+class SplitSpanTests(SimpleTestCase):
+    sample_rate = 16000
+
+    def speech(self, seconds, quiet_at=()):
+        """Loud noise with a 0.2 second silence at each of ``quiet_at``"""
+        audio = np.random.default_rng(0).uniform(-0.5, 0.5, int(seconds * self.sample_rate)).astype(np.float32)
+        for t in quiet_at:
+            audio[int(t * self.sample_rate):int((t + 0.2) * self.sample_rate)] = 0
+        return audio
+
+    def test_short_span_is_one_chunk(self):
+        self.assertEqual(split_span(2.0, 10.0, self.speech(12), 25.0, 10, self.sample_rate), [(2.0, 10.0)])
+
+    def test_cuts_at_quiet_points_on_frame_boundaries(self):
+        audio = self.speech(40, quiet_at=(9.0, 18.5))
+        chunks = split_span(0.0, 30.0, audio, 25.0, 10, self.sample_rate)
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(chunks[0][0], 0.0)
+        self.assertEqual(chunks[-1][1], 30.0)
+        for (_, end), (start, _) in zip(chunks, chunks[1:]):
+            self.assertEqual(end, start)
+            self.assertAlmostEqual(end * 25.0, round(end * 25.0))
+        self.assertTrue(9.0 <= chunks[0][1] <= 9.2)
+        self.assertTrue(18.5 <= chunks[1][1] <= 18.7)
+
+    def test_folds_a_short_tail_into_the_last_chunk(self):
+        chunks = split_span(5.0, 27.0, self.speech(30), 25.0, 10, self.sample_rate)
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual((chunks[0][0], chunks[-1][1]), (5.0, 27.0))
+        self.assertGreaterEqual(chunks[-1][1] - chunks[-1][0], 5.0)
+
+
+class FaceTrackCacheTests(SimpleTestCase):
+    """One cached track per video, filled in by sampling and by lip-sync chunks at any span boundaries"""
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        patcher = mock.patch.object(artifact_store, '_store', artifact_store.ArtifactStore(root))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.engine = make_engine()
+        self.detector = self.engine._face_detector
+
+    def track_files(self, resize_factor=1):
+        path = artifact_store.get_artifact_store().path(face_track_key('video', resize_factor), FACE_TRACK_FILENAME)
+        return sorted(file.name for file in path.parent.iterdir()) if path.parent.exists() else []
+
+    def test_chunks_slice_and_extend_the_video_track(self):
+        has_face = [True, False] * 10
+        frames = make_frames(has_face)
+        first = self.engine.face_track(frames[4:10], 'video', frame_offset=4)
+        self.assertEqual(self.detector.frames, 6)
+        self.assertEqual(list(first.has_face), has_face[4:10])
+
+        # A re-dub with other span boundaries only detects the frames not seen yet
+        second = self.engine.face_track(frames[8:14], 'video', frame_offset=8)
+        self.assertEqual(self.detector.frames, 6 + 4)
+        self.assertEqual(list(second.has_face), has_face[8:14])
+        self.assertTrue(second.detected.all())
+
+        self.engine.face_track(frames[5:12], 'video', frame_offset=5)
+        self.assertEqual(self.detector.frames, 10)
+
+        track = load_face_track('video')
+        self.assertTrue(track.covers(4, 14))
+        self.assertFalse(track.covers(0, 5))
+        self.assertEqual(list(track.has_face[4:14]), has_face[4:14])
+
+    def test_compaction_keeps_one_file_per_video(self):
+        frames = make_frames([True] * 8)
+        self.engine.face_track(frames[:4], 'video')
+        self.engine.face_track(frames[4:], 'video', frame_offset=4)
+        self.assertEqual(len(self.track_files()), 2)
+        compact_face_track('video', 1)
+        self.assertEqual(self.track_files(), [FACE_TRACK_FILENAME])
+        self.assertTrue(load_face_track('video').covers(0, 8))
+        # Other quality levels reuse the full-resolution track, scaled
+        scaled = load_face_track('video', resize_factor=2)
+        self.assertEqual(tuple(scaled.rects[0]), tuple(value // 2 for value in FACE_RECT))
+
+    def test_face_intervals_from_a_dense_cached_track(self):
+        fps, duration = 10.0, 2.0
+        has_face = [False] * 5 + [True] * 10 + [False] * 5
+        track = FaceTrack.from_detections([FACE_RECT if face else None for face in has_face])
+        # Only every 5th frame sampled: still dense enough at FACE_SAMPLE_SECONDS = 0.5
+        sampled = FaceTrack.from_detections(
+            [FACE_RECT if face else None for face in has_face[::5]]
+        ).placed(np.arange(0, 20, 5), 20)
+        config = {**DEFAULT_LIPSYNC_CONFIG, 'FACE_SAMPLE_SECONDS': 0.5}
+        for cached in (track, sampled):
+            with mock.patch('dubbing.partial_lipsync.load_face_track', return_value=cached), \
+                    mock.patch('dubbing.partial_lipsync.get_lipsync_engine') as engine:
+                self.assertEqual(face_intervals('in.mp4', 'video', duration, fps, config=config), [(0.5, 1.5)])
+            engine.assert_not_called()
+
+    def test_face_intervals_sample_a_sparse_track(self):
+        sparse = FaceTrack.from_detections([FACE_RECT] * 4).placed(np.arange(4), 20)
+        config = {**DEFAULT_LIPSYNC_CONFIG, 'FACE_SAMPLE_SECONDS': 0.5}
+        with mock.patch('dubbing.partial_lipsync.load_face_track', return_value=sparse), \
+                mock.patch('dubbing.partial_lipsync.get_lipsync_engine') as engine:
+            engine.return_value.sample_faces.return_value = FaceTrack.from_detections([FACE_RECT] * 20)
+            self.assertEqual(face_intervals('in.mp4', 'video', 2.0, 10.0, config=config), [(0.0, 2.0)])
+        engine.return_value.sample_faces.assert_called_once_with('in.mp4', 0.5, 1, 'video')
+
+    def test_track_intervals_stretch_samples_to_the_next_one(self):
+        track = FaceTrack.from_detections([None, FACE_RECT, None]).placed(np.array([0, 10, 20]), 25)
+        self.assertEqual(track_intervals(track, 10.0, 2.5), [(1.0, 2.0)])
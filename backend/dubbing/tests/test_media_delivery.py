@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from dubbing import media_delivery
+from dubbing.models import DubbingJob
+
+CONTENT = bytes(range(256)) * 4
+
+
+class MediaDeliveryTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        os.makedirs(os.path.join(self.media_root, 'results'))
+        with open(os.path.join(self.media_root, 'results', 'out.mp4'), 'wb') as f:
+            f.write(CONTENT)
+
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pw')
+        self.other = User.objects.create_user('other', 'other@example.com', 'pw')
+        self.job = DubbingJob.objects.create(user=self.owner, video_file='videos/in.mp4', result_file='results/out.mp4')
+        self.client = APIClient()
+
+    def signed_url(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.owner).key}')
+        url = self.client.get(f'/dubbing/job/{self.job.id}/').json()['result_url']
+        self.client.credentials()
+        return url
+
+    def test_signed_url_from_the_status_view(self):
+        url = self.signed_url()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_owner_token_without_signature(self):
+        token = Token.objects.create(user=self.owner)
+        response = self.client.get(
+            f'/dubbing/job/{self.job.id}/media/result/', HTTP_AUTHORIZATION=f'Token {token.key}'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_anonymous_and_other_users_get_404(self):
+        base = f'/dubbing/job/{self.job.id}/media/result/'
+        self.assertEqual(self.client.get(base).status_code, 404)
+        token = Token.objects.create(user=self.other)
+        self.assertEqual(self.client.get(base, HTTP_AUTHORIZATION=f'Token {token.key}').status_code, 404)
+        self.assertEqual(self.client.get(base, HTTP_AUTHORIZATION='Token bogus').status_code, 404)
+        self.assertEqual(self.client.get(f'/dubbing/jobs/{self.job.id}/dubbed-audio/').status_code, 404)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(self.client.get(f'/dubbing/job/{self.job.id}/').status_code, 404)
+
+    def test_signature_is_bound_to_job_kind_and_expiry(self):
+        url = self.signed_url()
+        other_job = DubbingJob.objects.create(user=self.other, video_file='videos/x.mp4', result_file='results/out.mp4')
+        self.assertEqual(self.client.get(url.replace(f'/job/{self.job.id}/', f'/job/{other_job.id}/')).status_code, 404)
+        self.assertEqual(self.client.get(url.replace('/media/result/', '/media/video/')).status_code, 404)
+        path, query = url.split('?')
+        params = dict(item.split('=', 1) for item in query.split('&'))
+        tampered = f"{path}?expires={int(params['expires']) + 3600}&sig={params['sig']}"
+        self.assertEqual(self.client.get(tampered).status_code, 404)
+        with mock.patch.object(media_delivery.time, 'time', return_value=int(params['expires']) + 1):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_url_is_stable_within_its_lifetime(self):
+        with mock.patch.object(media_delivery.time, 'time', return_value=7200):
+            first = media_delivery.job_media_url(self.job, 'result')
+        with mock.patch.object(media_delivery.time, 'time', return_value=7200 + 3599):
+            self.assertEqual(media_delivery.job_media_url(self.job, 'result'), first)
+        self.assertIsNone(media_delivery.job_media_url(self.job, 'dubbed-audio'))
+
+    def test_byte_ranges(self):
+        url = self.signed_url()
+        response = self.client.get(url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(CONTENT)}')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[10:20])
+
+        response = self.client.get(url, HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[-4:])
+
+        response = self.client.get(url, HTTP_RANGE=f'bytes={len(CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_revalidation_and_stale_if_range(self):
+        url = self.signed_url()
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+        # A partial copy from an older version of the file gets the whole new file
+        response = self.client.get(url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+
+    def test_nginx_offload_sends_only_headers(self):
+        url = self.signed_url()
+        with override_settings(MEDIA_DELIVERY={'OFFLOAD': 'nginx', 'INTERNAL_PREFIX': '/protected-media/'}):
+            response = self.client.get(url + '&download=1')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/results/out.mp4')
+        self.assertEqual(response.content, b'')
+        self.assertIn('attachment', response['Content-Disposition'])
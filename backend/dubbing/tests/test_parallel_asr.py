@@ -0,0 +1,79 @@
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from dubbing import parallel_asr
+from dubbing.parallel_asr import DEFAULT_PARALLEL_ASR_CONFIG, merge_chunk_segments, plan_chunks
+
+RATE = 10  # Samples per second, so sample indices read as tenths of a second
+
+
+def seg(start, end, text, words=None):
+    return {"start": start, "end": end, "text": text, **({"words": words} if words else {})}
+
+
+class PlanChunksTests(SimpleTestCase):
+    def test_chunks_overlap_and_their_cores_tile_the_audio(self):
+        config = {**DEFAULT_PARALLEL_ASR_CONFIG, 'CHUNK_SECONDS': 10, 'OVERLAP_SECONDS': 2.0}
+        audio = np.random.default_rng(0).standard_normal(3000).astype(np.float32)
+        chunks = plan_chunks(audio, config, sample_rate=100)
+        self.assertEqual(chunks[0][2], 0)
+        self.assertEqual(chunks[-1][3], len(audio))
+        for (_, _, _, core_hi), (_, _, core_lo, _) in zip(chunks, chunks[1:]):
+            self.assertEqual(core_hi, core_lo)
+        for lo, hi, core_lo, core_hi in chunks:
+            self.assertEqual(lo, max(0, core_lo - 200))
+            self.assertEqual(hi, min(len(audio), core_hi + 200))
+
+
+class MergeChunkSegmentsTests(SimpleTestCase):
+    # Chunk one sends 0-12 s and owns 0-10 s; chunk two sends 8-20 s and owns 10-20 s
+    CHUNKS = [(0, 120, 0, 100), (80, 200, 100, 200)]
+
+    def test_overlap_segments_are_kept_once_on_the_full_timeline(self):
+        first = [
+            seg(1.0, 3.0, " a"),
+            seg(8.5, 9.5, " b"),
+            seg(9.0, 10.4, " e"),
+            seg(9.5, 11.5, " c"),  # Midpoint in chunk two's core
+        ]
+        second = [
+            seg(0.5, 1.5, " b"),  # Midpoint in chunk one's core
+            seg(1.9, 2.3, "e "),  # Same words heard again across the cut
+            seg(1.5, 3.5, " c"),
+            seg(5.0, 6.0, " d", words=[{"start": 5.0, "end": 5.5, "word": "d"}]),
+        ]
+        merged = merge_chunk_segments(self.CHUNKS, [first, second], sample_rate=RATE)
+        self.assertEqual(
+            [(s["start"], s["end"], s["text"]) for s in merged],
+            [(1.0, 3.0, " a"), (8.5, 9.5, " b"), (9.0, 10.4, " e"), (9.5, 11.5, " c"), (13.0, 14.0, " d")],
+        )
+        self.assertEqual(merged[-1]["words"], [{"start": 13.0, "end": 13.5, "word": "d"}])
+        # The inputs aren't modified
+        self.assertEqual(second[-1]["words"][0]["start"], 5.0)
+
+    def test_last_chunk_keeps_its_tail(self):
+        merged = merge_chunk_segments([(0, 100, 0, 100)], [[seg(9.8, 10.6, " tail")]], sample_rate=RATE)
+        self.assertEqual([s["text"] for s in merged], [" tail"])
+
+
+class UseParallelAsrTests(SimpleTestCase):
+    CONFIG = {**DEFAULT_PARALLEL_ASR_CONFIG, 'WORKERS': 4, 'THREADS_PER_WORKER': 2}
+
+    def setUp(self):
+        for patcher in (
+            mock.patch('dubbing.parallel_asr.use_inference_server', return_value=False),
+            mock.patch('dubbing.model_registry.get_whisper_config', return_value={'DEVICE': 'cpu'}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_long_audio_on_cpu(self):
+        self.assertTrue(parallel_asr.use_parallel_asr(600, self.CONFIG))
+        self.assertFalse(parallel_asr.use_parallel_asr(60, self.CONFIG))
+        self.assertFalse(parallel_asr.use_parallel_asr(600, {**self.CONFIG, 'WORKERS': 1}))
+
+    def test_daemonic_workers_transcribe_in_one_call(self):
+        with mock.patch('dubbing.parallel_asr.can_start_process_pool', return_value=False):
+            self.assertFalse(parallel_asr.use_parallel_asr(600, self.CONFIG))
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from dubbing import pipeline
+from dubbing.artifact_store import ArtifactStore
+from dubbing.audio_ingest import DECODE_SAMPLE_RATE, AudioBuffer
+from dubbing.checkpoints import CheckpointTracker
+from dubbing.models import DubbingJob
+
+PROBE = {
+    "duration": 12.0, "bitrate": 800000, "streams": [],
+    "video": {"width": 640, "height": 360, "fps": 25.0}, "audio": {"sample_rate": 44100, "bitrate": 128000},
+}
+SILENT_PROBE = {
+    "duration": 12.0, "bitrate": 800000, "streams": [],
+    "video": {"width": 640, "height": 360, "fps": 25.0}, "audio": None,
+}
+
+
+class PipelineTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        store = ArtifactStore(os.path.join(self.media_root, 'artifacts'), max_age_days=1)
+        for patcher in (
+            mock.patch('dubbing.pipeline.get_artifact_store', return_value=store),
+            mock.patch('dubbing.checks.check_system_resources', return_value=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        os.makedirs(os.path.join(self.media_root, 'videos'))
+        with open(os.path.join(self.media_root, 'videos', 'in.mp4'), 'wb') as f:
+            f.write(b'\x00\x00\x00\x18ftypmp42' + bytes(1024))
+        user = User.objects.create_user('owner', 'owner@example.com', 'pw')
+        self.job = DubbingJob.objects.create(user=user, video_file='videos/in.mp4', status='processing')
+
+    def test_video_without_audio_completes_as_no_speech(self):
+        with mock.patch('dubbing.pipeline.probe_media', return_value=SILENT_PROBE), \
+                mock.patch('dubbing.pipeline.decode_audio') as decode_audio:
+            result = pipeline.run_job_stage(self.job.id, 'extract')
+        decode_audio.assert_not_called()
+        self.assertEqual(result['status'], 'no_speech')
+        job = DubbingJob.objects.get(id=self.job.id)
+        self.assertEqual(job.status, 'completed')
+        self.assertIs(job.has_speech, False)
+        self.assertEqual(job.result_file.name, 'videos/in.mp4')
+        self.assertIsNone(job.audio_sample_rate)
+
+    def test_resume_reuses_the_checkpointed_extract_stage(self):
+        audio = AudioBuffer(np.zeros(DECODE_SAMPLE_RATE * 2), DECODE_SAMPLE_RATE)
+        with mock.patch('dubbing.pipeline.probe_media', return_value=PROBE), \
+                mock.patch('dubbing.pipeline.decode_audio', return_value=audio) as decode_audio:
+            self.assertIsNone(pipeline.run_job_stage(self.job.id, 'extract'))
+            ctx = pipeline.JobContext.load(self.job.id)
+            self.assertEqual(CheckpointTracker(self.job).first_incomplete(ctx.keys), 'transcript')
+            # Another worker picks the job up again: the decoded audio comes from the store
+            self.assertIsNone(pipeline.run_job_stage(self.job.id, 'extract'))
+        decode_audio.assert_called_once()
+        self.assertEqual(pipeline.JobContext.load(self.job.id).load_audio().duration, 2.0)
+
+    def test_silent_audio_completes_at_the_transcript_stage(self):
+        audio = AudioBuffer(np.zeros(DECODE_SAMPLE_RATE * 2), DECODE_SAMPLE_RATE)
+        with mock.patch('dubbing.pipeline.probe_media', return_value=PROBE), \
+                mock.patch('dubbing.pipeline.decode_audio', return_value=audio), \
+                mock.patch('dubbing.pipeline.transcribe_audio_segments') as transcribe:
+            pipeline.run_job_stage(self.job.id, 'extract')
+            result = pipeline.run_job_stage(self.job.id, 'transcript')
+        transcribe.assert_not_called()
+        self.assertEqual(result['status'], 'no_speech')
+        job = DubbingJob.objects.get(id=self.job.id)
+        self.assertEqual((job.status, job.has_speech), ('completed', False))
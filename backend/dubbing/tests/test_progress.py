@@ -0,0 +1,53 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from dubbing.models import DubbingJob
+from dubbing.progress import DEFAULT_PROGRESS_CONFIG, ProgressPublisher
+
+CONFIG = {**DEFAULT_PROGRESS_CONFIG, 'REDIS_URL': None, 'MIN_INTERVAL_MS': 60000}
+
+
+class ProgressPublisherTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'pw')
+        self.job = DubbingJob.objects.create(
+            user=user, video_file='videos/in.mp4',
+            step_status={"speech-recognition": {"status": "completed", "progress": 20}},
+        )
+
+    def publisher(self):
+        job = DubbingJob.objects.get(id=self.job.id)
+        return ProgressPublisher(job.id, step_status=job.step_status, config=CONFIG)
+
+    def test_workers_only_write_their_own_steps(self):
+        # Two batch workers start from the same snapshot
+        first, second = self.publisher(), self.publisher()
+        first('voice-synthesis', 'in-progress', 50)
+        second('lip-sync', 'in-progress', 80)
+        job = DubbingJob.objects.get(id=self.job.id)
+        self.assertEqual(job.step_status, {
+            "speech-recognition": {"status": "completed", "progress": 20},
+            "voice-synthesis": {"status": "in-progress", "progress": 50},
+            "lip-sync": {"status": "in-progress", "progress": 80},
+        })
+        self.assertEqual(job.progress, 50)
+        # The later writer picked up the other worker's step for its own events
+        self.assertEqual(second.snapshot()["step_status"], job.step_status)
+
+    def test_writes_are_coalesced(self):
+        publisher = self.publisher()
+        version = DubbingJob.objects.get(id=self.job.id).version
+        for percent in range(50, 60):
+            publisher('voice-synthesis', 'in-progress', percent)
+        self.assertEqual(publisher.stats, {"updates": 10, "writes": 1})
+        self.assertEqual(DubbingJob.objects.get(id=self.job.id).step_status["voice-synthesis"]["progress"], 50)
+
+        with mock.patch.object(publisher, 'publish') as publish:
+            self.assertTrue(publisher.flush())
+            self.assertFalse(publisher.flush())
+        publish.assert_called_once()
+        job = DubbingJob.objects.get(id=self.job.id)
+        self.assertEqual(job.step_status["voice-synthesis"]["progress"], 59)
+        self.assertEqual(job.version, version + 2)
@@ -0,0 +1,170 @@
+import asyncio
+import json
+from unittest import mock
+
+import redis.asyncio
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TransactionTestCase
+from rest_framework.authtoken.models import Token
+
+from dubbing.models import DubbingJob
+from dubbing.progress import DEFAULT_PROGRESS_CONFIG
+from dubbing.progress_stream import ProgressHub
+
+REDIS_CONFIG = {**DEFAULT_PROGRESS_CONFIG, 'REDIS_URL': 'redis://localhost:6379/0', 'POLL_SECONDS': 0.01}
+
+
+class FakePubSub:
+    """Redis pub/sub that delivers the messages put on ``messages``"""
+
+    def __init__(self, client):
+        self.client = client
+        self.messages = asyncio.Queue()
+        self.closed = False
+
+    async def psubscribe(self, pattern):
+        self.client.patterns.append(pattern)
+
+    async def listen(self):
+        while True:
+            yield await self.messages.get()
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FakeRedis:
+    def __init__(self):
+        self.patterns = []
+        self.pubsubs = []
+        self.closed = False
+
+    def pubsub(self):
+        self.pubsubs.append(FakePubSub(self))
+        return self.pubsubs[-1]
+
+    async def aclose(self):
+        self.closed = True
+
+
+class ProgressHubTests(SimpleTestCase):
+    def run_async(self, coroutine):
+        return asyncio.run(asyncio.wait_for(coroutine, 5))
+
+    def test_subscription_lives_only_while_streams_are_open(self):
+        clients = []
+
+        def from_url(url):
+            clients.append(FakeRedis())
+            return clients[-1]
+
+        async def scenario():
+            hub = ProgressHub(REDIS_CONFIG)
+            first = hub.subscribe([1])
+            second = hub.subscribe([1, 2])
+            await asyncio.sleep(0.01)
+            self.assertEqual(len(clients), 1)
+            self.assertEqual(clients[0].patterns, [f"{REDIS_CONFIG['CHANNEL_PREFIX']}*"])
+
+            event = {"job_id": 1, "status": "processing", "progress": 50}
+            await clients[0].pubsubs[0].messages.put({"type": "pmessage", "data": json.dumps(event)})
+            self.assertEqual(await first.get(), event)
+            self.assertEqual(await second.get(), event)
+
+            hub.unsubscribe(first, [1])
+            await asyncio.sleep(0.01)
+            self.assertFalse(clients[0].pubsubs[0].closed)
+
+            task = hub._task
+            hub.unsubscribe(second, [1, 2])
+            await asyncio.sleep(0.01)
+            self.assertTrue(task.done())
+            self.assertTrue(clients[0].pubsubs[0].closed)
+            self.assertTrue(clients[0].closed)
+
+            # The next stream subscribes again
+            hub.subscribe([3])
+            await asyncio.sleep(0.01)
+            self.assertEqual(len(clients), 2)
+            self.assertFalse(clients[1].pubsubs[0].closed)
+            hub._task.cancel()
+
+        with mock.patch.object(redis.asyncio.Redis, 'from_url', side_effect=from_url):
+            self.run_async(scenario())
+
+    def test_polls_without_redis_and_stops_with_the_last_stream(self):
+        states = [{"job_id": 1, "status": "processing", "progress": 10, "step_status": {}, "error": None}]
+        fetch = mock.AsyncMock(side_effect=lambda job_ids: [dict(state) for state in states])
+
+        async def scenario():
+            hub = ProgressHub({**REDIS_CONFIG, 'REDIS_URL': None})
+            queue = hub.subscribe([1])
+            self.assertEqual((await queue.get())["progress"], 10)
+            states[0]["progress"] = 20
+            self.assertEqual((await queue.get())["progress"], 20)
+            # Unchanged states aren't sent again
+            await asyncio.sleep(0.05)
+            self.assertTrue(queue.empty())
+            task = hub._task
+            hub.unsubscribe(queue, [1])
+            await asyncio.sleep(0.01)
+            self.assertTrue(task.done())
+            calls = fetch.await_count
+            await asyncio.sleep(0.05)
+            self.assertEqual(fetch.await_count, calls)
+
+        with mock.patch('dubbing.progress_stream.fetch_states', fetch):
+            self.run_async(scenario())
+
+    def test_slow_stream_keeps_the_latest_events(self):
+        hub = ProgressHub(REDIS_CONFIG)
+        hub._task = mock.Mock(done=lambda: False)
+
+        async def scenario():
+            queue = hub.subscribe([1])
+            for progress in range(100):
+                hub.dispatch({"job_id": 1, "progress": progress})
+            events = [queue.get_nowait()["progress"] for _ in range(queue.qsize())]
+            self.assertEqual(events[-1], 99)
+            self.assertLess(len(events), 100)
+
+        self.run_async(scenario())
+
+
+class JobEventsViewTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'pw')
+        self.token = Token.objects.create(user=self.user).key
+        other = User.objects.create_user('other', 'other@example.com', 'pw')
+        self.job = DubbingJob.objects.create(user=self.user, video_file='videos/in.mp4', status='processing', progress=40)
+        self.other_job = DubbingJob.objects.create(user=other, video_file='videos/in.mp4')
+
+    def test_requires_a_token(self):
+        self.assertEqual(self.client.get(f'/dubbing/job/{self.job.id}/events/').status_code, 401)
+        response = self.client.get(f'/dubbing/job/{self.job.id}/events/', {'token': 'bogus'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_other_users_jobs_are_not_found(self):
+        response = self.client.get(f'/dubbing/job/{self.other_job.id}/events/', {'token': self.token})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            '/dubbing/jobs/events/', {'ids': f'{self.job.id},{self.other_job.id}'},
+            HTTP_AUTHORIZATION=f'Token {self.token}',
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get('/dubbing/jobs/events/', {'ids': 'x'}, HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(response.status_code, 400)
+
+    def test_wsgi_gets_a_snapshot_with_a_retry_hint(self):
+        response = self.client.get(f'/dubbing/job/{self.job.id}/events/', {'token': self.token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = response.content.decode()
+        self.assertTrue(body.startswith('retry: '))
+        self.assertIn('"progress": 40', body)
+        self.assertNotIn('event: end', body)
+
+        DubbingJob.objects.filter(id=self.job.id).update(status='completed', progress=100)
+        body = self.client.get(f'/dubbing/job/{self.job.id}/events/', {'token': self.token}).content.decode()
+        self.assertIn('"status": "completed"', body)
+        self.assertIn('event: end', body)
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from dubbing.models import DubbingJob
+from dubbing.views import decode_cursor, encode_cursor
+
+
+class ProjectListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'pw')
+        other = User.objects.create_user('other', 'other@example.com', 'pw')
+        now = timezone.now()
+        self.jobs = []
+        for i in range(7):
+            job = DubbingJob.objects.create(
+                user=self.user, title=f'job {i}', video_file='videos/in.mp4', translated_subtitles=f'subs {i}'
+            )
+            # Jobs 2 and 3 share a timestamp: the id breaks the tie
+            created_at = now - timedelta(minutes=10 - min(i, 2) - max(i - 3, 0))
+            DubbingJob.objects.filter(id=job.id).update(created_at=created_at)
+            self.jobs.append(job)
+        DubbingJob.objects.create(user=other, title='not mine', video_file='videos/in.mp4')
+        self.newest_first = [job.id for job in sorted(
+            DubbingJob.objects.filter(user=self.user), key=lambda job: (job.created_at, job.id), reverse=True
+        )]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def pages(self, limit):
+        ids, cursor = [], None
+        while True:
+            params = {'limit': limit, **({'cursor': cursor} if cursor else {})}
+            response = self.client.get('/dubbing/projects/', params)
+            self.assertEqual(response.status_code, 200)
+            ids.append([item['id'] for item in response.json()])
+            cursor = response.get('X-Next-Cursor')
+            if not cursor:
+                self.assertNotIn('Link', response)
+                return ids
+
+    def test_keyset_pages_cover_every_job_once_in_order(self):
+        for limit in (1, 2, 3, 7, 50):
+            pages = self.pages(limit)
+            self.assertEqual([job_id for page in pages for job_id in page], self.newest_first)
+            self.assertTrue(all(len(page) <= limit for page in pages))
+
+    def test_next_link_and_projection(self):
+        response = self.client.get('/dubbing/projects/', {'limit': 2})
+        self.assertIn('rel="next"', response['Link'])
+        self.assertIn(f"cursor={response['X-Next-Cursor']}", response['Link'])
+        item = response.json()[0]
+        self.assertNotIn('translated_subtitles', item)
+        self.assertEqual(item['display_id'], DubbingJob.objects.get(id=item['id']).sequence)
+
+        item = self.client.get('/dubbing/projects/', {'limit': 2, 'include': 'subtitles'}).json()[0]
+        self.assertEqual(item['translated_subtitles'], DubbingJob.objects.get(id=item['id']).translated_subtitles)
+
+    def test_etag_revalidation(self):
+        response = self.client.get('/dubbing/projects/', {'limit': 3})
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/dubbing/projects/', {'limit': 3}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        job = DubbingJob.objects.get(id=self.newest_first[0])
+        job.progress = 42
+        job.save(update_fields=['progress'])
+        response = self.client.get('/dubbing/projects/', {'limit': 3}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_bad_cursor_and_limit(self):
+        self.assertEqual(self.client.get('/dubbing/projects/', {'cursor': 'not-a-cursor'}).status_code, 400)
+        self.assertEqual(self.client.get('/dubbing/projects/', {'limit': 'x'}).status_code, 400)
+        self.assertEqual(len(self.client.get('/dubbing/projects/', {'limit': 0}).json()), 1)
+
+    def test_cursor_round_trip(self):
+        job = DubbingJob.objects.get(id=self.jobs[3].id)
+        self.assertEqual(decode_cursor(encode_cursor(job)), (job.created_at, job.id))
+
+    def test_anonymous_gets_an_empty_list(self):
+        self.assertEqual(APIClient().get('/dubbing/projects/').json(), [])
@@ -0,0 +1,234 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from dubbing import translation_client
+from dubbing.translation_client import (
+    BATCH_SEPARATOR, HttpTranslator, LocalTokenBucket, RateLimiter, TranslationClient, http_session,
+    pack_batches, split_sentences,
+)
+
+
+class StubTranslateHandler(BaseHTTPRequestHandler):
+    """LibreTranslate-style ``POST /translate`` that plays back ``server.statuses`` before succeeding"""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append(body)
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        payload = {"translatedText": body["q"].upper()} if status == 200 else {"error": "unavailable"}
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServerMixin:
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubTranslateHandler)
+        self.server.requests = []
+        self.server.statuses = []
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/translate"
+
+
+class PackBatchesTests(SimpleTestCase):
+    def test_packs_up_to_the_limit_in_order(self):
+        texts = ["aaaa", "bbbb", "cccc", "dd"]
+        # "aaaa\nbbbb" is 9 characters, adding "\ncccc" would make 14
+        self.assertEqual(pack_batches(texts, 10), [["aaaa", "bbbb"], ["cccc", "dd"]])
+
+    def test_joined_batches_fit(self):
+        texts = [f"text {i}" * (i % 4 + 1) for i in range(40)]
+        batches = pack_batches(texts, 50)
+        self.assertEqual([text for batch in batches for text in batch], texts)
+        for batch in batches:
+            if len(batch) > 1:
+                self.assertLessEqual(len(BATCH_SEPARATOR.join(batch)), 50)
+
+    def test_oversized_and_multiline_texts_go_alone(self):
+        texts = ["a", "x" * 30, "b", "line one\nline two", "c"]
+        self.assertEqual(
+            pack_batches(texts, 10),
+            [["a"], ["x" * 30], ["b"], ["line one\nline two"], ["c"]],
+        )
+
+    def test_empty(self):
+        self.assertEqual(pack_batches([], 10), [])
+
+    def test_split_sentences_never_cuts_words(self):
+        text = "First sentence here. Second one is a bit longer! Third?"
+        pieces = split_sentences(text, 25)
+        self.assertTrue(all(len(piece) <= 25 for piece in pieces))
+        self.assertEqual(" ".join(pieces).split(), text.split())
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_burst_then_rate(self):
+        with mock.patch.object(translation_client.time, 'monotonic', return_value=100.0):
+            bucket = LocalTokenBucket(rate=2.0, burst=3)
+            self.assertEqual([bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+            # Empty: the next token is half a second away at 2 per second
+            self.assertAlmostEqual(bucket.reserve(), 0.5)
+
+    def test_refills_with_time_up_to_burst(self):
+        now = [100.0]
+        with mock.patch.object(translation_client.time, 'monotonic', side_effect=lambda: now[0]):
+            bucket = LocalTokenBucket(rate=1.0, burst=2)
+            bucket.reserve()
+            bucket.reserve()
+            now[0] += 1.0
+            self.assertEqual(bucket.reserve(), 0.0)
+            self.assertGreater(bucket.reserve(), 0.0)
+            now[0] += 60.0
+            self.assertEqual([bucket.reserve() for _ in range(2)], [0.0, 0.0])
+            self.assertGreater(bucket.reserve(), 0.0)
+
+    def test_limiter_sleeps_for_the_bucket_wait(self):
+        limiter = RateLimiter(config={**translation_client.DEFAULT_TRANSLATION_CLIENT_CONFIG, 'REDIS_URL': None})
+        limiter.local = mock.Mock()
+        limiter.local.reserve.side_effect = [0.25, 0.0]
+        with mock.patch.object(translation_client.time, 'sleep') as sleep:
+            limiter.acquire()
+        sleep.assert_called_once_with(0.25)
+
+    def test_limiter_falls_back_to_local_bucket(self):
+        limiter = RateLimiter(config={**translation_client.DEFAULT_TRANSLATION_CLIENT_CONFIG, 'REDIS_URL': None})
+        limiter.shared = mock.Mock()
+        limiter.shared.reserve.side_effect = ConnectionError("redis down")
+        limiter.local = mock.Mock()
+        limiter.local.reserve.return_value = 0.0
+        limiter.acquire()
+        self.assertIsNone(limiter.shared)
+        limiter.local.reserve.assert_called_once_with(1)
+
+
+class HttpTranslatorTests(StubServerMixin, SimpleTestCase):
+    def translator(self, session=None):
+        return HttpTranslator(self.url, session or http_session(backoff_factor=0), source='en', target='hi', timeout=5)
+
+    def test_translates(self):
+        self.assertEqual(self.translator().translate("hello"), "HELLO")
+        self.assertEqual(self.server.requests, [{"q": "hello", "source": "en", "target": "hi", "format": "text"}])
+
+    def test_retries_server_errors(self):
+        self.server.statuses = [503, 502, 429]
+        self.assertEqual(self.translator().translate("hello"), "HELLO")
+        self.assertEqual(len(self.server.requests), 4)
+
+    def test_backs_off_between_retries(self):
+        self.server.statuses = [503, 503, 503]
+        with mock.patch('urllib3.util.retry.time.sleep') as sleep:
+            self.translator(http_session(backoff_factor=0.5)).translate("hello")
+        # Exponential: urllib3 may retry the first failure immediately, then waits longer each time
+        delays = [call.args[0] for call in sleep.call_args_list]
+        self.assertGreaterEqual(len(delays), 2)
+        self.assertGreater(delays[-1], delays[0])
+
+    def test_gives_up_after_the_retry_budget(self):
+        self.server.statuses = [503] * 10
+        with self.assertRaises(requests.exceptions.RetryError):
+            self.translator(http_session(total=2, backoff_factor=0)).translate("hello")
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_client_errors_are_not_retried(self):
+        self.server.statuses = [400]
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self.translator().translate("hello")
+        self.assertEqual(len(self.server.requests), 1)
+
+
+class StubService:
+    """Translation service with the stub server as its only backend"""
+
+    def __init__(self, translator, max_chars):
+        self.translator = translator
+        self.max_chars = max_chars
+
+    def backends(self):
+        return [("http", self.translator.translate, self.max_chars)]
+
+
+class TranslationClientTests(StubServerMixin, SimpleTestCase):
+    def test_batches_requests_and_keeps_order(self):
+        translator = HttpTranslator(self.url, http_session(backoff_factor=0))
+        client = TranslationClient(StubService(translator, 20), config={
+            **translation_client.DEFAULT_TRANSLATION_CLIENT_CONFIG, 'CONCURRENCY': 2,
+        })
+        texts = ["one", "two", "three", "one", "four five six", "seven"]
+        results = client.translate_many(texts)
+        self.assertEqual(results, [(text.upper(), "http") for text in texts])
+        # Five unique texts packed into newline-joined requests of up to 20 characters
+        self.assertEqual(len(self.server.requests), len(pack_batches(list(dict.fromkeys(texts)), 20)))
+        self.assertLess(len(self.server.requests), 5)
+
+
+class FallbackTests(SimpleTestCase):
+    CONFIG = {**translation_client.DEFAULT_TRANSLATION_CLIENT_CONFIG, 'CONCURRENCY': 1, 'RETRY_BACKOFF_SECONDS': 0.5}
+
+    def backend(self, name, fails, calls):
+        """A backend that returns None for texts in ``fails`` and a one-line batch result otherwise"""
+        def translate(text):
+            calls.append((name, text))
+            if any(line in fails for line in text.split(BATCH_SEPARATOR)):
+                return None
+            return text.upper()
+        return translate
+
+    def service(self, primary_fails, backup_fails, calls):
+        service = mock.Mock()
+        service.backends.return_value = [
+            ("primary", self.backend("primary", primary_fails, calls), 100),
+            ("backup", self.backend("backup", backup_fails, calls), 100),
+        ]
+        return service
+
+    def test_only_failed_texts_go_to_the_next_backend(self):
+        calls = []
+        client = TranslationClient(self.service({"two"}, set(), calls), config=self.CONFIG)
+        with mock.patch.object(translation_client.time, 'sleep') as sleep:
+            results = client.translate_many(["one", "two", "three"])
+        self.assertEqual(results, [("ONE", "primary"), ("TWO", "backup"), ("THREE", "primary")])
+        self.assertEqual(calls, [
+            ("primary", "one\ntwo\nthree"),
+            ("primary", "one"), ("primary", "two"), ("primary", "three"),
+            ("backup", "two"),
+        ])
+        sleep.assert_not_called()
+
+    def test_backs_off_between_passes_and_keeps_earlier_successes(self):
+        calls = []
+        fails = {"two"}
+        client = TranslationClient(self.service(fails, fails, calls), config=self.CONFIG)
+
+        def recover(seconds):
+            if len([call for call in calls if call == ("backup", "two")]) == 2:
+                fails.clear()
+        with mock.patch.object(translation_client.time, 'sleep', side_effect=recover) as sleep:
+            results = client.translate_many(["one", "two"])
+        self.assertEqual(results, [("ONE", "primary"), ("TWO", "primary")])
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.5, 1.0])
+        # "one" was translated once; later passes only retried "two"
+        self.assertEqual([text for _, text in calls].count("one"), 1)
+        self.assertEqual(calls[-1], ("primary", "two"))
+
+    def test_gives_up_after_max_retries(self):
+        calls = []
+        client = TranslationClient(self.service({"two"}, {"two"}, calls), config=self.CONFIG)
+        with mock.patch.object(translation_client.time, 'sleep') as sleep:
+            with self.assertRaises(ConnectionError):
+                client.translate_many(["one", "two"])
+        self.assertEqual(sleep.call_count, self.CONFIG['MAX_RETRIES'] - 1)
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from dubbing import uploads
+from dubbing.models import DubbingJob, UploadSession
+
+# An MP4 signature followed by filler
+VIDEO = b'\x00\x00\x00\x18ftypmp42' + bytes(range(256)) * 40
+PROBE = {
+    "duration": 12.0, "bitrate": 800000, "streams": [],
+    "video": {"width": 640, "height": 360, "fps": 25.0}, "audio": {"sample_rate": 44100},
+}
+
+
+class UploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for patcher in (
+            mock.patch('dubbing.uploads.probe_media', return_value=PROBE),
+            mock.patch('dubbing.views.process_dubbing_task'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(uploads._hashers.clear)
+
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def start(self, data=VIDEO, filename='clip.mp4'):
+        response = self.client.post('/dubbing/upload/sessions/', {'filename': filename, 'size': len(data)})
+        self.assertEqual(response.status_code, 201)
+        return response.json()['upload_id']
+
+    def put(self, upload_id, data, start, end=None, total=None):
+        end = start + len(data) - 1 if end is None else end
+        total = len(VIDEO) if total is None else total
+        return self.client.put(
+            f'/dubbing/upload/sessions/{upload_id}/', data, content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{total}',
+        )
+
+    def upload(self, data=VIDEO, chunk=4000):
+        upload_id = self.start(data)
+        for start in range(0, len(data), chunk):
+            response = self.put(upload_id, data[start:start + chunk], start, total=len(data))
+            self.assertEqual(response.status_code, 200, response.content)
+        return upload_id
+
+    def test_chunks_resume_and_finalize_into_a_job(self):
+        upload_id = self.start()
+        self.assertEqual(self.put(upload_id, VIDEO[:4000], 0).json()['offset'], 4000)
+        self.assertEqual(self.client.get(f'/dubbing/upload/sessions/{upload_id}/').json()['offset'], 4000)
+        self.assertEqual(self.put(upload_id, VIDEO[4000:], 4000).json()['offset'], len(VIDEO))
+
+        response = self.client.post(f'/dubbing/upload/sessions/{upload_id}/finalize/')
+        self.assertEqual(response.status_code, 200, response.content)
+        job = DubbingJob.objects.get(id=response.json()['job_id'])
+        self.assertEqual(job.content_hash, hashlib.sha256(VIDEO).hexdigest())
+        self.assertEqual((job.duration, job.width, job.fps), (12.0, 640, 25.0))
+        with open(job.video_file.path, 'rb') as f:
+            self.assertEqual(f.read(), VIDEO)
+        self.assertEqual(UploadSession.objects.get(id=upload_id).status, 'complete')
+        self.assertNotIn(upload_id, {str(key) for key in uploads._hashers})
+
+        # A repeated finalize returns the same job without queueing it again
+        from dubbing.views import process_dubbing_task
+        response = self.client.post(f'/dubbing/upload/sessions/{upload_id}/finalize/')
+        self.assertEqual(response.json()['job_id'], job.id)
+        process_dubbing_task.delay.assert_called_once()
+
+    def test_out_of_order_chunk_is_a_409_with_the_resume_offset(self):
+        upload_id = self.start()
+        self.put(upload_id, VIDEO[:4000], 0)
+        for start in (0, 8000):
+            response = self.put(upload_id, VIDEO[start:start + 100], start)
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.json()['offset'], 4000)
+
+    def test_content_range_is_checked(self):
+        upload_id = self.start()
+        response = self.client.put(
+            f'/dubbing/upload/sessions/{upload_id}/', VIDEO[:10], content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE='bytes=0-9',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.put(upload_id, VIDEO[:10], 0, end=19).status_code, 400)
+        self.assertEqual(self.put(upload_id, VIDEO[:10], 0, total=len(VIDEO) + 1).status_code, 400)
+        self.assertEqual(self.put(upload_id, VIDEO[:10], len(VIDEO) - 5).status_code, 409)
+        self.assertEqual(UploadSession.objects.get(id=upload_id).received, 0)
+
+    def test_chunk_past_the_declared_size_is_rejected(self):
+        upload_id = self.start(VIDEO[:100])
+        self.assertEqual(self.put(upload_id, VIDEO[:200], 0, total=100).status_code, 400)
+
+    def test_wrong_container_is_rejected_on_the_first_chunk(self):
+        data = b'RIFF\x00\x00\x00\x00WAVEfmt ' + bytes(200)
+        upload_id = self.start(data)
+        response = self.put(upload_id, data, 0, total=len(data))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['status'], 'rejected')
+        self.assertFalse(os.path.exists(uploads.part_path(UploadSession.objects.get(id=upload_id))))
+
+    def test_incomplete_upload_cannot_be_finalized(self):
+        upload_id = self.start()
+        self.put(upload_id, VIDEO[:4000], 0)
+        response = self.client.post(f'/dubbing/upload/sessions/{upload_id}/finalize/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 4000)
+
+    def test_only_one_finalize_claims_the_upload(self):
+        upload_id = self.upload()
+        session = UploadSession.objects.get(id=upload_id)
+        # Another request claimed it after this one read the session
+        UploadSession.objects.filter(id=upload_id).update(status='finalizing')
+        with self.assertRaises(uploads.UploadBusy):
+            uploads.finalize_session(session)
+        self.assertFalse(DubbingJob.objects.exists())
+
+        response = self.client.post(f'/dubbing/upload/sessions/{upload_id}/finalize/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['status'], 'finalizing')
+
+    def test_unexpected_finalize_failure_puts_the_upload_back(self):
+        upload_id = self.upload()
+        with mock.patch('dubbing.uploads.probe_media', side_effect=RuntimeError("ffprobe crashed")):
+            response = self.client.post(f'/dubbing/upload/sessions/{upload_id}/finalize/')
+        self.assertEqual(response.status_code, 500)
+        session = UploadSession.objects.get(id=upload_id)
+        self.assertEqual(session.status, 'uploading')
+        with open(uploads.part_path(session), 'rb') as f:
+            self.assertEqual(f.read(), VIDEO)
+        self.assertEqual(self.client.post(f'/dubbing/upload/sessions/{upload_id}/finalize/').status_code, 200)
+
+    def test_unusable_media_is_rejected_at_finalize(self):
+        upload_id = self.upload()
+        with mock.patch('dubbing.uploads.probe_media', return_value={**PROBE, 'video': None}):
+            response = self.client.post(f'/dubbing/upload/sessions/{upload_id}/finalize/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['status'], 'rejected')
+        self.assertFalse(DubbingJob.objects.exists())
+
+    def test_cancel_and_expiry_drop_data_and_hashers(self):
+        cancelled = self.start()
+        self.put(cancelled, VIDEO[:4000], 0)
+        self.assertEqual(self.client.delete(f'/dubbing/upload/sessions/{cancelled}/').status_code, 204)
+        self.assertEqual(UploadSession.objects.get(id=cancelled).status, 'rejected')
+
+        abandoned = self.start()
+        self.put(abandoned, VIDEO[:4000], 0)
+        session = UploadSession.objects.get(id=abandoned)
+        self.assertIn(session.id, uploads._hashers)
+        UploadSession.objects.filter(id=abandoned).update(updated_at=timezone.now() - timedelta(hours=48))
+        uploads.expire_sessions()
+        self.assertFalse(UploadSession.objects.filter(id=abandoned).exists())
+        self.assertFalse(os.path.exists(uploads.part_path(session)))
+        self.assertEqual(uploads._hashers, {})
+
+    def test_expiry_drops_idle_hashers_of_sessions_expired_elsewhere(self):
+        now = 10 * 24 * 3600.0
+        uploads._hashers['gone'] = (10, hashlib.sha256(), now - 25 * 3600)
+        uploads._hashers['active'] = (10, hashlib.sha256(), now - 60)
+        with mock.patch.object(uploads.time, 'monotonic', return_value=now):
+            uploads.expire_sessions()
+        self.assertEqual(list(uploads._hashers), ['active'])
@@ -0,0 +1,74 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from dubbing.vad import DEFAULT_VAD_CONFIG, SpeechRegions, detect_speech
+
+RATE = 16000
+
+
+def voice(seconds, level=0.1):
+    """A voiced-speech stand-in: harmonics of 180 Hz inside the voice band"""
+    t = np.arange(int(seconds * RATE)) / RATE
+    return level * sum(np.sin(2 * np.pi * 180 * k * t) / k for k in range(1, 12)).astype(np.float32)
+
+
+def silence(seconds):
+    return (np.random.default_rng(0).standard_normal(int(seconds * RATE)) * 1e-4).astype(np.float32)
+
+
+class DetectSpeechTests(SimpleTestCase):
+    def test_finds_padded_regions_between_silences(self):
+        samples = np.concatenate([silence(1), voice(1), silence(2), voice(2), silence(1)])
+        speech = detect_speech(samples, RATE)
+        self.assertEqual(len(speech.regions), 2)
+        pad = DEFAULT_VAD_CONFIG['PAD_SECONDS']
+        for (start, end), (expected_start, expected_end) in zip(speech.regions, [(1, 2), (4, 6)]):
+            self.assertAlmostEqual(start, expected_start - pad, delta=0.05)
+            self.assertAlmostEqual(end, expected_end + pad, delta=0.05)
+        self.assertEqual(speech.duration, 7.0)
+
+    def test_short_pauses_are_bridged(self):
+        samples = np.concatenate([silence(1), voice(1), silence(0.2), voice(1), silence(1)])
+        self.assertEqual(len(detect_speech(samples, RATE).regions), 1)
+
+    def test_silence_and_wall_to_wall_speech(self):
+        self.assertFalse(detect_speech(silence(3), RATE))
+        # No quiet frames to estimate a noise floor from: still speech, not silence
+        speech = detect_speech(voice(3), RATE)
+        self.assertEqual(speech.regions, [(0.0, 3.0)])
+
+    def test_disabled_vad_keeps_the_whole_track(self):
+        speech = detect_speech(silence(2), RATE, config={**DEFAULT_VAD_CONFIG, 'ENABLED': False})
+        self.assertEqual(speech.regions, [(0.0, 2.0)])
+
+
+class SpeechRegionsTests(SimpleTestCase):
+    def setUp(self):
+        # Packed: region one at 0-1, a 0.5 s gap, region two at 1.5-3.5
+        self.speech = SpeechRegions([(1.0, 2.0), (4.0, 6.0)], 10.0, gap=0.5)
+
+    def test_pack_joins_regions_with_gaps(self):
+        samples = np.arange(100, dtype=np.float32)
+        packed = self.speech.pack(samples, 10)
+        np.testing.assert_array_equal(packed, np.concatenate([samples[10:20], np.zeros(5), samples[40:60]]))
+        whole = SpeechRegions([(0.0, 10.0)], 10.0, gap=0.5)
+        self.assertIs(whole.pack(samples, 10), samples)
+
+    def test_to_original(self):
+        self.assertEqual(self.speech.to_original(0.5), 1.5)
+        self.assertEqual(self.speech.to_original(2.0), 4.5)
+        self.assertEqual(self.speech.to_original(3.5), 6.0)
+        # Inside the gap: ends snap back to the earlier region, starts forward to the next
+        self.assertEqual(self.speech.to_original(1.2), 2.0)
+        self.assertEqual(self.speech.to_original(1.2, is_start=True), 4.0)
+
+    def test_remap_moves_segments_and_words(self):
+        segments = [{
+            "start": 0.2, "end": 2.5, "text": "hello there",
+            "words": [{"start": 0.2, "end": 0.8, "word": "hello"}, {"start": 1.3, "end": 2.5, "word": "there"}],
+        }]
+        [segment] = self.speech.remap(segments)
+        self.assertEqual((segment["start"], segment["end"], segment["text"]), (1.2, 5.0, "hello there"))
+        self.assertEqual([(w["start"], w["end"]) for w in segment["words"]], [(1.2, 1.8), (4.0, 5.0)])
+        # The input isn't modified
+        self.assertEqual(segments[0]["start"], 0.2)
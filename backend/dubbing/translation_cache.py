@@ -0,0 +1,163 @@
+import hashlib
+import logging
+import re
+import threading
+import unicodedata
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRANSLATION_CACHE_CONFIG = {
+    'ENABLED': True,
+    'MAX_ENTRIES': 100000,
+    'MAX_AGE_DAYS': 180,  # Entries not used for this long are dropped
+    'EVICT_EVERY': 500,  # Run eviction after this many inserts per process
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def get_translation_cache_config():
+    """Return TRANSLATION_CACHE from settings merged over the defaults"""
+    config = dict(DEFAULT_TRANSLATION_CACHE_CONFIG)
+    config.update(getattr(settings, 'TRANSLATION_CACHE', {}) or {})
+    return config
+
+
+def normalize_text(text):
+    """Unicode-normalize and collapse whitespace so trivially different sentences share a key"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(text, source_lang, target_lang, backend):
+    payload = "\x1f".join([source_lang, target_lang, backend, normalize_text(text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """
+    Persistent translation memory backed by the TranslationMemory table.
+
+    Lookups and inserts are batched; entries are evicted least recently used
+    first above ``MAX_ENTRIES`` and dropped once older than ``MAX_AGE_DAYS``.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_translation_cache_config()
+        self._lock = threading.Lock()
+        self._inserts_since_evict = 0
+        self.stats = {"hits": 0, "misses": 0, "inserts": 0, "evicted": 0}
+
+    @property
+    def model(self):
+        return apps.get_model('dubbing', 'TranslationMemory')
+
+    def hit_rate(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+    def get_many(self, texts, source_lang, target_lang, backends):
+        """
+        Return {text: translation} for every text found under any of ``backends``.
+
+        Backends are tried in the given order of preference.
+        """
+        if not self.config['ENABLED'] or not texts:
+            return {}
+
+        keys = {}
+        for text in set(texts):
+            for rank, backend in enumerate(backends):
+                keys[cache_key(text, source_lang, target_lang, backend)] = (text, rank)
+
+        rows = list(
+            self.model.objects.filter(key_hash__in=list(keys)).values_list('key_hash', 'translated_text')
+        )
+        found = {}
+        for key_hash, translated in rows:
+            text, rank = keys[key_hash]
+            if text not in found or rank < found[text][1]:
+                found[text] = (translated, rank)
+
+        if rows:
+            self.model.objects.filter(key_hash__in=[k for k, _ in rows]).update(
+                hit_count=F('hit_count') + 1, last_used_at=timezone.now()
+            )
+
+        with self._lock:
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(set(texts)) - len(found)
+        return {text: translated for text, (translated, _) in found.items()}
+
+    def get(self, text, source_lang, target_lang, backends):
+        return self.get_many([text], source_lang, target_lang, backends).get(text)
+
+    def set_many(self, pairs, source_lang, target_lang, backend):
+        """Store (source_text, translated_text) pairs produced by ``backend``"""
+        if not self.config['ENABLED'] or not pairs:
+            return
+        rows = {}
+        for text, translated in pairs:
+            if not text or not translated:
+                continue
+            key = cache_key(text, source_lang, target_lang, backend)
+            rows[key] = self.model(
+                key_hash=key,
+                source_lang=source_lang,
+                target_lang=target_lang,
+                backend=backend,
+                source_text=normalize_text(text),
+                translated_text=translated,
+            )
+        self.model.objects.bulk_create(list(rows.values()), batch_size=500, ignore_conflicts=True)
+
+        with self._lock:
+            self.stats["inserts"] += len(rows)
+            self._inserts_since_evict += len(rows)
+            due = self._inserts_since_evict >= self.config['EVICT_EVERY']
+            if due:
+                self._inserts_since_evict = 0
+        if due:
+            self.evict()
+
+    def set(self, text, translated, source_lang, target_lang, backend):
+        self.set_many([(text, translated)], source_lang, target_lang, backend)
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones above the size cap"""
+        removed = 0
+        max_age_days = self.config['MAX_AGE_DAYS']
+        if max_age_days:
+            cutoff = timezone.now() - timedelta(days=max_age_days)
+            removed += self.model.objects.filter(last_used_at__lt=cutoff).delete()[0]
+
+        max_entries = self.config['MAX_ENTRIES']
+        if max_entries:
+            excess = self.model.objects.count() - max_entries
+            if excess > 0:
+                stale_ids = list(
+                    self.model.objects.order_by('last_used_at').values_list('id', flat=True)[:excess]
+                )
+                removed += self.model.objects.filter(id__in=stale_ids).delete()[0]
+
+        with self._lock:
+            self.stats["evicted"] += removed
+        if removed:
+            logger.info(f"Translation cache evicted {removed} entries")
+        return removed
+
+
+_cache = None
+
+
+def get_translation_cache():
+    """Return the process-wide translation cache"""
+    global _cache
+    if _cache is None:
+        _cache = TranslationCache()
+    return _cache
@@ -0,0 +1,311 @@
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRANSLATION_CLIENT_CONFIG = {
+    'RATE_PER_SECOND': 2.0,  # Requests per second shared by every worker process
+    'BURST': 4,
+    'CONCURRENCY': 4,  # Batches in flight per job
+    'PRIMARY_MAX_CHARS': 4500,
+    'BACKUP_MAX_CHARS': 500,
+    'MAX_RETRIES': 3,
+    'RETRY_BACKOFF_SECONDS': 1.0,  # Wait before the second pass over the backends, doubled for each later one
+    'REDIS_URL': None,  # Defaults to CELERY_BROKER_URL; None there = per-process limiter
+    'RATE_LIMIT_KEY': 'dubbing:translation:bucket',
+    'HTTP_URL': None,  # LibreTranslate-compatible endpoint, used first when set
+    'HTTP_MAX_CHARS': 4500,
+    'HTTP_TIMEOUT': 30,
+}
+
+BATCH_SEPARATOR = "\n"
+
+_SENTENCE_END = re.compile(r"(?<=[.!?।])\s+")
+
+# Atomically refill and take from a bucket stored in a Redis hash. Returns the
+# number of seconds to wait (as a string, Lua numbers are truncated to ints).
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = (requested - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+return tostring(wait)
+"""
+
+
+def get_translation_client_config():
+    """Return TRANSLATION_CLIENT from settings merged over the defaults"""
+    config = dict(DEFAULT_TRANSLATION_CLIENT_CONFIG)
+    config.update(getattr(settings, 'TRANSLATION_CLIENT', {}) or {})
+    if not config['REDIS_URL']:
+        config['REDIS_URL'] = getattr(settings, 'CELERY_BROKER_URL', None)
+    return config
+
+
+class LocalTokenBucket:
+    """In-process token bucket; used when Redis is not reachable"""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = self.burst
+        self.ts = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.ts) * self.rate)
+            self.ts = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+
+class RedisTokenBucket:
+    """Token bucket kept in Redis so every worker process shares one budget"""
+
+    def __init__(self, url, key, rate, burst):
+        import redis
+        self.client = redis.Redis.from_url(url, socket_timeout=2)
+        self.key = key
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._script = self.client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    def reserve(self, tokens=1):
+        return float(self._script(keys=[self.key], args=[self.rate, self.burst, tokens]))
+
+
+class RateLimiter:
+    """Blocks callers until the shared token bucket grants a request"""
+
+    def __init__(self, config=None):
+        config = config or get_translation_client_config()
+        self.local = LocalTokenBucket(config['RATE_PER_SECOND'], config['BURST'])
+        self.shared = None
+        if config['REDIS_URL'] and config['REDIS_URL'].startswith(('redis://', 'rediss://', 'unix://')):
+            try:
+                self.shared = RedisTokenBucket(
+                    config['REDIS_URL'], config['RATE_LIMIT_KEY'],
+                    config['RATE_PER_SECOND'], config['BURST'],
+                )
+            except Exception as e:
+                logger.warning(f"Shared rate limiter unavailable, using per-process bucket: {str(e)}")
+
+    def acquire(self, tokens=1):
+        while True:
+            wait = None
+            if self.shared is not None:
+                try:
+                    wait = self.shared.reserve(tokens)
+                except Exception as e:
+                    logger.warning(f"Shared rate limiter failed, using per-process bucket: {str(e)}")
+                    self.shared = None
+            if wait is None:
+                wait = self.local.reserve(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+
+def http_session(total=5, backoff_factor=0.1):
+    """
+    A requests session that retries connection errors, 429 and 5xx responses
+    with exponential backoff (honouring Retry-After). POST is retried too:
+    translating a text is idempotent.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retries = Retry(
+        total=total,
+        backoff_factor=backoff_factor,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {'POST'},
+    )
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(max_retries=retries))
+    session.mount('http://', HTTPAdapter(max_retries=retries))
+    return session
+
+
+class HttpTranslator:
+    """Client for a LibreTranslate-compatible ``POST /translate`` endpoint"""
+
+    def __init__(self, url, session, source='en', target='hi', timeout=30):
+        self.url = url
+        self.session = session
+        self.source = source
+        self.target = target
+        self.timeout = timeout
+
+    def translate(self, text):
+        response = self.session.post(
+            self.url,
+            json={"q": text, "source": self.source, "target": self.target, "format": "text"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()["translatedText"]
+
+
+def split_sentences(text, max_chars):
+    """
+    Split ``text`` into pieces of at most ``max_chars`` characters.
+
+    Breaks at sentence ends where possible, then at whitespace; a single
+    word longer than ``max_chars`` is the only thing ever cut.
+    """
+    pieces = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+            continue
+        for word in sentence.split():
+            while len(word) > max_chars:
+                pieces.append(word[:max_chars])
+                word = word[max_chars:]
+            pieces.append(word)
+    return pack(pieces, max_chars, " ")
+
+
+def pack(pieces, max_chars, separator):
+    """Greedily join consecutive pieces while the result stays within ``max_chars``"""
+    packed = []
+    current = ""
+    for piece in pieces:
+        if not piece:
+            continue
+        candidate = f"{current}{separator}{piece}" if current else piece
+        if len(candidate) <= max_chars:
+            current = candidate
+        else:
+            if current:
+                packed.append(current)
+            current = piece
+    if current:
+        packed.append(current)
+    return packed
+
+
+def pack_batches(texts, max_chars):
+    """Group texts into batches whose separator-joined length fits ``max_chars``"""
+    batches = []
+    current = []
+    length = 0
+    for text in texts:
+        if BATCH_SEPARATOR in text:
+            # Multi-line texts can't be split back out of a batch reliably
+            if current:
+                batches.append(current)
+                current, length = [], 0
+            batches.append([text])
+            continue
+        added = len(text) + (len(BATCH_SEPARATOR) if current else 0)
+        if current and length + added > max_chars:
+            batches.append(current)
+            current, length = [], 0
+            added = len(text)
+        current.append(text)
+        length += added
+    if current:
+        batches.append(current)
+    return batches
+
+
+class TranslationClient:
+    """
+    Sentence-aware, batched and concurrent front end over a translation service.
+
+    Texts are packed into newline-separated batches up to the primary
+    backend's size limit and sent from a thread pool. Every backend request
+    first takes a token from the shared rate limiter, so pacing comes from
+    the limiter rather than fixed sleeps.
+    """
+
+    def __init__(self, service, config=None):
+        self.service = service
+        self.config = config or get_translation_client_config()
+
+    def translate_many(self, texts):
+        """Translate ``texts``; returns a list of (translation, backend name) in the same order"""
+        unique = list(dict.fromkeys(texts))
+        if not unique:
+            return []
+        max_chars = self.service.backends()[0][2]
+        batches = pack_batches(unique, max_chars)
+        logger.info(f"Translating {len(unique)} texts in {len(batches)} batches")
+
+        results = {}
+        workers = max(1, min(self.config['CONCURRENCY'], len(batches)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for batch, translated in zip(batches, pool.map(self._translate_batch, batches)):
+                results.update(zip(batch, translated))
+        return [results[text] for text in texts]
+
+    def _translate_batch(self, batch):
+        """
+        Translate a batch through the backends in order. Texts a backend
+        translates are kept and only the rest go on to the next backend; a
+        pass that leaves texts untranslated is retried after a backoff.
+        """
+        done = {}
+        for attempt in range(self.config['MAX_RETRIES']):
+            if attempt:
+                time.sleep(self.config['RETRY_BACKOFF_SECONDS'] * 2 ** (attempt - 1))
+            for name, translate, max_chars in self.service.backends():
+                pending = [text for text in batch if text not in done]
+                joined = BATCH_SEPARATOR.join(pending)
+                if len(pending) > 1 and len(joined) <= max_chars:
+                    out = translate(joined)
+                    parts = out.split(BATCH_SEPARATOR) if out else []
+                    if len(parts) == len(pending):
+                        done.update((text, (part.strip(), name)) for text, part in zip(pending, parts))
+                        return [done[text] for text in batch]
+                    logger.info(f"{name} returned {len(parts)} lines for a batch of {len(pending)}, splitting")
+
+                for text in pending:
+                    chunks = [translate(chunk) for chunk in split_sentences(text, max_chars)]
+                    if all(chunks):
+                        done[text] = (" ".join(chunks), name)
+                if len(done) == len(batch):
+                    return [done[text] for text in batch]
+            logger.warning(
+                f"{len(batch) - len(done)} of {len(batch)} texts failed on every translation backend "
+                f"(attempt {attempt + 1}/{self.config['MAX_RETRIES']})"
+            )
+        raise ConnectionError("All translation attempts failed")
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Return the process-wide handle on the shared translation rate limiter"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+    return _limiter
@@ -1,35 +1,61 @@
 import logging
-from typing import Optional
+from typing import Callable, List, Optional, Tuple
 from googletrans import Translator
 from translate import Translator as BackupTranslator
-import requests
-import time
-from urllib3.util.retry import Retry
-from requests.adapters import HTTPAdapter
+from .translation_cache import get_translation_cache, normalize_text
+from .translation_client import (
+    HttpTranslator, TranslationClient, get_rate_limiter, get_translation_client_config, http_session, split_sentences,
+)
 
 logger = logging.getLogger(__name__)
 
-# ...existing code...
+SOURCE_LANG = 'en'
+TARGET_LANG = 'hi'
+HTTP_BACKEND = 'http'
+PRIMARY_BACKEND = 'googletrans'
+BACKUP_BACKEND = 'translate'
+BACKENDS = [HTTP_BACKEND, PRIMARY_BACKEND, BACKUP_BACKEND]
 
 class TranslationService:
     def __init__(self):
+        self.config = get_translation_client_config()
+        self.limiter = get_rate_limiter()
         # Configure session with retries
-        self.session = requests.Session()
-        retries = Retry(
-            total=5,
-            backoff_factor=0.1,
-            status_forcelist=[500, 502, 503, 504]
-        )
-        self.session.mount('https://', HTTPAdapter(max_retries=retries))
+        self.session = http_session()
         self.primary_translator = Translator(service_urls=[
             'translate.google.com',
             'translate.google.co.in',
             'translate.google.co.uk'
         ])
         self.backup_translator = BackupTranslator(to_lang="hi")  # <-- changed to Hindi
+        self.http_translator = None
+        if self.config['HTTP_URL']:
+            self.http_translator = HttpTranslator(
+                self.config['HTTP_URL'], self.session,
+                source=SOURCE_LANG, target=TARGET_LANG, timeout=self.config['HTTP_TIMEOUT']
+            )
+
+    def backends(self) -> List[Tuple[str, Callable[[str], Optional[str]], int]]:
+        """Backends in order of preference as (name, translate function, max request chars)"""
+        backends = [
+            (PRIMARY_BACKEND, self.translate_with_primary, self.config['PRIMARY_MAX_CHARS']),
+            (BACKUP_BACKEND, self.translate_with_backup, self.config['BACKUP_MAX_CHARS']),
+        ]
+        if self.http_translator:
+            backends.insert(0, (HTTP_BACKEND, self.translate_with_http, self.config['HTTP_MAX_CHARS']))
+        return backends
+
+    def translate_with_http(self, text: str) -> Optional[str]:
+        try:
+            self.limiter.acquire()
+            return self.http_translator.translate(text)
+        except Exception as e:
+            logger.warning(f"HTTP translation failed: {str(e)}")
+            return None
 
     def translate_with_primary(self, text: str) -> Optional[str]:
         try:
+            self.limiter.acquire()
             result = self.primary_translator.translate(text, dest='hi')  # <-- changed to Hindi
             return result.text
         except Exception as e:
@@ -38,51 +64,65 @@ class TranslationService:
 
     def translate_with_backup(self, text: str) -> Optional[str]:
         try:
-            # Split text into smaller chunks to handle length limits
-            max_chunk_size = 500
-            chunks = [text[i:i + max_chunk_size] for i in range(0, len(text), max_chunk_size)]
-            
+            # Split at sentence/word boundaries to stay under the backend's length limit
             translated_chunks = []
-            for chunk in chunks:
-                translated = self.backup_translator.translate(chunk)
-                translated_chunks.append(translated)
-                time.sleep(0.5)  # Rate limiting
+            for chunk in split_sentences(text, self.config['BACKUP_MAX_CHARS']):
+                self.limiter.acquire()
+                translated_chunks.append(self.backup_translator.translate(chunk))
                 
             return ' '.join(translated_chunks)
         except Exception as e:
             logger.warning(f"Backup translation failed: {str(e)}")
             return None
 
-def translate_text_to_hindi(text: str, max_retries: int = 3) -> str:
+_service = None
+
+def get_translation_service() -> TranslationService:
+    """Return the process-wide translation service (one HTTP session per worker)"""
+    global _service
+    if _service is None:
+        _service = TranslationService()
+    return _service
+
+_client = None
+
+def get_translation_client() -> TranslationClient:
+    """Return the process-wide batched translation client"""
+    global _client
+    if _client is None:
+        _client = TranslationClient(get_translation_service())
+    return _client
+
+def translate_texts_to_hindi(texts: List[str]) -> List[str]:
     """
-    Translate English text to Hindi with fallback mechanisms
+    Translate many English texts to Hindi, sending only translation-memory misses to the network
     """
-    service = TranslationService()
-    
-    for attempt in range(max_retries):
-        try:
-            logger.info(f"Translation attempt {attempt + 1}/{max_retries}")
-            
-            # Try primary translation service
-            result = service.translate_with_primary(text)
-            if result:
-                logger.info("Primary translation successful")
-                return result
-                
-            # Try backup translation service
-            result = service.translate_with_backup(text)
-            if result:
-                logger.info("Backup translation successful")
-                return result
-                
-            # If both failed, wait before retry
-            time.sleep(1 * (attempt + 1))
-            
-        except Exception as e:
-            logger.error(f"Translation attempt {attempt + 1} failed: {str(e)}")
-            if attempt == max_retries - 1:
-                raise
-            time.sleep(1 * (attempt + 1))
-            
-    raise ConnectionError("All translation attempts failed")
+    cache = get_translation_cache()
+    cached = cache.get_many(texts, SOURCE_LANG, TARGET_LANG, BACKENDS)
+    misses = [text for text in dict.fromkeys(texts) if text not in cached]
+    logger.info(f"Translation memory: {len(texts) - len(misses)} hits, {len(misses)} misses")
+
+    translated = dict(cached)
+    new_entries = {backend: [] for backend in BACKENDS}
+    by_normalized = {}
+    for text in misses:
+        by_normalized.setdefault(normalize_text(text), text)
+    if by_normalized:
+        representatives = list(by_normalized.values())
+        results = get_translation_client().translate_many(representatives)
+        for text, (result, backend) in zip(representatives, results):
+            by_normalized[normalize_text(text)] = result
+            new_entries[backend].append((text, result))
+    for text in misses:
+        translated[text] = by_normalized[normalize_text(text)]
+    for backend, pairs in new_entries.items():
+        cache.set_many(pairs, SOURCE_LANG, TARGET_LANG, backend)
 
+    logger.info(f"Translation memory stats: {cache.stats} (hit rate {cache.hit_rate():.0%})")
+    return [translated[text] for text in texts]
+
+def translate_text_to_hindi(text: str) -> str:
+    """
+    Translate English text to Hindi with fallback mechanisms
+    """
+    return translate_texts_to_hindi([text])[0]
@@ -0,0 +1,167 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+from django.conf import settings
+
+from .hashing import hash_file
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTS_CONFIG = {
+    'MODEL_NAME': 'tts_models/multilingual/multi-dataset/xtts_v2',
+    'LANGUAGE': 'hi',
+    'SPEAKER_CACHE_DIR': os.path.join(settings.MEDIA_ROOT, 'cache', 'speakers'),
+    'SPEAKER_CACHE_SIZE': 64,  # In-memory conditioning entries per worker
+    'PRELOAD': False,
+}
+
+
+def get_tts_config():
+    """Return TTS_CONFIG from settings merged over the defaults"""
+    config = dict(DEFAULT_TTS_CONFIG)
+    config.update(getattr(settings, 'TTS_CONFIG', {}) or {})
+    return config
+
+
+class XTTSEngine:
+    """
+    Long-lived XTTS engine for one worker process.
+
+    The model is loaded once and the speaker conditioning (GPT latents and
+    speaker embedding) for every reference clip is cached by content hash,
+    in memory and as ``.npz`` files on disk, so repeated synthesis for the
+    same speaker skips the conditioning pass.
+    """
+
+    def __init__(self, model_name=None, use_cuda=None, cache_dir=None, cache_size=None):
+        config = get_tts_config()
+        self.model_name = model_name or config['MODEL_NAME']
+        self.use_cuda = torch.cuda.is_available() if use_cuda is None else use_cuda
+        self.cache_dir = cache_dir or config['SPEAKER_CACHE_DIR']
+        self.cache_size = cache_size or config['SPEAKER_CACHE_SIZE']
+        self._tts = None
+        self._latents = OrderedDict()
+        self._lock = threading.RLock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "computed": 0}
+
+    @property
+    def tts(self):
+        if self._tts is None:
+            from TTS.api import TTS
+            logger.info(f"Loading TTS model {self.model_name} (cuda={self.use_cuda})")
+            self._tts = TTS(model_name=self.model_name, progress_bar=False, gpu=self.use_cuda)
+        return self._tts
+
+    @property
+    def model(self):
+        return self.tts.synthesizer.tts_model
+
+    @property
+    def sample_rate(self):
+        return self.model.config.audio.output_sample_rate
+
+    def _cache_path(self, clip_hash):
+        model_dir = self.model_name.replace('/', '--')
+        return os.path.join(self.cache_dir, model_dir, f"{clip_hash}.npz")
+
+    def _remember(self, clip_hash, latents):
+        self._latents[clip_hash] = latents
+        self._latents.move_to_end(clip_hash)
+        while len(self._latents) > self.cache_size:
+            self._latents.popitem(last=False)
+
+    def get_conditioning(self, reference_audio):
+        """Return (gpt_cond_latent, speaker_embedding) for a reference clip"""
+        clip_hash = hash_file(reference_audio)
+        with self._lock:
+            if clip_hash in self._latents:
+                self._latents.move_to_end(clip_hash)
+                self.stats["memory_hits"] += 1
+                return self._latents[clip_hash]
+
+            device = self.model.device
+            cache_path = self._cache_path(clip_hash)
+            if os.path.exists(cache_path):
+                try:
+                    with np.load(cache_path) as data:
+                        latents = (
+                            torch.from_numpy(data['gpt_cond_latent']).to(device),
+                            torch.from_numpy(data['speaker_embedding']).to(device),
+                        )
+                    self.stats["disk_hits"] += 1
+                    self._remember(clip_hash, latents)
+                    return latents
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable speaker cache {cache_path}: {str(e)}")
+
+            logger.info(f"Computing speaker conditioning for {reference_audio}")
+            gpt_cond_latent, speaker_embedding = self.model.get_conditioning_latents(
+                audio_path=[str(reference_audio)]
+            )
+            self.stats["computed"] += 1
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+            np.savez(
+                tmp_path,
+                gpt_cond_latent=gpt_cond_latent.detach().cpu().numpy(),
+                speaker_embedding=speaker_embedding.detach().cpu().numpy(),
+            )
+            os.replace(tmp_path, cache_path)
+            latents = (gpt_cond_latent, speaker_embedding)
+            self._remember(clip_hash, latents)
+            return latents
+
+    def synthesize(self, text, reference_audio, language=None, conditioning=None):
+        """
+        Synthesize ``text`` in the reference speaker's voice; returns a float
+        waveform. ``conditioning`` skips the lookup when the caller has it.
+        """
+        language = language or get_tts_config()['LANGUAGE']
+        gpt_cond_latent, speaker_embedding = conditioning or self.get_conditioning(reference_audio)
+        with torch.inference_mode():
+            out = self.model.inference(
+                text,
+                language,
+                gpt_cond_latent,
+                speaker_embedding,
+                enable_text_splitting=True,
+            )
+        wav = out["wav"]
+        if torch.is_tensor(wav):
+            wav = wav.cpu().numpy()
+        return np.asarray(wav, dtype=np.float32)
+
+    def synthesize_to_file(self, text, output_path, reference_audio, language=None, conditioning=None):
+        wav = self.synthesize(text, reference_audio, language, conditioning)
+        os.makedirs(os.path.dirname(str(output_path)) or '.', exist_ok=True)
+        self.tts.synthesizer.save_wav(wav=wav, path=str(output_path))
+        return output_path
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_tts_engine():
+    """Return the process-wide XTTS engine"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = XTTSEngine()
+    return _engine
+
+
+def warm_up_tts():
+    """Load the TTS model on worker start when TTS_CONFIG['PRELOAD'] is set"""
+    from .inference_client import use_inference_server
+    if not get_tts_config()['PRELOAD'] or use_inference_server():
+        return
+    try:
+        get_tts_engine().model
+        logger.info("TTS warm-up complete")
+    except Exception as e:
+        logger.error(f"TTS warm-up failed: {str(e)}")
@@ -0,0 +1,292 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .checks import ALLOWED_VIDEO_FORMATS, MAX_VIDEO_SIZE, check_video_size, validate_video_format
+from .hashing import hash_file
+from .media_probe import probe_media, run_ffprobe, save_probe_to_job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_UPLOAD_CONFIG = {
+    'CHUNK_SIZE': 8 * 1024 * 1024,  # Suggested to clients when a session starts
+    'MAX_CHUNK_SIZE': 64 * 1024 * 1024,
+    'PROBE_BYTES': 4 * 1024 * 1024,  # Probe the container header once this much has arrived
+    'SESSION_TTL_HOURS': 24,  # Unfinished sessions older than this are deleted with their data
+}
+
+UPLOAD_DIR = 'uploads'
+READ_SIZE = 1024 * 1024
+
+# Leading bytes of each container, for rejecting files that only have the right extension
+CONTAINERS = {
+    '.mp4': 'mp4',
+    '.mov': 'mp4',
+    '.mkv': 'matroska',
+    '.avi': 'avi',
+}
+
+
+class OffsetMismatch(ValueError):
+    """A chunk that doesn't start where the upload left off; ``offset`` is where it did"""
+
+    def __init__(self, offset):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+
+class UploadBusy(ValueError):
+    """Another request is finalizing the upload"""
+
+
+def get_upload_config():
+    """Return UPLOAD_CONFIG from settings merged over the defaults"""
+    config = dict(DEFAULT_UPLOAD_CONFIG)
+    config.update(getattr(settings, 'UPLOAD_CONFIG', {}) or {})
+    return config
+
+
+def sniff_container(head):
+    """Container family from a file's first bytes, or None if it isn't one we accept"""
+    if len(head) >= 12 and head[4:8] in (b'ftyp', b'moov', b'mdat', b'free', b'wide', b'skip'):
+        return 'mp4'
+    if head[:4] == b'\x1a\x45\xdf\xa3':
+        return 'matroska'
+    if head[:4] == b'RIFF' and head[8:12] == b'AVI ':
+        return 'avi'
+    return None
+
+
+def part_path(session):
+    return os.path.join(settings.MEDIA_ROOT, UPLOAD_DIR, f"{session.id}.part")
+
+
+# Running SHA-256 per session in this process, with the time of its last chunk;
+# a chunk landing on another process just means the file is hashed once more at finalize
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+def _take_hasher(session_id, offset):
+    with _hashers_lock:
+        received, digest, _ = _hashers.pop(session_id, (None, None, None))
+    if offset == 0:
+        return hashlib.sha256()
+    return digest if received == offset else None
+
+
+def reject_session(session, reason):
+    """Mark a session rejected and drop its data"""
+    session.status = 'rejected'
+    session.error_message = reason
+    session.save(update_fields=['status', 'error_message', 'updated_at'])
+    with _hashers_lock:
+        _hashers.pop(session.id, None)
+    if os.path.exists(part_path(session)):
+        os.remove(part_path(session))
+    logger.info(f"Rejected upload {session.id}: {reason}")
+    raise ValueError(reason)
+
+
+def expire_sessions(config=None):
+    """Delete unfinished sessions (and their partial files) past SESSION_TTL_HOURS"""
+    config = config or get_upload_config()
+    UploadSession = apps.get_model('dubbing', 'UploadSession')
+    cutoff = timezone.now() - timedelta(hours=config['SESSION_TTL_HOURS'])
+    stale = list(UploadSession.objects.filter(updated_at__lt=cutoff).exclude(status='complete'))
+    idle_since = time.monotonic() - config['SESSION_TTL_HOURS'] * 3600
+    with _hashers_lock:
+        # Also drop hashers idle past the TTL: another process may have expired their sessions
+        for session_id in [key for key, (_, _, touched) in _hashers.items() if touched < idle_since]:
+            del _hashers[session_id]
+        for session in stale:
+            _hashers.pop(session.id, None)
+    for session in stale:
+        if os.path.exists(part_path(session)):
+            os.remove(part_path(session))
+    if stale:
+        UploadSession.objects.filter(id__in=[session.id for session in stale]).delete()
+        logger.info(f"Expired {len(stale)} upload sessions")
+
+
+def create_session(user, filename, size, quality='medium'):
+    """Start a resumable upload after checking the name and declared size"""
+    UploadSession = apps.get_model('dubbing', 'UploadSession')
+    filename = os.path.basename(filename or '')
+    if not any(filename.lower().endswith(fmt) for fmt in ALLOWED_VIDEO_FORMATS):
+        raise ValueError(f"Unsupported video format. Allowed formats: {', '.join(ALLOWED_VIDEO_FORMATS)}")
+    if not size or size <= 0:
+        raise ValueError("Upload size must be a positive number of bytes")
+    if size > MAX_VIDEO_SIZE:
+        raise ValueError(f"Video file too large. Maximum size: {MAX_VIDEO_SIZE/1024/1024}MB")
+
+    expire_sessions()
+    session = UploadSession.objects.create(user=user, filename=filename, size=size, quality=quality)
+    os.makedirs(os.path.dirname(part_path(session)), exist_ok=True)
+    open(part_path(session), 'wb').close()
+    logger.info(f"Started upload {session.id}: {filename} ({size} bytes)")
+    return session
+
+
+def write_chunk(session, offset, stream, length, config=None):
+    """
+    Stream ``length`` bytes from ``stream`` into the session's file at ``offset``.
+
+    The offset must be where the upload left off (OffsetMismatch otherwise).
+    If the client disconnects midway, the bytes that did arrive are kept and
+    the next chunk resumes from there. The first chunk is sniffed for the
+    container signature and the header is probed once PROBE_BYTES are in, so
+    bad media is rejected long before the upload completes.
+    """
+    config = config or get_upload_config()
+    UploadSession = apps.get_model('dubbing', 'UploadSession')
+    if session.status != 'uploading':
+        raise ValueError(f"Upload is {session.status}")
+    if offset != session.received:
+        raise OffsetMismatch(session.received)
+    if length <= 0 or length > config['MAX_CHUNK_SIZE']:
+        raise ValueError(f"Chunk size must be between 1 and {config['MAX_CHUNK_SIZE']} bytes")
+    if offset + length > session.size:
+        raise ValueError(f"Chunk ends past the declared size of {session.size} bytes")
+
+    digest = _take_hasher(session.id, offset)
+    written = 0
+    with open(part_path(session), 'r+b') as f:
+        f.seek(offset)
+        while written < length:
+            data = stream.read(min(READ_SIZE, length - written))
+            if not data:
+                break
+            f.write(data)
+            if digest is not None:
+                digest.update(data)
+            written += len(data)
+
+    # Conditional update: a concurrent chunk for the same offset loses
+    if not UploadSession.objects.filter(id=session.id, received=offset).update(
+        received=offset + written, updated_at=timezone.now()
+    ):
+        session.refresh_from_db(fields=['received'])
+        raise OffsetMismatch(session.received)
+    session.received = offset + written
+    if digest is not None:
+        with _hashers_lock:
+            _hashers[session.id] = (session.received, digest, time.monotonic())
+
+    if offset == 0 and written:
+        check_signature(session)
+    if offset < config['PROBE_BYTES'] <= session.received:
+        probe_header(session)
+    if written < length:
+        logger.warning(f"Upload {session.id}: chunk at {offset} ended after {written} of {length} bytes")
+    return session.received
+
+
+def check_signature(session):
+    with open(part_path(session), 'rb') as f:
+        head = f.read(16)
+    expected = CONTAINERS[os.path.splitext(session.filename)[1].lower()]
+    found = sniff_container(head)
+    if found != expected:
+        reject_session(session, f"File content is not a valid {os.path.splitext(session.filename)[1][1:].upper()} video")
+
+
+def probe_header(session):
+    """
+    Probe the partial file. A readable header without a video stream is
+    rejected now; an unreadable one is left for finalize, since MP4s often
+    keep their index at the end of the file.
+    """
+    try:
+        probe = run_ffprobe(part_path(session))
+    except ValueError as e:
+        logger.info(f"Upload {session.id}: header not readable yet ({str(e)})")
+        return
+    except (RuntimeError, FileNotFoundError) as e:
+        logger.warning(f"Upload {session.id}: cannot probe header: {str(e)}")
+        return
+    if not any(stream.get("codec_type") == "video" for stream in probe.get("streams", [])):
+        reject_session(session, "No video stream found in file")
+
+
+def finalize_session(session):
+    """
+    Turn a complete upload into a DubbingJob: move the file into place,
+    probe and validate it, and record its hash and media fields. Raises
+    ValueError (and rejects the session) for media the pipeline can't use.
+    """
+    DubbingJob = apps.get_model('dubbing', 'DubbingJob')
+    UploadSession = apps.get_model('dubbing', 'UploadSession')
+    if session.status == 'complete' and session.job_id:
+        return session.job
+    if session.status == 'finalizing':
+        raise UploadBusy("Upload is being finalized")
+    if session.status != 'uploading':
+        raise ValueError(f"Upload is {session.status}")
+    if session.received != session.size:
+        raise OffsetMismatch(session.received)
+    # Claim the session in one conditional update: of two concurrent finalizes, only one moves the file
+    if not UploadSession.objects.filter(id=session.id, status='uploading').update(
+        status='finalizing', updated_at=timezone.now()
+    ):
+        session.refresh_from_db()
+        raise UploadBusy(f"Upload is {session.status}")
+    session.status = 'finalizing'
+
+    name = None
+    try:
+        try:
+            # The file on disk, not just the declared size, before hashing it
+            check_video_size(part_path(session))
+        except ValueError as e:
+            reject_session(session, str(e))
+        digest = _take_hasher(session.id, session.size)
+        content_hash = digest.hexdigest() if digest is not None else hash_file(part_path(session))
+
+        name = default_storage.get_available_name(f"videos/{get_valid_filename(session.filename)}")
+        video_path = os.path.join(settings.MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(video_path), exist_ok=True)
+        os.replace(part_path(session), video_path)
+        try:
+            probe = probe_media(video_path, content_hash=content_hash)
+            validate_video_format(video_path, probe=probe)
+        except ValueError as e:
+            os.replace(video_path, part_path(session))
+            name = None
+            reject_session(session, str(e))
+
+        job = DubbingJob.objects.create(
+            user=session.user,
+            title=os.path.splitext(session.filename)[0],
+            status='pending',
+            progress=0,
+            quality=session.quality,
+            content_hash=content_hash,
+        )
+        job.video_file.name = name
+        job.save(update_fields=['video_file'])
+        save_probe_to_job(job, probe)
+    except Exception:
+        if session.status == 'finalizing':
+            # Unexpected failure: put the upload back so finalize can be retried
+            if name and os.path.exists(os.path.join(settings.MEDIA_ROOT, name)):
+                os.replace(os.path.join(settings.MEDIA_ROOT, name), part_path(session))
+            session.status = 'uploading'
+            session.save(update_fields=['status', 'updated_at'])
+        raise
+
+    session.status = 'complete'
+    session.content_hash = content_hash
+    session.job = job
+    session.save(update_fields=['status', 'content_hash', 'job', 'updated_at'])
+    logger.info(f"Upload {session.id} finalized as job {job.id} ({content_hash})")
+    return job
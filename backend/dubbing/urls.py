@@ -1,12 +1,22 @@
 from django.urls import path
 from . import views
-from .views import VideoUploadView, JobStatusView, ProjectListView
+from .views import VideoUploadView, JobStatusView, JobStatusBulkView, JobResumeView, ProjectListView, job_events_view
+from .views import UploadSessionView, UploadSessionDetailView, UploadFinalizeView
 from rest_framework.authtoken.views import obtain_auth_token
 
 urlpatterns = [
     path('api-token-auth/', obtain_auth_token, name='api_token_auth'),
     path('upload/', VideoUploadView.as_view(), name='video-upload'),
+    path('upload/sessions/', UploadSessionView.as_view(), name='upload-session'),
+    path('upload/sessions/<uuid:upload_id>/', UploadSessionDetailView.as_view(), name='upload-session-detail'),
+    path('upload/sessions/<uuid:upload_id>/finalize/', UploadFinalizeView.as_view(), name='upload-finalize'),
     path('job/<int:job_id>/', JobStatusView.as_view(), name='job-status'),
+    path('job/<int:job_id>/resume/', JobResumeView.as_view(), name='job-resume'),
+    path('job/<int:job_id>/events/', job_events_view, name='job-events'),
+    path('jobs/status/', JobStatusBulkView.as_view(), name='jobs-status'),
+    path('jobs/events/', job_events_view, name='jobs-events'),
+    path('job/<int:job_id>/media/<slug:kind>/', views.serve_job_media, name='job-media'),
+    path('jobs/<int:job_id>/dubbed-audio/', views.serve_dubbed_audio, name='serve_dubbed_audio'),
     path('projects/', ProjectListView.as_view(), name='project-list'),
     #path('upload/', views.upload_video, name='upload_video'),
 ]
@@ -0,0 +1,209 @@
+import logging
+
+import numpy as np
+from django.conf import settings
+
+from .audio_ingest import ASR_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VAD_CONFIG = {
+    'ENABLED': True,
+    'FRAME_SECONDS': 0.02,
+    'ENERGY_MARGIN_DB': 10.0,  # Speech must be this far above the estimated noise floor
+    'MIN_ENERGY_DB': -50.0,  # ... and never quieter than this (full scale = 0 dB)
+    'SPEECH_ENERGY_DB': -35.0,  # Voice-like frames this loud are speech whatever the noise floor
+    'MIN_VOICED_RATIO': 0.3,  # Nothing passed the floor but this share of frames sounds like voice: keep them
+    'MIN_BAND_RATIO': 0.6,  # Share of frame energy in the 80-4000 Hz voice band
+    'MAX_FLATNESS': 0.6,  # Spectral flatness above this is treated as noise
+    'MIN_SPEECH_SECONDS': 0.25,
+    'MIN_SILENCE_SECONDS': 0.5,  # Shorter pauses are kept inside a region
+    'PAD_SECONDS': 0.2,
+    'GAP_SECONDS': 0.3,  # Silence left between regions when they are packed for ASR
+}
+
+SPEECH_BAND = (80.0, 4000.0)  # Fundamental through the upper formants
+FFT_BLOCK_FRAMES = 8192  # Frames per FFT block, bounds memory on long tracks
+
+
+def get_vad_config():
+    """Return VAD_CONFIG from settings merged over the defaults"""
+    config = dict(DEFAULT_VAD_CONFIG)
+    config.update(getattr(settings, 'VAD_CONFIG', {}) or {})
+    return config
+
+
+def _runs(mask):
+    """(start, end) index pairs of the True runs in a boolean array"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def speech_frames(samples, sample_rate, config):
+    """Boolean speech decision for each frame, from energy and spectral shape"""
+    frame = int(config['FRAME_SECONDS'] * sample_rate)
+    frames = samples[:len(samples) // frame * frame].reshape(-1, frame)
+    if not len(frames):
+        return np.zeros(0, dtype=bool)
+
+    energy_db = 10 * np.log10(np.mean(np.square(frames, dtype=np.float64), axis=1) + 1e-10)
+    noise_floor = np.percentile(energy_db, 10)
+    # A track with no quiet frames (wall-to-wall speech or music) puts the percentile floor at
+    # speech level, so the absolute SPEECH_ENERGY_DB floor also counts
+    loud = (energy_db > max(noise_floor + config['ENERGY_MARGIN_DB'], config['MIN_ENERGY_DB'])) | \
+        (energy_db > config['SPEECH_ENERGY_DB'])
+
+    freqs = np.fft.rfftfreq(frame, 1.0 / sample_rate)
+    band = (freqs >= SPEECH_BAND[0]) & (freqs <= SPEECH_BAND[1])
+    window = np.hanning(frame).astype(np.float32)
+    voiced = np.zeros(len(frames), dtype=bool)
+    for lo in range(0, len(frames), FFT_BLOCK_FRAMES):
+        block = frames[lo:lo + FFT_BLOCK_FRAMES]
+        power = np.square(np.abs(np.fft.rfft(block * window, axis=1))) + 1e-12
+        total = power.sum(axis=1)
+        band_ratio = power[:, band].sum(axis=1) / total
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+        voiced[lo:lo + len(block)] = (band_ratio >= config['MIN_BAND_RATIO']) & (flatness <= config['MAX_FLATNESS'])
+
+    speech = loud & voiced
+    if not speech.any():
+        # Rather than report a quiet but voice-like track as silent, leave it to ASR
+        audible = voiced & (energy_db > config['MIN_ENERGY_DB'])
+        if audible.mean() >= config['MIN_VOICED_RATIO']:
+            return audible
+    return speech
+
+
+def window_bounds(audio, window_seconds, search_seconds=2.0, frame_seconds=0.02, sample_rate=ASR_SAMPLE_RATE):
+    """
+    Split ``audio`` into consecutive windows of about ``window_seconds``.
+
+    Each cut is moved to the quietest frame in the last ``search_seconds`` of
+    the window so that it is unlikely to land in the middle of a word.
+    """
+    window = int(window_seconds * sample_rate)
+    frame = int(frame_seconds * sample_rate)
+    bounds = []
+    start = 0
+    while start < len(audio):
+        end = min(start + window, len(audio))
+        if end < len(audio):
+            lo = max(start + frame, end - int(search_seconds * sample_rate))
+            usable = (end - lo) // frame * frame
+            if usable:
+                energy = np.square(audio[lo:lo + usable].reshape(-1, frame)).mean(axis=1)
+                end = lo + int(np.argmin(energy)) * frame + frame // 2
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+class SpeechRegions:
+    """
+    Speech regions of a track and the mapping between the original timeline
+    and the packed audio handed to ASR.
+
+    ``regions`` are (start, end) pairs in seconds. ``pack()`` concatenates
+    them with ``gap`` seconds of silence in between, and ``to_original()``
+    maps a time on the packed audio back to the original track.
+    """
+
+    def __init__(self, regions, duration, gap=0.0):
+        self.regions = [(float(start), float(end)) for start, end in regions]
+        self.duration = float(duration)
+        self.gap = float(gap)
+        lengths = np.array([end - start for start, end in self.regions])
+        self._packed_starts = np.concatenate(([0.0], np.cumsum(lengths + self.gap)[:-1])) if len(lengths) else lengths
+        self._lengths = lengths
+
+    def __bool__(self):
+        return bool(self.regions)
+
+    @property
+    def speech_seconds(self):
+        return float(self._lengths.sum())
+
+    def pack(self, samples, sample_rate):
+        """Speech-only audio: the regions joined by short silences"""
+        if not self.regions:
+            return samples[:0]
+        if len(self.regions) == 1 and self.regions[0] == (0.0, self.duration):
+            return samples
+        gap = np.zeros(int(round(self.gap * sample_rate)), dtype=samples.dtype)
+        parts = []
+        for i, (start, end) in enumerate(self.regions):
+            if i:
+                parts.append(gap)
+            parts.append(samples[int(round(start * sample_rate)):int(round(end * sample_rate))])
+        return np.concatenate(parts)
+
+    def to_original(self, t, is_start=False):
+        """
+        Map a packed-audio time to the original timeline.
+
+        A time that falls in the silence between two regions snaps to the end
+        of the earlier region, or to the start of the next one for
+        ``is_start``.
+        """
+        if not self.regions:
+            return float(t)
+        i = max(int(np.searchsorted(self._packed_starts, t, side='right')) - 1, 0)
+        offset = t - self._packed_starts[i]
+        if offset > self._lengths[i] and is_start and i + 1 < len(self.regions):
+            return self.regions[i + 1][0]
+        return self.regions[i][0] + min(max(offset, 0.0), self._lengths[i])
+
+    def _remap_span(self, item):
+        return {**item, "start": self.to_original(item["start"], is_start=True), "end": self.to_original(item["end"])}
+
+    def remap(self, segments):
+        """Move Whisper segment (and word) timestamps from the packed audio back to the original timeline"""
+        remapped = []
+        for seg in segments:
+            seg = self._remap_span(seg)
+            if seg.get("words"):
+                seg["words"] = [self._remap_span(word) for word in seg["words"]]
+            remapped.append(seg)
+        return remapped
+
+
+def detect_speech(samples, sample_rate, config=None):
+    """
+    Find the speech regions of a mono float32 track in one vectorized pass.
+
+    Frames are marked as speech when they are well above the noise floor and
+    their spectrum looks like voice; pauses shorter than MIN_SILENCE_SECONDS
+    are bridged, blips shorter than MIN_SPEECH_SECONDS dropped, and every
+    region is padded. With VAD disabled the whole track is one region.
+    """
+    config = config or get_vad_config()
+    duration = len(samples) / sample_rate
+    if not config['ENABLED']:
+        return SpeechRegions([(0.0, duration)] if len(samples) else [], duration)
+
+    frame_seconds = config['FRAME_SECONDS']
+    mask = speech_frames(samples, sample_rate, config)
+
+    # Bridge short pauses, then drop short blips
+    starts, ends = _runs(~mask)
+    short = (ends - starts) < config['MIN_SILENCE_SECONDS'] / frame_seconds
+    inner = (starts > 0) & (ends < len(mask))
+    for start, end in zip(starts[short & inner], ends[short & inner]):
+        mask[start:end] = True
+    starts, ends = _runs(mask)
+    keep = (ends - starts) >= config['MIN_SPEECH_SECONDS'] / frame_seconds
+
+    regions = []
+    pad = config['PAD_SECONDS']
+    for start, end in zip(starts[keep] * frame_seconds, ends[keep] * frame_seconds):
+        start, end = max(0.0, start - pad), min(duration, end + pad)
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+
+    speech = SpeechRegions(regions, duration, config['GAP_SECONDS'])
+    logger.info(
+        f"VAD found {len(regions)} speech regions, {speech.speech_seconds:.1f}s of {duration:.1f}s"
+    )
+    return speech
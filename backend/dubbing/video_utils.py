@@ -0,0 +1,106 @@
+import logging
+import os
+import subprocess
+import tempfile
+
+from .audio_ingest import find_tool
+
+logger = logging.getLogger(__name__)
+
+# Every clip that ends up in one concat list is encoded with these settings,
+# so the pieces can be joined with the concat demuxer without re-encoding
+CLIP_VIDEO_CODEC = ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '18', '-pix_fmt', 'yuv420p']
+CLIP_AUDIO_CODEC = ['-c:a', 'aac', '-ac', '1']
+CLIP_TIMESCALE = ['-video_track_timescale', '90000']
+
+
+def run_ffmpeg(args):
+    """Run ffmpeg quietly and raise RuntimeError with its stderr on failure"""
+    command = [find_tool('ffmpeg'), '-y', '-loglevel', 'error', *args]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg failed: {result.stderr.strip()}")
+
+
+def cut_clip(video_path, start, end, output_path, audio_path=None, scale_factor=1):
+    """
+    Re-encode ``video_path`` between ``start`` and ``end`` seconds into an mp4.
+
+    With ``audio_path`` (already trimmed to the same span) the clip gets that
+    audio track, otherwise it has none. ``scale_factor`` shrinks the frames
+    the same way Wav2Lip's resize_factor does, so pass-through clips match
+    lip-synced ones.
+    """
+    args = ['-ss', f'{start:.6f}', '-t', f'{end - start:.6f}', '-i', str(video_path)]
+    if audio_path:
+        args += ['-i', str(audio_path), '-map', '0:v:0', '-map', '1:a:0', *CLIP_AUDIO_CODEC, '-shortest']
+    else:
+        args += ['-map', '0:v:0', '-an']
+    if scale_factor > 1:
+        args += ['-vf', f'scale=trunc(iw/{scale_factor}):trunc(ih/{scale_factor})']
+    os.makedirs(os.path.dirname(str(output_path)) or '.', exist_ok=True)
+    run_ffmpeg([*args, *CLIP_VIDEO_CODEC, *CLIP_TIMESCALE, str(output_path)])
+    return output_path
+
+
+# ffprobe stream fields that must agree for clips to be joined without re-encoding
+STREAM_SIGNATURE = (
+    'codec_type', 'codec_name', 'profile', 'width', 'height', 'pix_fmt',
+    'r_frame_rate', 'time_base', 'sample_rate', 'channels',
+)
+
+
+def clip_signature(path):
+    """The stream parameters of a clip, or None if it can't be probed"""
+    from .media_probe import run_ffprobe
+    try:
+        streams = run_ffprobe(path).get("streams", [])
+    except (RuntimeError, ValueError, FileNotFoundError):
+        return None
+    return tuple(tuple(stream.get(field) for field in STREAM_SIGNATURE) for stream in streams)
+
+
+def normalize_clip(path, output_path, reference):
+    """
+    Re-encode a clip with the ``cut_clip`` settings, at the frame size, frame
+    rate and sample rate of the ``reference`` clip's signature.
+    """
+    video = next((stream for stream in reference or () if stream[0] == 'video'), None)
+    audio = next((stream for stream in reference or () if stream[0] == 'audio'), None)
+    args = ['-i', str(path), '-map', '0:v:0', '-map', '0:a:0?']
+    if video:
+        args += ['-vf', f'scale={video[3]}:{video[4]}', '-r', video[6]]
+    if audio:
+        args += ['-ar', str(audio[8])]
+    run_ffmpeg([*args, *CLIP_VIDEO_CODEC, *CLIP_AUDIO_CODEC, *CLIP_TIMESCALE, str(output_path)])
+    return output_path
+
+
+def concat_clips(clip_paths, output_path):
+    """
+    Join mp4 clips in order with the concat demuxer, copying streams.
+
+    Stream copy is only safe when every clip has the same stream parameters,
+    which clips from ``cut_clip`` and the in-process Wav2Lip engine do. Clips
+    written by Wav2Lip's inference.py may not, so when the clips disagree (or
+    can't be probed) each one is first re-encoded with the ``cut_clip``
+    settings, matched to the first clip.
+    """
+    os.makedirs(os.path.dirname(str(output_path)) or '.', exist_ok=True)
+    signatures = [clip_signature(path) for path in clip_paths]
+    with tempfile.TemporaryDirectory(prefix="concat-", dir=os.path.dirname(str(output_path)) or '.') as work_dir:
+        if None in signatures or len(set(signatures)) > 1:
+            logger.warning(f"Clips have different stream parameters, normalizing {len(clip_paths)} clips before joining")
+            clip_paths = [
+                normalize_clip(path, os.path.join(work_dir, f"{i:04d}.mp4"), signatures[0])
+                for i, path in enumerate(clip_paths)
+            ]
+        list_path = os.path.join(work_dir, "clips.txt")
+        with open(list_path, 'w') as list_file:
+            for path in clip_paths:
+                escaped = os.path.abspath(str(path)).replace("'", "'\\''")
+                list_file.write(f"file '{escaped}'\n")
+        run_ffmpeg([
+            '-f', 'concat', '-safe', '0', '-i', list_path, '-c', 'copy', '-movflags', '+faststart', str(output_path)
+        ])
+    return output_path
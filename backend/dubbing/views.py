@@ -1,18 +1,36 @@
-from django.http import JsonResponse, FileResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.decorators import api_view, permission_classes
-from .models import DubbingJob
-from .tasks import process_dubbing_task
+from .models import DubbingJob, UploadSession
+from .tasks import process_dubbing_task, resume_dubbing_task
+from .progress import get_progress_config
+from .progress_stream import job_event_snapshot, job_event_stream
+from .media_delivery import JOB_MEDIA, has_media_signature, job_media_url, serve_media
+from .checks import MAX_VIDEO_SIZE
+from .uploads import (
+    OffsetMismatch, UploadBusy, create_session, finalize_session, get_upload_config, reject_session, write_chunk
+)
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from rest_framework.authtoken.models import Token
 import logging
 from pathlib import Path
-from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.utils.http import parse_etags
+import base64
+import binascii
+import hashlib
+import json
 import os
+import re
+from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
@@ -78,6 +96,11 @@ class VideoUploadView(APIView):
                     {'error': 'Invalid file format. Supported formats: MP4, AVI, MOV, MKV'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            if file.size > MAX_VIDEO_SIZE:
+                return Response(
+                    {'error': f'Video file too large. Maximum size: {MAX_VIDEO_SIZE/1024/1024}MB'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
             # Get file name without extension
             file_name = os.path.splitext(file.name)[0]
@@ -127,74 +150,460 @@ class VideoUploadView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+
+def upload_session_state(session):
+    return {
+        'upload_id': str(session.id),
+        'offset': session.received,
+        'size': session.size,
+        'status': session.status,
+        'error': session.error_message,
+    }
+
+
+class UploadSessionView(APIView):
+    """Start a resumable upload; chunks are then PUT to the session"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            size = int(request.data.get('size', 0))
+        except (TypeError, ValueError):
+            return Response({'error': 'size must be a number of bytes'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            session = create_session(
+                request.user, request.data.get('filename'), size, request.data.get('quality', 'medium')
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {**upload_session_state(session), 'chunk_size': get_upload_config()['CHUNK_SIZE']},
+            status=status.HTTP_201_CREATED
+        )
+
+
+class UploadSessionDetailView(APIView):
+    """
+    GET reports how much of the upload has arrived (where to resume), PUT
+    appends a chunk (``Content-Range: bytes start-end/total``), DELETE
+    abandons the upload.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, upload_id):
+        try:
+            return Response(upload_session_state(UploadSession.objects.get(id=upload_id, user=request.user)))
+        except UploadSession.DoesNotExist:
+            return Response({'error': 'Upload not found'}, status=404)
+
+    def put(self, request, upload_id):
+        try:
+            session = UploadSession.objects.get(id=upload_id, user=request.user)
+        except UploadSession.DoesNotExist:
+            return Response({'error': 'Upload not found'}, status=404)
+
+        content_range = request.META.get('HTTP_CONTENT_RANGE')
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+        if content_range:
+            match = CONTENT_RANGE.match(content_range.strip())
+            if not match:
+                return Response({'error': 'Malformed Content-Range header'}, status=status.HTTP_400_BAD_REQUEST)
+            offset, last, total = int(match.group(1)), int(match.group(2)), match.group(3)
+            if last < offset or (length and length != last - offset + 1):
+                return Response({'error': 'Content-Range does not match the body'}, status=status.HTTP_400_BAD_REQUEST)
+            if total != '*' and int(total) != session.size:
+                return Response(
+                    {'error': f'Content-Range total does not match the upload size of {session.size} bytes'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            length = last - offset + 1
+        else:
+            offset = session.received
+
+        try:
+            received = write_chunk(session, offset, request.stream, length)
+        except OffsetMismatch as e:
+            # Tell the client where to resume from
+            return Response(
+                {'error': str(e), 'offset': e.offset, 'upload_id': str(session.id)},
+                status=status.HTTP_409_CONFLICT
+            )
+        except ValueError as e:
+            return Response(
+                {**upload_session_state(session), 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception:
+            logger.exception(f"Error writing chunk for upload {upload_id}")
+            return Response({'error': 'Internal server error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({**upload_session_state(session), 'offset': received})
+
+    def delete(self, request, upload_id):
+        try:
+            session = UploadSession.objects.get(id=upload_id, user=request.user, status='uploading')
+        except UploadSession.DoesNotExist:
+            return Response({'error': 'Upload not found'}, status=404)
+        try:
+            reject_session(session, 'Cancelled by the client')
+        except ValueError:
+            pass  # reject_session always raises for the caller to report
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadFinalizeView(APIView):
+    """Turn a complete upload into a dubbing job and start processing it"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, upload_id):
+        try:
+            session = UploadSession.objects.get(id=upload_id, user=request.user)
+        except UploadSession.DoesNotExist:
+            return Response({'error': 'Upload not found'}, status=404)
+        started = session.status == 'uploading'
+        try:
+            job = finalize_session(session)
+        except OffsetMismatch as e:
+            return Response(
+                {'error': 'Upload is incomplete', 'offset': e.offset, 'upload_id': str(session.id)},
+                status=status.HTTP_409_CONFLICT
+            )
+        except UploadBusy as e:
+            return Response({**upload_session_state(session), 'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return Response(
+                {**upload_session_state(session), 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception:
+            logger.exception(f"Error finalizing upload {upload_id}")
+            return Response({'error': 'Internal server error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        # A repeated finalize returns the job without queueing it twice
+        if started:
+            process_dubbing_task.delay(str(job.video_file.path), job.id)
+        return Response({
+            "job_id": job.id,
+            "status": job.status,
+            "progress": job.progress,
+            "stepStatus": job.step_status or {},
+        })
+
+def job_warning(job):
+    """Something the user should know about a job that didn't fail, or None"""
+    if job.has_speech is False:
+        return "No speech was detected, so nothing was dubbed; the result is the original video."
+    return None
+
 # views.py  (drop-in replacement for JobStatusView.get)
 class JobStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
     def get(self, request, job_id):
         try:
-            job = DubbingJob.objects.get(id=job_id)
+            job = DubbingJob.objects.get(id=job_id, user=request.user)
             return Response({
                 'status': job.status,
                 'progress': job.progress,
                 'stepStatus': job.step_status or {},
-                'result_url': job.result_file.url if job.result_file else None,
-                'extracted_audio': job.extracted_audio.url if job.extracted_audio else None,
-                'dubbed_audio_file': job.dubbed_audio_file.url if job.dubbed_audio_file else None,
+                'result_url': job_media_url(job, 'result'),
+                'extracted_audio': job_media_url(job, 'extracted-audio'),
+                'dubbed_audio_file': job_media_url(job, 'dubbed-audio'),
                 'translated_subtitles': job.translated_subtitles,
-                'error': job.error_message
+                'has_speech': job.has_speech,
+                'warning': job_warning(job),
+                'error': job.error_message,
+                'version': job.version,
             })
         except DubbingJob.DoesNotExist:
             return Response({'error': 'Job not found'}, status=404)
-        except Exception as e:
+        except Exception:
             logger.exception("Error fetching job status")
             return Response(
                 {'error': 'Internal server error'},
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
         
-class ProjectListView(APIView):
+class JobStatusBulkView(APIView):
+    """
+    Status of many jobs in one query: ``?ids=1:5,2:7,3``, each job id with
+    the version the client already has (or none, for jobs it hasn't seen).
+
+    Versions are per-job counters, so only jobs whose version moved past the
+    client's are returned, without subtitles; the client keeps each job's
+    ``version`` for the next poll. Nothing changed is a 304.
+    """
+    permission_classes = [IsAuthenticated]
+    max_jobs = 200
+    status_fields = (
+        'id', 'version', 'status', 'progress', 'step_status', 'error_message',
+        'result_file', 'extracted_audio', 'dubbed_audio_file', 'has_speech',
+    )
+
     def get(self, request):
-        if request.user.is_authenticated:
-            jobs = DubbingJob.objects.filter(user=request.user).order_by('created_at')
-            data = []
-            for i, job in enumerate(jobs, 1):
-                data.append({
-                    "id": job.id,
-                    "display_id": i,
-                    "title": job.title,
-                    "status": job.status,
-                    "progress": job.progress,
-                    "error_message": job.error_message,
-                    "created_at": job.created_at,
-                    "result_url": job.result_file.url if job.result_file else None,
-                    "extracted_audio": job.extracted_audio.url if job.extracted_audio else None,
-                    "dubbed_audio_file": job.dubbed_audio_file.url if job.dubbed_audio_file else None,
-                    "translated_subtitles": job.translated_subtitles,
-                })
-            return Response(data[::-1])  # Reverse to show newest first
+        try:
+            known = {}
+            for item in request.GET.get('ids', '').split(','):
+                if item.strip():
+                    job_id, _, version = item.partition(':')
+                    known[int(job_id)] = int(version) if version.strip() else 0
+        except ValueError:
+            return Response(
+                {'error': 'ids must be a comma-separated list of job ids, each optionally as id:version'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not known or len(known) > self.max_jobs:
+            return Response({'error': f'Ask for between 1 and {self.max_jobs} jobs'}, status=status.HTTP_400_BAD_REQUEST)
+
+        changed = Q()
+        for job_id, version in known.items():
+            changed |= Q(id=job_id, version__gt=version)
+        jobs = list(
+            DubbingJob.objects.filter(changed, user=request.user)
+            .only(*self.status_fields).order_by('id')
+        )
+        if not jobs and all(known.values()):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
         else:
+            response = Response({
+                'jobs': [{
+                    'id': job.id,
+                    'version': job.version,
+                    'status': job.status,
+                    'progress': job.progress,
+                    'stepStatus': job.step_status or {},
+                    'result_url': job_media_url(job, 'result'),
+                    'extracted_audio': job_media_url(job, 'extracted-audio'),
+                    'dubbed_audio_file': job_media_url(job, 'dubbed-audio'),
+                    'has_speech': job.has_speech,
+                    'warning': job_warning(job),
+                    'error': job.error_message,
+                } for job in jobs],
+            })
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+async def stream_user(request):
+    """
+    The user a token authenticates, from the Authorization header or the
+    ``?token=`` parameter (EventSource can't send headers); None otherwise.
+    """
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    key = header[len('Token '):].strip() if header.startswith('Token ') else request.GET.get('token')
+    if not key:
+        return None
+    try:
+        token = await Token.objects.select_related('user').aget(key=key)
+    except Token.DoesNotExist:
+        return None
+    return token.user if token.user.is_active else None
+
+
+async def job_events_view(request, job_id=None):
+    """
+    Stream job progress as server-sent events, pushed from the workers'
+    progress publishers instead of polled. One job by URL, or several with
+    ``?ids=1,2,3``; only the requesting user's jobs.
+
+    Streams need an ASGI server (see backend_manager/asgi.py). Under WSGI
+    each request gets the current state and a ``retry`` hint instead, so
+    the EventSource falls back to polling.
+    """
+    user = await stream_user(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentication credentials were not provided.'}, status=401)
+    if job_id is not None:
+        job_ids = [job_id]
+    else:
+        try:
+            job_ids = sorted({int(i) for i in request.GET.get('ids', '').split(',') if i.strip()})
+        except ValueError:
+            return JsonResponse({'error': 'ids must be a comma-separated list of job ids'}, status=400)
+    max_jobs = get_progress_config()['MAX_STREAM_JOBS']
+    if not job_ids or len(job_ids) > max_jobs:
+        return JsonResponse({'error': f'Watch between 1 and {max_jobs} jobs'}, status=400)
+    owned = [i async for i in DubbingJob.objects.filter(user=user, id__in=job_ids).values_list('id', flat=True)]
+    if len(owned) != len(job_ids):
+        return JsonResponse({'error': 'Job not found'}, status=404)
+
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(job_event_stream(job_ids), content_type='text/event-stream')
+    else:
+        response = HttpResponse(await job_event_snapshot(job_ids), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Let nginx pass events through as they are written
+    return response
+
+class JobResumeView(APIView):
+    """Restart a failed job from its first incomplete stage; any other status is a 409"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, job_id):
+        try:
+            job = DubbingJob.objects.only('id', 'status', 'user_id').get(id=job_id, user=request.user)
+            # Claim the failed job in one conditional update, so concurrent resumes
+            # (or a resume racing a retry that set it back to pending) start one chain
+            claimed = DubbingJob.objects.filter(id=job.id, status='failed').update(
+                status='pending', error_message=None, version=F('version') + 1,
+            )
+            if not claimed:
+                job.refresh_from_db(fields=['status'])
+                return Response(
+                    {'error': f'Job is already {job.status}'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            resume_dubbing_task.delay(job.id)
+            return Response({'job_id': job.id, 'status': 'pending'})
+        except DubbingJob.DoesNotExist:
+            return Response({'error': 'Job not found'}, status=404)
+        except Exception:
+            logger.exception("Error resuming job")
+            return Response(
+                {'error': 'Internal server error'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+def encode_cursor(job):
+    return base64.urlsafe_b64encode(f"{job.created_at.isoformat()}|{job.id}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a project list cursor; ValueError if it is malformed"""
+    try:
+        created_at, job_id = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode().split('|')
+        created_at = datetime.fromisoformat(created_at)
+        return created_at, int(job_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+class ProjectListView(APIView):
+    """
+    The user's jobs, newest first, one page at a time.
+
+    ``?limit=`` sets the page size and ``?cursor=`` continues after the
+    previous page; the next page's URL is in the ``Link`` header (rel="next")
+    and its cursor in ``X-Next-Cursor``. Subtitles are left out unless
+    ``?include=subtitles``. Pages carry an ETag for conditional GETs.
+    """
+    page_size = 50
+    max_page_size = 200
+    list_fields = (
+        'id', 'sequence', 'title', 'status', 'progress', 'error_message', 'created_at',
+        'result_file', 'extracted_audio', 'dubbed_audio_file', 'has_speech',
+    )
+
+    def get(self, request):
+        if not request.user.is_authenticated:
             # Return an empty list for anonymous users
             return Response([])
 
+        try:
+            limit = min(max(int(request.GET.get('limit', self.page_size)), 1), self.max_page_size)
+            cursor = decode_cursor(request.GET['cursor']) if request.GET.get('cursor') else None
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        include_subtitles = 'subtitles' in request.GET.get('include', '').split(',')
+
+        fields = self.list_fields + (('translated_subtitles',) if include_subtitles else ())
+        # Served by the (user, -created_at, -id) index
+        jobs = DubbingJob.objects.filter(user=request.user).only(*fields).order_by('-created_at', '-id')
+        if cursor is not None:
+            created_at, job_id = cursor
+            jobs = jobs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=job_id))
+        jobs = list(jobs[:limit + 1])
+        has_more = len(jobs) > limit
+        jobs = jobs[:limit]
+
+        data = []
+        for job in jobs:
+            item = {
+                "id": job.id,
+                "display_id": job.sequence,
+                "title": job.title,
+                "status": job.status,
+                "progress": job.progress,
+                "error_message": job.error_message,
+                "created_at": job.created_at,
+                "result_url": job_media_url(job, 'result'),
+                "extracted_audio": job_media_url(job, 'extracted-audio'),
+                "dubbed_audio_file": job_media_url(job, 'dubbed-audio'),
+                "has_speech": job.has_speech,
+                "warning": job_warning(job),
+            }
+            if include_subtitles:
+                item["translated_subtitles"] = job.translated_subtitles
+            data.append(item)
+
+        next_cursor = encode_cursor(jobs[-1]) if has_more else None
+        etag = '"%s"' % hashlib.sha256(
+            json.dumps([data, next_cursor], cls=DjangoJSONEncoder, sort_keys=True).encode()
+        ).hexdigest()[:32]
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        if next_cursor:
+            params = request.GET.copy()
+            params['cursor'] = next_cursor
+            response['Link'] = f'<{request.build_absolute_uri(request.path)}?{params.urlencode()}>; rel="next"'
+            response['X-Next-Cursor'] = next_cursor
+        return response
+
+def media_job(request, job_id, kind, field):
+    """
+    The job whose ``kind`` file may be sent: with a signed URL from the
+    status views (for <video>/<audio>), or to its owner's token. None otherwise.
+    """
+    jobs = DubbingJob.objects.only('id', field)
+    if has_media_signature(request, job_id, kind):
+        return jobs.filter(id=job_id).first()
+    try:
+        auth = TokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    if auth is None:
+        return None
+    return jobs.filter(id=job_id, user=auth[0]).first()
+
+def serve_job_media(request, job_id, kind):
+    """
+    Deliver one of a job's files with range and revalidation support
+    (``?download=1`` for an attachment); see media_delivery.serve_media.
+    """
+    if kind not in JOB_MEDIA:
+        return JsonResponse({'error': f'Unknown media type: {kind}'}, status=404)
+    try:
+        field = JOB_MEDIA[kind]
+        job = media_job(request, job_id, kind, field)
+        if job is None:
+            return JsonResponse({'error': 'Job not found'}, status=404)
+        if not getattr(job, field):
+            return JsonResponse({'error': f'No {kind.replace("-", " ")} for this job'}, status=404)
+        response = serve_media(request, getattr(job, field).name, as_attachment=bool(request.GET.get('download')))
+        if response is None:
+            return JsonResponse({'error': 'File not found on server'}, status=404)
+        return response
+    except Exception as e:
+        logger.error(f"Error serving {kind} for job {job_id}: {e}")
+        return JsonResponse({'error': 'Internal server error'}, status=500)
+
 def serve_dubbed_audio(request, job_id):
     try:
-        job = DubbingJob.objects.get(id=job_id)
-        
+        job = media_job(request, job_id, 'dubbed-audio', 'dubbed_audio_file')
+        if job is None:
+            return JsonResponse({'error': 'Job not found'}, status=404)
+
         # Ensure the job has a dubbed audio file
         if not job.dubbed_audio_file:
             return JsonResponse({'error': 'Dubbed audio not found for this job'}, status=404)
 
-        # Construct the full path to the audio file
-        audio_file_path = os.path.join(settings.MEDIA_ROOT, str(job.dubbed_audio_file))
-
-        # Check if the file exists
-        if not os.path.exists(audio_file_path):
+        response = serve_media(request, job.dubbed_audio_file.name, as_attachment=True)
+        if response is None:
             return JsonResponse({'error': 'Audio file not found on server'}, status=404)
+        return response
 
-        # Serve the file
-        return FileResponse(open(audio_file_path, 'rb'), as_attachment=True, filename=os.path.basename(audio_file_path))
-
-    except DubbingJob.DoesNotExist:
-        return JsonResponse({'error': 'Job not found'}, status=404)
     except Exception as e:
         logger.error(f"Error serving dubbed audio for job {job_id}: {e}")
         return JsonResponse({'error': 'Internal server error'}, status=500)
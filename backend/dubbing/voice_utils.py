@@ -3,7 +3,8 @@ from TTS.api import TTS
 import logging
 import os
 from pathlib import Path
-import gc
+from .inference_client import get_inference_client, use_inference_server
+from .tts_engine import get_tts_engine
 
 logger = logging.getLogger(__name__)
 
@@ -15,33 +16,22 @@ import torch.serialization
 def synthesize_hindi_audio(text, output_path, reference_audio=None):
     """Synthesize Hindi audio from text using a Hindi-supported Coqui TTS model and clone the original voice."""
     try:
-        import gc
-        gc.collect()
-        import torch
-        
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
-            use_cuda = True
-        else:
-            use_cuda = False
-
-        from TTS.api import TTS
-        model_name = "tts_models/multilingual/multi-dataset/xtts_v2"
-        tts = TTS(model_name=model_name, progress_bar=True, gpu=use_cuda)
-
         if not reference_audio or not os.path.exists(reference_audio):
             raise ValueError("Reference audio is required for voice cloning.")
 
-        logger.info(f"Calling tts_to_file with speaker='user', speaker_wav='{reference_audio}', language='hi'")
-        logger.info(f"TTS args: text={text[:30]}, file_path={output_path}, language='hi', speaker='user', speaker_wav={reference_audio}")
-
-        tts.tts_to_file(
-            text=text,
-            file_path=output_path,
-            language="hi",
-            # speaker="user",              # Must be a string, can be any name
-            speaker_wav=reference_audio  # Path to reference audio
-        )
+        logger.info(f"TTS args: text={text[:30]}, file_path={output_path}")
+        if use_inference_server():
+            get_inference_client().synthesize(text, output_path, reference_audio, language="hi")
+        else:
+            engine = get_tts_engine()
+            logger.info(f"Synthesizing with {engine.model_name}, speaker_wav='{reference_audio}', language='hi'")
+            engine.synthesize_to_file(
+                text=text,
+                output_path=output_path,
+                reference_audio=reference_audio,
+                language="hi"
+            )
+            logger.info(f"Speaker cache stats: {engine.stats}")
 
         if not os.path.exists(output_path):
             raise FileNotFoundError(f"TTS failed to create output file: {output_path}")
@@ -55,4 +45,4 @@ def synthesize_hindi_audio(text, output_path, reference_audio=None):
                 os.remove(output_path)
             except Exception as cleanup_error:
                 logger.error(f"Failed to cleanup: {cleanup_error}")
-        raise
\ No newline at end of file
+        raise
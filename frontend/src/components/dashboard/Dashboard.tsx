@@ -1,4 +1,4 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { useUser } from "@/context/UserContext";
 import { Card, CardContent } from "@/components/ui/card";
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs";
@@ -8,6 +8,9 @@ import { ProjectList } from "@/components/dashboard/ProjectList";
 import { DashboardHeader } from "@/components/dashboard/DashboardHeader";
 import { DashboardSummary } from "@/components/dashboard/DashboardSummary";
 
+const PROJECTS_URL = "http://localhost:8000/dubbing/projects/";
+const PAGE_SIZE = 50;
+
 // Define a shared type for projects
 export interface Project {
   id: number;
@@ -29,6 +32,8 @@ export interface Project {
   dubbed_audio_file?: string;
   translated_subtitles?: string;
   quality?: "fast" | "medium" | "high";
+  has_speech?: boolean | null;
+  warning?: string | null;
 }
 
 export function Dashboard() {
@@ -38,42 +43,94 @@ export function Dashboard() {
   const [currentProcessingProject, setCurrentProcessingProject] =
     useState<Project | null>(null);
 
-  // Load projects from the backend on initial render and poll for updates
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  // ETag of the first page, sent back so unchanged polls are a 304
+  const etagRef = useRef<string | null>(null);
+  // Once older pages are loaded, polls keep them and leave the cursor alone
+  const loadedMoreRef = useRef(false);
+
+  // Load the first page of projects on initial render and poll it for updates
   useEffect(() => {
+    const fetchFirstPage = async (token: string): Promise<Project[] | null> => {
+      const headers: Record<string, string> = { Authorization: `Token ${token}` };
+      if (etagRef.current) {
+        headers["If-None-Match"] = etagRef.current;
+      }
+      const res = await fetch(`${PROJECTS_URL}?limit=${PAGE_SIZE}`, { headers });
+      if (res.status === 304) {
+        return null;
+      }
+      if (!res.ok) {
+        throw new Error("Failed to fetch projects");
+      }
+      etagRef.current = res.headers.get("ETag");
+      if (!loadedMoreRef.current) {
+        setNextCursor(res.headers.get("X-Next-Cursor"));
+      }
+      return res.json();
+    };
+
     const fetchProjects = () => {
       const token = localStorage.getItem("token");
       if (token && user) {
-        fetch("http://localhost:8000/dubbing/projects/", {
-          headers: {
-            Authorization: `Token ${token}`,
-          },
-        })
-          .then((res) => res.json())
-          .then((data) => {
-            setProjects(data);
-            const processingProject = data.find(
+        fetchFirstPage(token)
+          .then((page) => {
+            if (!page) return;
+            setProjects((prev) => {
+              // Keep fields only the job status view returns (subtitles) and any older pages
+              const previous = new Map(prev.map((p) => [p.id, p]));
+              const fresh = page.map((p) => ({ ...previous.get(p.id), ...p }));
+              const ids = new Set(fresh.map((p) => p.id));
+              const older = loadedMoreRef.current ? prev.filter((p) => !ids.has(p.id)) : [];
+              return [...fresh, ...older];
+            });
+            const processingProject = page.find(
               (p: Project) => p.status === "processing" || p.status === "pending"
             );
-            if (processingProject) {
-              setCurrentProcessingProject(processingProject);
-            } else {
-              const lastCompleted = data.find(p => p.id === currentProcessingProject?.id && (p.status === 'completed' || p.status === 'failed'));
-              if (lastCompleted) {
-                setCurrentProcessingProject(lastCompleted);
-              } else {
-                setCurrentProcessingProject(null);
+            setCurrentProcessingProject((current) => {
+              if (processingProject) {
+                return current?.id === processingProject.id ? { ...current, ...processingProject } : processingProject;
               }
-            }
-          });
+              const lastCompleted = page.find(p => p.id === current?.id && (p.status === 'completed' || p.status === 'failed'));
+              return lastCompleted ? { ...current, ...lastCompleted } : null;
+            });
+          })
+          .catch((err) => console.error("Error fetching projects:", err));
       }
     };
 
+    etagRef.current = null;
+    loadedMoreRef.current = false;
     fetchProjects(); // Initial fetch
     const intervalId = setInterval(fetchProjects, 5000); // Poll every 5 seconds
 
     return () => clearInterval(intervalId); // Cleanup on unmount
   }, [user]);
 
+  // Older projects are loaded a page at a time when the user asks for them
+  const loadMoreProjects = () => {
+    const token = localStorage.getItem("token");
+    if (!token || !nextCursor) return;
+    fetch(`${PROJECTS_URL}?limit=${PAGE_SIZE}&cursor=${encodeURIComponent(nextCursor)}`, {
+      headers: {
+        Authorization: `Token ${token}`,
+      },
+    })
+      .then(async (res) => {
+        if (!res.ok) {
+          throw new Error("Failed to fetch projects");
+        }
+        const page: Project[] = await res.json();
+        loadedMoreRef.current = true;
+        setNextCursor(res.headers.get("X-Next-Cursor"));
+        setProjects((prev) => {
+          const ids = new Set(prev.map((p) => p.id));
+          return [...prev, ...page.filter((p) => !ids.has(p.id))];
+        });
+      })
+      .catch((err) => console.error("Error loading more projects:", err));
+  };
+
   // Function to handle new file upload
   const handleFileUpload = (uploadedFile: any) => {
     if (uploadedFile.jobId) {
@@ -170,7 +227,11 @@ export function Dashboard() {
           </TabsContent>
 
           <TabsContent value="projects" className="space-y-4">
-            <ProjectList projects={projects} />
+            <ProjectList
+              projects={projects}
+              hasMore={!!nextCursor}
+              onLoadMore={loadMoreProjects}
+            />
           </TabsContent>
         </Tabs>
       </div>
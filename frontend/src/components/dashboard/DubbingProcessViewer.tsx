@@ -138,7 +138,11 @@ export function DubbingProcessViewer({ project, onProjectUpdate }: DubbingProces
 
     const poll = () => {
       if (!isPolling) return;
-      fetch(`http://localhost:8000/dubbing/job/${project.id}/`)
+      fetch(`http://localhost:8000/dubbing/job/${project.id}/`, {
+        headers: {
+          Authorization: `Token ${localStorage.getItem("token")}`,
+        },
+      })
         .then((res) => {
           if (res.status === 404) {
             toast({
@@ -250,6 +254,9 @@ export function DubbingProcessViewer({ project, onProjectUpdate }: DubbingProces
         <div>
           <h3 className="text-xl font-semibold">{project.title}</h3>
           <p className="text-muted-foreground">Tamil Dubbing in Progress</p>
+          {project.warning && (
+            <p className="text-sm text-amber-600">{project.warning}</p>
+          )}
         </div>
 
         <div className="flex items-center gap-2">
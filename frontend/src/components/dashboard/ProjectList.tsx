@@ -18,9 +18,11 @@ interface Project {
 
 interface ProjectListProps {
   projects: Project[];
+  hasMore?: boolean;
+  onLoadMore?: () => void;
 }
 
-export function ProjectList({ projects = [] }: ProjectListProps) {
+export function ProjectList({ projects = [], hasMore = false, onLoadMore }: ProjectListProps) {
   const [searchQuery, setSearchQuery] = useState("");
   const [filter, setFilter] = useState("all");
   const [isAuthenticated, setIsAuthenticated] = useState(!!localStorage.getItem("token"));
@@ -235,6 +237,13 @@ export function ProjectList({ projects = [] }: ProjectListProps) {
             </div>
           ))
         )}
+        {isAuthenticated && hasMore && onLoadMore && (
+          <div className="flex justify-center pt-2">
+            <Button variant="outline" onClick={onLoadMore}>
+              Load more
+            </Button>
+          </div>
+        )}
       </div>
     </div>
   );